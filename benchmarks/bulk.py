@@ -0,0 +1,63 @@
+"""Tiempo total de /api/prestashop/products/from-odoo/bulk con catálogos de distinto tamaño.
+
+    python benchmarks/bulk.py --sizes 1000 10000 100000 --existing 0.5 --workers 8
+
+--existing es la fracción de SKUs que ya existe en la tienda (se actualiza su stock; el resto se
+crea). El límite de peticiones por segundo hacia la tienda (PRESTASHOP_RATE_LIMIT) se desactiva salvo
+que se pase --rate, para medir la API y no el limitador.
+"""
+import argparse
+import asyncio
+import time
+
+from harness import api_client, generate, load_app, start_services
+
+
+async def run(args):
+    odoo, shop = start_services(
+        odoo_data=generate(products=0),
+        odoo_latency=args.odoo_latency,
+        shop_latency=args.shop_latency,
+        shop_options={"products": 0},
+        env={"PRESTASHOP_RATE_LIMIT": str(args.rate)},
+    )
+    app = load_app()
+    print(f"{'SKUs':>8}{'segundos':>10}{'SKU/s':>10}{'creados':>9}{'actualiz.':>10}{'sin camb.':>10}"
+          f"{'errores':>9}{'Odoo':>8}{'tienda':>8}")
+    async with app.router.lifespan_context(app):
+        async with api_client(app) as client:
+            for size in args.sizes:
+                odoo.reset(generate(products=size, orders=0))
+                shop.reset(products=int(size * args.existing), orders=0, customers=0, payments=0, suppliers=0)
+                start = time.perf_counter()
+                r = await client.get(
+                    "/api/prestashop/products/from-odoo/bulk",
+                    params={"mode": "full", "workers": args.workers},
+                )
+                elapsed = time.perf_counter() - start
+                report = r.json()
+                if r.status_code != 200 or report.get("status") != "success":
+                    print(f"{size:>8}  error: {r.status_code} {str(report)[:200]}")
+                    continue
+                data = report["data"]
+                errors = len(data["create_errors"]) + len(data["stock_errors"])
+                print(
+                    f"{size:>8}{elapsed:>10.2f}{size / elapsed:>10.0f}{len(data['created']):>9}"
+                    f"{len(data['updated_existing']):>10}{len(data['unchanged']):>10}{errors:>9}"
+                    f"{sum(odoo.calls.values()):>8}{sum(shop.calls.values()):>8}"
+                )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--existing", type=float, default=0.5)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=0, help="peticiones/s por host; 0 = sin límite")
+    parser.add_argument("--odoo-latency", type=float, default=0.0)
+    parser.add_argument("--shop-latency", type=float, default=0.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+"""Odoo falso por XML-RPC (/xmlrpc/2/common y /xmlrpc/2/object) para los benchmarks.
+
+Corre en un hilo del mismo proceso, con datos sintéticos y latencia configurable por llamada.
+"""
+import operator
+import threading
+import time
+import xmlrpc.client
+from collections import Counter
+from socketserver import ThreadingMixIn
+from xmlrpc.server import SimpleXMLRPCRequestHandler, SimpleXMLRPCServer
+
+WRITE_DATE = "2024-01-01 00:00:00"
+STOCK_LOCATION = [8, "WH/Stock"]
+# campos de modelos relacionados que se pueden usar en los dominios
+RELATED = {"location_id.usage": {STOCK_LOCATION[0]: "internal"}}
+
+
+def generate(products=1000, orders=1000, partners=200, categories=20):
+    data = {
+        "product.category": [
+            {"id": i, "name": f"Categoría {i}", "display_name": f"Todos / Categoría {i}", "write_date": WRITE_DATE}
+            for i in range(1, categories + 1)
+        ],
+        "res.partner": [
+            {
+                "id": i,
+                "name": f"Proveedor {i}",
+                "display_name": f"Proveedor {i}",
+                "email": f"proveedor{i}@ejemplo.mx",
+                "contact_address": f"Calle {i}, Ciudad de México",
+                "is_company": i % 3 != 0,
+                "supplier_rank": 1 if i % 2 else 0,
+                "active": True,
+                "write_date": WRITE_DATE,
+            }
+            for i in range(1, partners + 1)
+        ],
+        "product.template": [],
+        "product.product": [],
+        "stock.quant": [],
+        "sale.order": [],
+    }
+    for i in range(1, products + 1):
+        # uno de cada 50 sin precio ni stock: el bulk lo salta
+        price = 0.0 if i % 50 == 0 else round(10 + (i % 500) * 1.5, 2)
+        qty = 0.0 if i % 50 == 0 else float(i % 40)
+        name = f"Producto {i}"
+        data["product.template"].append(
+            {"id": i, "name": name, "list_price": price, "product_variant_ids": [i], "write_date": WRITE_DATE}
+        )
+        data["product.product"].append({
+            "id": i,
+            "name": name,
+            "default_code": f"SKU{i:06d}",
+            "list_price": price,
+            "qty_available": qty,
+            "product_tmpl_id": [i, name],
+            "categ_id": [1 + i % categories, f"Categoría {1 + i % categories}"],
+            "active": True,
+            "write_date": WRITE_DATE,
+        })
+        data["stock.quant"].append(
+            {"id": i, "product_id": [i, name], "location_id": STOCK_LOCATION, "quantity": qty, "write_date": WRITE_DATE}
+        )
+    for i in range(1, orders + 1):
+        data["sale.order"].append({
+            "id": i,
+            "name": f"S{i:05d}",
+            "date_order": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d} 10:00:00",
+            "state": ("draft", "sale", "done", "cancel")[i % 4],
+            "amount_total": round(i * 3.7, 2),
+            "partner_id": [1 + i % partners, f"Proveedor {1 + i % partners}"],
+            "write_date": WRITE_DATE,
+        })
+    return data
+
+
+def _value(record, field):
+    if field in RELATED:
+        # campo de un many2one (location_id.usage): se resuelve por el id
+        return RELATED[field].get(_value(record, field.split(".")[0]))
+    value = record.get(field.split(".")[0])
+    # many2one: [id, nombre] se compara por id
+    if isinstance(value, list) and len(value) == 2 and isinstance(value[0], int) and isinstance(value[1], str):
+        return value[0]
+    return value
+
+
+def _ordered(op):
+    def compare(a, b):
+        return a is not None and a is not False and op(a, b)
+    return compare
+
+
+OPERATORS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    ">": _ordered(operator.gt),
+    ">=": _ordered(operator.ge),
+    "<": _ordered(operator.lt),
+    "<=": _ordered(operator.le),
+    "in": lambda a, b: a in b,
+    "not in": lambda a, b: a not in b,
+    "like": lambda a, b: str(b) in str(a or ""),
+    "ilike": lambda a, b: str(b).lower() in str(a or "").lower(),
+}
+
+
+def _leaf(term):
+    field, op, expected = term
+    if op in ("in", "not in"):
+        expected = set(expected)
+    compare = OPERATORS[op]
+    return lambda record: compare(_value(record, field), expected)
+
+
+def compile_domain(domain):
+    # notación polaca de Odoo: '&' y '|' binarios, '!' unario, '&' implícito entre términos
+    terms = list(domain)
+    pos = 0
+
+    def parse():
+        nonlocal pos
+        term = terms[pos]
+        pos += 1
+        if term == "!":
+            inner = parse()
+            return lambda r: not inner(r)
+        if term in ("&", "|"):
+            left, right = parse(), parse()
+            if term == "&":
+                return lambda r: left(r) and right(r)
+            return lambda r: left(r) or right(r)
+        return _leaf(term)
+
+    predicates = []
+    while pos < len(terms):
+        predicates.append(parse())
+    return lambda record: all(p(record) for p in predicates)
+
+
+def _empty(value):
+    return value is None or value is False
+
+
+def _sort(rows, order):
+    for part in reversed([p.strip() for p in order.split(",") if p.strip()]):
+        field, _, direction = part.partition(" ")
+        # vacíos (None/False) al final en ASC y al principio en DESC, como PostgreSQL
+        rows.sort(key=lambda r: (_empty(r.get(field)), None if _empty(r.get(field)) else r.get(field)),
+                  reverse=direction.strip().lower() == "desc")
+    return rows
+
+
+def _project(record, fields):
+    if not fields:
+        return dict(record)
+    return {f: record.get(f, False) for f in dict.fromkeys(["id", *fields])}
+
+
+class _Handler(SimpleXMLRPCRequestHandler):
+    rpc_paths = ("/xmlrpc/2/common", "/xmlrpc/2/object")
+    protocol_version = "HTTP/1.1"  # keep-alive, como el Odoo real detrás de un proxy
+    disable_nagle_algorithm = True
+
+
+class _Server(ThreadingMixIn, SimpleXMLRPCServer):
+    daemon_threads = True
+
+
+class FakeOdoo:
+    def __init__(self, data=None, latency=0.0, db="bench", login="bench", password="bench", uid=2):
+        self.data = data if data is not None else generate()
+        self.latency = latency
+        self.db = db
+        self.login = login
+        self.password = password
+        self.uid = uid
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._server = None
+
+    def reset(self, data):
+        with self._lock:
+            self.data = data
+            self.calls.clear()
+
+    # ---------- métodos XML-RPC ----------
+    def _dispatch(self, method, params):
+        if self.latency:
+            time.sleep(self.latency)
+        if method == "authenticate":
+            db, login, password, _ = params
+            self.calls["authenticate"] += 1
+            return self.uid if (db, login, password) == (self.db, self.login, self.password) else False
+        if method == "execute_kw":
+            return self.execute_kw(*params)
+        if method == "version":
+            return {"server_version": "17.0", "server_serie": "17.0"}
+        raise xmlrpc.client.Fault(1, f"Método desconocido: {method}")
+
+    def execute_kw(self, db, uid, password, model, method, args, kwargs=None):
+        if uid != self.uid or password != self.password:
+            raise xmlrpc.client.Fault(3, "Access Denied")
+        kwargs = kwargs or {}
+        with self._lock:
+            self.calls[(model, method)] += 1
+            rows = self.data.get(model)
+        if rows is None:
+            raise xmlrpc.client.Fault(2, f"Object {model} doesn't exist")
+
+        if method in ("search", "search_count", "search_read"):
+            domain = args[0] if args else kwargs.get("domain", [])
+            match = compile_domain(domain)
+            found = [r for r in rows if match(r)]
+            if method == "search_count":
+                return len(found)
+            if kwargs.get("order"):
+                found = _sort(found, kwargs["order"])
+            offset = kwargs.get("offset") or 0
+            limit = kwargs.get("limit")
+            found = found[offset:offset + limit] if limit else found[offset:]
+            if method == "search":
+                return [r["id"] for r in found]
+            return [_project(r, kwargs.get("fields")) for r in found]
+
+        if method == "read":
+            ids = set(args[0])
+            return [_project(r, kwargs.get("fields") or (args[1] if len(args) > 1 else None)) for r in rows if r["id"] in ids]
+
+        if method == "read_group":
+            domain = args[0] if args else kwargs.get("domain", [])
+            fields = kwargs.get("fields") or (args[1] if len(args) > 1 else [])
+            groupby = kwargs.get("groupby") or (args[2] if len(args) > 2 else [])
+            key = groupby[0] if isinstance(groupby, list) else groupby
+            match = compile_domain(domain)
+            sums = [f.split(":")[0] for f in fields if f.split(":")[0] != key]
+            groups = {}
+            for r in rows:
+                if not match(r):
+                    continue
+                group = groups.setdefault(_value(r, key), {key: r.get(key), f"{key}_count": 0, **{f: 0 for f in sums}})
+                group[f"{key}_count"] += 1
+                for f in sums:
+                    group[f] += r.get(f) or 0
+            return list(groups.values())
+
+        raise xmlrpc.client.Fault(1, f"Método {method} no soportado por el Odoo falso")
+
+    # ---------- servidor ----------
+    def start(self, host="127.0.0.1", port=0):
+        self._server = _Server((host, port), requestHandler=_Handler, allow_none=True, logRequests=False)
+        self._server.register_instance(self)
+        threading.Thread(target=self._server.serve_forever, name="fake-odoo", daemon=True).start()
+        return f"http://{host}:{self._server.server_address[1]}"
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,274 @@
+"""Webservice de PrestaShop falso para los benchmarks.
+
+Servidor HTTP/1.1 con keep-alive en un hilo del mismo proceso. Sirve products, stock_availables,
+orders, customers, order_payments y suppliers en JSON (output_format=JSON) o XML, con los
+parámetros que usa la API: filter[campo]=[a|b], display=full|[a,b], sort=[id_ASC|id_DESC] y
+limit=offset,n. Acepta POST de productos y PUT/PATCH de productos y stock_availables.
+"""
+import json
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+API_KEY = "bench"
+RESOURCES = {
+    "products": "product",
+    "stock_availables": "stock_available",
+    "orders": "order",
+    "customers": "customer",
+    "order_payments": "order_payment",
+    "suppliers": "supplier",
+}
+WRITABLE = {"products", "stock_availables"}
+# campos por los que la API filtra a menudo: se indexan para que 100k SKUs no sean O(n) por petición
+INDEXED = {("products", "reference"), ("stock_availables", "id_product"), ("orders", "reference")}
+
+
+def _language(value):
+    return [{"id": "1", "value": value}]
+
+
+def _cdata(value):
+    return "<![CDATA[" + str(value).replace("]]>", "]]]]><![CDATA[>") + "]]>"
+
+
+def _xml_field(name, value):
+    if isinstance(value, list):
+        inner = "".join(f'<language id="{v["id"]}">{_cdata(v["value"])}</language>' for v in value)
+        return f"<{name}>{inner}</{name}>"
+    return f"<{name}>{_cdata(value)}</{name}>"
+
+
+def _xml_record(tag, record):
+    return f"<{tag}>" + "".join(_xml_field(k, v) for k, v in record.items()) + f"</{tag}>"
+
+
+def _parse_body(body):
+    # <prestashop><product>...</product></prestashop> -> {campo: texto}
+    root = ET.fromstring(body)
+    node = root[0] if len(root) else root
+    fields = {}
+    for child in node:
+        language = child.find("language")
+        if language is not None:
+            fields[child.tag] = _language((language.text or "").strip())
+        elif len(child) == 0:
+            fields[child.tag] = (child.text or "").strip()
+    return fields
+
+
+class FakePrestaShop:
+    def __init__(self, products=0, orders=500, customers=200, payments=500, suppliers=20,
+                 latency=0.0, api_key=API_KEY, patch_supported=True):
+        self.latency = latency
+        self.api_key = api_key
+        self.patch_supported = patch_supported
+        self.calls = Counter()
+        self._lock = threading.Lock()
+        self._server = None
+        self.reset(products, orders, customers, payments, suppliers)
+
+    def reset(self, products=0, orders=500, customers=200, payments=500, suppliers=20):
+        with self._lock:
+            self.data = {name: {} for name in RESOURCES}
+            self._index = {key: {} for key in INDEXED}
+            self.calls.clear()
+        for i in range(1, products + 1):
+            self.add_product(f"SKU{i:06d}", f"Producto {i}", 10 + i % 500, quantity=i % 7)
+        for i in range(1, customers + 1):
+            self._insert("customers", {
+                "id": str(i), "firstname": f"Cliente{i}", "lastname": "Prueba",
+                "email": f"cliente{i}@ejemplo.mx", "active": "1", "date_add": "2024-01-01 10:00:00",
+            })
+        for i in range(1, orders + 1):
+            self._insert("orders", {
+                "id": str(i), "reference": f"ORD{i:06d}", "id_customer": str(1 + i % max(customers, 1)),
+                "total_paid": f"{i * 3.7:.6f}", "current_state": str(1 + i % 5), "date_add": "2024-01-01 10:00:00",
+            })
+        for i in range(1, payments + 1):
+            self._insert("order_payments", {
+                "id": str(i), "order_reference": f"ORD{i:06d}", "amount": f"{i * 3.7:.6f}",
+                "payment_method": "Transferencia", "date_add": "2024-01-01 10:00:00",
+            })
+        for i in range(1, suppliers + 1):
+            self._insert("suppliers", {"id": str(i), "name": f"Proveedor {i}", "active": "1"})
+
+    def _insert(self, resource, record):
+        with self._lock:
+            table = self.data[resource]
+            if "id" not in record:
+                record = {"id": str(len(table) + 1), **record}
+            table[int(record["id"])] = record
+            self._reindex(resource, record, None)
+        return record
+
+    def _reindex(self, resource, record, old):
+        for res, field in INDEXED:
+            if res != resource:
+                continue
+            index = self._index[(res, field)]
+            if old is not None:
+                index.get(str(old.get(field)), set()).discard(int(record["id"]))
+            index.setdefault(str(record.get(field)), set()).add(int(record["id"]))
+
+    def add_product(self, reference, name, price, quantity=0, active="1"):
+        product = self._insert("products", {
+            "reference": reference, "name": _language(name), "price": f"{float(price):.6f}",
+            "active": str(active), "quantity": str(quantity),
+        })
+        self._insert("stock_availables", {
+            "id_product": product["id"], "id_product_attribute": "0", "id_shop": "1", "id_shop_group": "0",
+            "quantity": str(quantity), "depends_on_stock": "0", "out_of_stock": "2",
+        })
+        return product
+
+    def product_by_reference(self, reference):
+        ids = self._index[("products", "reference")].get(reference)
+        return self.data["products"][min(ids)] if ids else None
+
+    # ---------- consultas ----------
+    def _list(self, resource, query):
+        table = self.data[resource]
+        rows = None
+        for key, value in query.items():
+            if not (key.startswith("filter[") and key.endswith("]")):
+                continue
+            field = key[7:-1]
+            wanted = set(value.strip("[]").split("|"))
+            index = self._index.get((resource, field))
+            if field == "id":
+                candidates = [table[int(v)] for v in wanted if v.isdigit() and int(v) in table]
+            elif index is not None and rows is None:
+                candidates = [table[i] for v in wanted for i in index.get(v, ())]
+            else:
+                candidates = rows if rows is not None else table.values()
+                candidates = [r for r in candidates if str(r.get(field)) in wanted]
+            if rows is not None:
+                keep = {id(r) for r in candidates}
+                candidates = [r for r in rows if id(r) in keep]
+            rows = candidates
+        if rows is None:
+            rows = list(table.values())  # ya en orden de id
+        else:
+            rows.sort(key=lambda r: int(r["id"]))
+        if query.get("sort", "[id_ASC]").strip("[]").endswith("_DESC"):
+            rows.reverse()
+        if "limit" in query:
+            offset, _, count = query["limit"].rpartition(",")
+            offset = int(offset or 0)
+            rows = rows[offset:offset + int(count)]
+        return rows
+
+    def _display(self, rows, query):
+        display = query.get("display")
+        if display == "full":
+            return rows
+        fields = display.strip("[]").split(",") if display else ["id"]
+        return [{f: r.get(f, "") for f in fields} for r in rows]
+
+    def _render(self, resource, rows, query, single=False):
+        tag = RESOURCES[resource]
+        if query.get("output_format", query.get("io_format")) == "JSON":
+            if single:
+                return "application/json", json.dumps({tag: rows[0]})
+            # PrestaShop devuelve [] (no {"recurso": []}) cuando no hay resultados
+            return "application/json", json.dumps({resource: rows} if rows else [])
+        if single:
+            body = _xml_record(tag, rows[0])
+        else:
+            body = f"<{resource}>" + "".join(_xml_record(tag, r) for r in rows) + f"</{resource}>"
+        return "text/xml", f'<?xml version="1.0" encoding="UTF-8"?>\n<prestashop>{body}</prestashop>'
+
+    # ---------- peticiones ----------
+    def handle(self, method, path, query, body):
+        with self._lock:
+            self.calls[(method, path.split("/")[2] if path.count("/") >= 2 else path)] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if query.get("ws_key") != self.api_key:
+            return 401, "text/xml", "<prestashop><errors><error><code>25</code></error></errors></prestashop>"
+
+        parts = [p for p in path.split("/") if p]
+        if len(parts) < 2 or parts[0] != "api" or parts[1] not in RESOURCES:
+            return 404, "text/xml", "<prestashop/>"
+        resource = parts[1]
+        record_id = int(parts[2]) if len(parts) > 2 and parts[2].isdigit() else None
+
+        if method == "GET":
+            if record_id is None:
+                rows = self._list(resource, query)
+                return 200, *self._render(resource, self._display(rows, query), query)
+            record = self.data[resource].get(record_id)
+            if record is None:
+                return 404, "text/xml", "<prestashop/>"
+            return 200, *self._render(resource, [record], query, single=True)
+
+        if resource not in WRITABLE:
+            return 405, "text/xml", "<prestashop/>"
+
+        if method == "POST" and record_id is None and resource == "products":
+            fields = _parse_body(body)
+            product = self.add_product(fields.get("reference", ""), fields["name"][0]["value"], fields.get("price") or 0)
+            return 201, *self._render(resource, [product], {}, single=True)
+
+        if method in ("PUT", "PATCH") and record_id is not None:
+            if method == "PATCH" and not self.patch_supported:
+                return 405, "text/xml", "<prestashop/>"
+            record = self.data[resource].get(record_id)
+            if record is None:
+                return 404, "text/xml", "<prestashop/>"
+            fields = _parse_body(body)
+            fields.pop("id", None)
+            with self._lock:
+                old = dict(record)
+                record.update(fields)
+                self._reindex(resource, record, old)
+                if resource == "stock_availables" and "quantity" in fields:
+                    product = self.data["products"].get(int(record["id_product"]))
+                    if product is not None:
+                        product["quantity"] = fields["quantity"]
+            return 200, *self._render(resource, [record], {}, single=True)
+
+        return 405, "text/xml", "<prestashop/>"
+
+    # ---------- servidor ----------
+    def start(self, host="127.0.0.1", port=0):
+        shop = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # cabeceras y cuerpo van en dos write(): sin esto Nagle + ACK diferido meten ~40 ms
+            disable_nagle_algorithm = True
+
+            def _serve(self):
+                url = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                try:
+                    status, content_type, payload = shop.handle(self.command, url.path, dict(parse_qsl(url.query)), body)
+                except (ET.ParseError, KeyError, ValueError) as e:
+                    status, content_type, payload = 400, "text/plain", str(e)
+                data = payload.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = do_PATCH = _serve
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="fake-prestashop", daemon=True).start()
+        return f"http://{host}:{self._server.server_address[1]}"
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
@@ -0,0 +1,97 @@
+"""Piezas comunes de los benchmarks: arranca Odoo y PrestaShop falsos y apunta la API a ellos.
+
+La configuración de la API se lee del entorno al importar, así que hay que llamar a
+start_services() antes de load_app().
+"""
+import asyncio
+import math
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import httpx
+
+from fake_odoo import FakeOdoo, generate
+from fake_prestashop import FakePrestaShop
+
+
+def start_services(odoo_data=None, odoo_latency=0.0, shop_latency=0.0, shop_options=None, env=None):
+    odoo = FakeOdoo(odoo_data if odoo_data is not None else generate(), latency=odoo_latency)
+    shop = FakePrestaShop(latency=shop_latency, **(shop_options or {}))
+    state_dir = tempfile.mkdtemp(prefix="bench-")
+    os.environ.update({
+        "ODOO_URL": odoo.start(),
+        "ODOO_DB": odoo.db,
+        "ODOO_USER": odoo.login,
+        "ODOO_PASSWORD": odoo.password,
+        "PRESTASHOP_BASE_URL": shop.start(),
+        "PRESTASHOP_API_KEY": shop.api_key,
+        "SYNC_DB_PATH": os.path.join(state_dir, "sync_state.db"),
+        "CATALOG_DB_PATH": os.path.join(state_dir, "catalog_replica.db"),
+        **(env or {}),
+    })
+    return odoo, shop
+
+
+def load_app():
+    from repo_api_equipo_e.main import app
+    return app
+
+
+def api_client(app):
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api", timeout=None)
+
+
+def percentile(ordered, p):
+    if not ordered:
+        return float("nan")
+    k = max(0, math.ceil(p / 100 * len(ordered)) - 1)
+    return ordered[k]
+
+
+async def hammer(client, path, requests, concurrency, headers=None):
+    # carga en lazo cerrado: `concurrency` clientes lanzan peticiones hasta completar `requests`
+    latencies, errors = [], 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                r = await client.get(path, headers=headers)
+                await r.aread()
+                ok = r.status_code < 400 and not (
+                    r.headers.get("content-type", "").startswith("application/json")
+                    and isinstance(body := r.json(), dict) and body.get("status") == "error"
+                )
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "rps": requests / elapsed if elapsed else float("inf"),
+    }
+
+
+def print_table(rows):
+    print(f"{'endpoint':<48}{'req':>6}{'err':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}")
+    for name, s in rows:
+        print(
+            f"{name:<48}{s['requests']:>6}{s['errors']:>6}"
+            f"{s['p50'] * 1000:>10.1f}{s['p95'] * 1000:>10.1f}{s['p99'] * 1000:>10.1f}{s['rps']:>10.1f}"
+        )
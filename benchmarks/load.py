@@ -0,0 +1,72 @@
+"""Carga sobre los endpoints de lectura contra Odoo y PrestaShop falsos: p50/p95/p99 y req/s.
+
+    python benchmarks/load.py --requests 500 --concurrency 20 --odoo-latency 0.005 --shop-latency 0.005
+    python benchmarks/load.py --cold      # TTL 0 y sin réplica: cada petición llega a los orígenes
+"""
+import argparse
+import asyncio
+
+from harness import api_client, generate, hammer, load_app, print_table, start_services
+
+SCENARIOS = [
+    ("odoo", "/api/odoo/products?limit=100"),
+    ("odoo", "/api/odoo/products"),
+    ("odoo", "/api/odoo/productStock?limit=100"),
+    ("odoo", "/api/odoo/orders?limit=100"),
+    ("odoo", "/api/odoo/orders?state=sale"),
+    ("odoo", "/api/odoo/suppliers"),
+    ("odoo", "/api/odoo/productCategories"),
+    ("prestashop", "/api/prestashop/product"),
+    ("prestashop", "/api/prestashop/orders"),
+    ("prestashop", "/api/prestashop/customers"),
+    ("prestashop", "/api/prestashop/payments"),
+    ("prestashop", "/api/prestashop/order/ORD000042"),
+    ("prestashop", "/api/prestashop/suppliers/3"),
+]
+
+COLD_CACHE = {
+    **{
+        f"CACHE_TTL_{name}": "0"
+        for name in ("PRODUCT", "ORDER", "CUSTOMER", "PAYMENT", "SUPPLIER",
+                     "ODOO_PRODUCT", "ODOO_CATEGORY", "ODOO_SUPPLIER", "ODOO_STOCK", "ODOO_ORDER")
+    },
+    "CATALOG_REPLICA": "0",
+}
+
+
+async def run(args):
+    odoo, shop = start_services(
+        odoo_data=generate(products=args.products, orders=args.orders),
+        odoo_latency=args.odoo_latency,
+        shop_latency=args.shop_latency,
+        shop_options={"products": args.products, "orders": args.orders},
+        env=COLD_CACHE if args.cold else None,
+    )
+    app = load_app()
+    rows = []
+    async with app.router.lifespan_context(app):
+        async with api_client(app) as client:
+            for system, path in SCENARIOS:
+                if args.only and system != args.only:
+                    continue
+                await client.get(path)  # calentar conexiones y, si aplica, caché
+                rows.append((path, await hammer(client, path, args.requests, args.concurrency)))
+    print_table(rows)
+    print(f"\nllamadas a Odoo: {sum(odoo.calls.values())}   llamadas a PrestaShop: {sum(shop.calls.values())}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--odoo-latency", type=float, default=0.005, help="segundos por llamada XML-RPC")
+    parser.add_argument("--shop-latency", type=float, default=0.005, help="segundos por petición al webservice")
+    parser.add_argument("--cold", action="store_true", help="desactiva la caché de la API")
+    parser.add_argument("--only", choices=("odoo", "prestashop"))
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Serialización y compresión de un listado grande: antes (JSONResponse) y después (orjson + br/gzip).
+
+    python benchmarks/serialization.py --records 50000 --repeat 5
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+import httpx
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from repo_api_equipo_e.compression import ENCODERS, CompressionMiddleware
+from repo_api_equipo_e.responses import ORJSONResponse
+
+
+def synthetic_orders(n):
+    # forma parecida a /api/odoo/orders y /api/prestashop/customers
+    return [
+        {
+            "id": i,
+            "name": f"S{i:06d}",
+            "date_order": f"2024-{1 + i % 12:02d}-{1 + i % 28:02d} 10:{i % 60:02d}:00",
+            "state": ("draft", "sale", "done", "cancel")[i % 4],
+            "amount_total": round(i * 1.37, 2),
+            "partner_id": [i % 977, f"Cliente {i % 977} S.A. de C.V."],
+            "email": f"cliente{i % 977}@ejemplo.mx",
+            "note": "Entrega en almacén central, horario de 9 a 18 h",
+        }
+        for i in range(n)
+    ]
+
+
+def timed(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def build_app(response_class, compress):
+    app = FastAPI(default_response_class=response_class)
+    if compress:
+        app.add_middleware(CompressionMiddleware)
+    return app
+
+
+async def wire(app, payload, accept_encoding, repeat, direct=False):
+    # direct: el router devuelve la respuesta ya construida y FastAPI se salta jsonable_encoder
+    @app.get("/orders")
+    async def orders():
+        return ORJSONResponse(payload) if direct else payload
+
+    times, size = [], 0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            r = await client.get("/orders", headers={"Accept-Encoding": accept_encoding})
+            raw = await r.aread()
+            times.append(time.perf_counter() - start)
+            size = int(r.headers.get("content-length", len(raw)))
+            encoding = r.headers.get("content-encoding", "identity")
+    return statistics.median(times), size, encoding
+
+
+def row(label, seconds, size=None):
+    size_txt = f"{size / 1024:10.1f} KiB" if size is not None else ""
+    print(f"  {label:<48}{seconds * 1000:9.1f} ms {size_txt}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    payload = synthetic_orders(args.records)
+    print(f"{args.records} registros, mediana de {args.repeat} repeticiones\n")
+
+    print("Serialización (jsonable_encoder + render, como hace FastAPI):")
+    t, body = timed(lambda: JSONResponse(jsonable_encoder(payload)).body, args.repeat)
+    row("antes: JSONResponse (json)", t, len(body))
+    t, body = timed(lambda: ORJSONResponse(jsonable_encoder(payload)).body, args.repeat)
+    row("después: ORJSONResponse (orjson)", t, len(body))
+    t, _ = timed(lambda: JSONResponse(payload).body, args.repeat)
+    row("JSONResponse directo (solo json)", t)
+    t, _ = timed(lambda: ORJSONResponse(payload).body, args.repeat)
+    row("después: ORJSONResponse directo (solo orjson)", t)
+
+    print("\nCompresión del cuerpo:")
+    for name, encoder_class in ENCODERS.items():
+        def compress():
+            encoder = encoder_class()
+            return encoder.compress(body) + encoder.flush()
+        t, compressed = timed(compress, args.repeat)
+        row(f"{name} ({len(body) / len(compressed):.1f}x)", t, len(compressed))
+
+    print("\nPetición completa vía ASGI (bytes en el cable):")
+    cases = [
+        ("antes: JSONResponse", JSONResponse, False, "identity", False),
+        ("orjson por defecto", ORJSONResponse, True, "identity", False),
+        ("orjson directo", ORJSONResponse, True, "identity", True),
+        ("orjson directo + gzip", ORJSONResponse, True, "gzip", True),
+    ]
+    if "br" in ENCODERS:
+        cases.append(("orjson directo + br", ORJSONResponse, True, "br, gzip;q=0.8", True))
+    for label, response_class, compress, accept, direct in cases:
+        t, size, encoding = asyncio.run(wire(build_app(response_class, compress), payload, accept, args.repeat, direct))
+        row(f"{label} [{encoding}]", t, size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Lectura de XML de PrestaShop: antes (regex _tag/_records) y después (expat en una pasada).
+
+    python benchmarks/xml_parsing.py --records 1000 10000 --repeat 5
+
+Los documentos salen del PrestaShop falso de los benchmarks: listados de stock_availables y de
+productos (display=full, con descripciones en tres idiomas) y la respuesta de un POST de producto.
+"""
+import argparse
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from fake_prestashop import FakePrestaShop
+
+from repo_api_equipo_e.sync import STOCK_FIELD_NAMES, parse_stock_info
+from repo_api_equipo_e.xmlrecords import find_text, iter_records
+
+
+# ---------- antes: helpers de regex tal como estaban en sync.py ----------
+def _tag(xml, name):
+    m = re.search(rf"<{name}[^>]*>\s*(?:<!\[CDATA\[)?(.*?)(?:\]\]>)?\s*</{name}>", xml, re.S)
+    return m.group(1).strip() if m else None
+
+
+def _records(xml, name):
+    return (m.group(1) for m in re.finditer(rf"<{name}(?:\s[^>]*)?>(.*?)</{name}>", xml, re.S))
+
+
+def regex_stock(xml):
+    return [{
+        "id": _tag(b, "id"),
+        "id_product": _tag(b, "id_product"),
+        "id_product_attribute": _tag(b, "id_product_attribute") or "0",
+        "id_shop": _tag(b, "id_shop") or "1",
+        "id_shop_group": _tag(b, "id_shop_group") or "0",
+        "quantity": _tag(b, "quantity") or "0",
+        "depends_on_stock": _tag(b, "depends_on_stock") or "0",
+        "out_of_stock": _tag(b, "out_of_stock") or "2",
+    } for b in _records(xml, "stock_available")]
+
+
+def regex_products(xml):
+    return [(_tag(b, "id"), _tag(b, "reference"), _tag(b, "active")) for b in _records(xml, "product")]
+
+
+# ---------- documentos ----------
+def shop_with(n):
+    shop = FakePrestaShop(products=n, orders=0, customers=0, payments=0, suppliers=0)
+    for p in shop.data["products"].values():
+        for field in ("description", "description_short", "meta_description"):
+            p[field] = [{"id": str(lang), "value": "Lorem ipsum dolor sit amet " * 40} for lang in (1, 2, 3)]
+    return shop
+
+
+def listing(shop, resource, display):
+    query = {"display": display}
+    rows = list(shop.data[resource].values())
+    return shop._render(resource, shop._display(rows, query), query)[1]
+
+
+def timed(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+def peak(func):
+    # memoria máxima reservada durante la lectura (el documento ya está en memoria)
+    tracemalloc.start()
+    func()
+    _, top = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return top
+
+
+def row(label, seconds, base=None, memory=None):
+    ratio = f"{base / seconds:6.1f}x" if base else "       "
+    memory_txt = f"{memory / 1024 / 1024:9.1f} MiB" if memory is not None else ""
+    print(f"  {label:<44}{seconds * 1000:9.2f} ms {ratio}{memory_txt}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, nargs="+", default=[1_000, 10_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for n in args.records:
+        shop = shop_with(n)
+        stock_xml = listing(shop, "stock_availables", "[" + ",".join(STOCK_FIELD_NAMES) + "]")
+        products_xml = listing(shop, "products", "full")
+        print(f"\n{n} registros (stock {len(stock_xml) / 1024:.0f} KiB, productos {len(products_xml) / 1024:.0f} KiB),"
+              f" mediana de {args.repeat}")
+
+        print(" stock_availables (8 campos por registro):")
+        base, before = timed(lambda: regex_stock(stock_xml), args.repeat)
+        row("antes: _records + _tag por campo", base)
+        t, after = timed(lambda: [parse_stock_info(r) for r in iter_records(stock_xml, "stock_available", STOCK_FIELD_NAMES)], args.repeat)
+        row("después: iter_records", t, base)
+        assert before == after
+
+        print(" products display=full (id, reference, active), con memoria pico:")
+        parse_after = lambda: [(r.get("id"), r.get("reference"), r.get("active"))
+                               for r in iter_records(products_xml, "product", ("id", "reference", "active"))]
+        parse_tree = lambda: ET.fromstring(products_xml)
+        base, before = timed(lambda: regex_products(products_xml), args.repeat)
+        row("antes: _records + _tag por campo", base, memory=peak(lambda: regex_products(products_xml)))
+        t, after = timed(parse_after, args.repeat)
+        row("después: iter_records", t, base, peak(parse_after))
+        t, _ = timed(parse_tree, args.repeat)
+        row("árbol completo (ET.fromstring)", t, base, peak(parse_tree))
+        assert before == after
+
+    single = listing(shop_with(1), "products", "full")
+    print("\nRespuesta de un POST de producto (primer <id>), 10000 veces:")
+    base, before = timed(lambda: [_tag(single, "id") for _ in range(10_000)], args.repeat)
+    row("antes: _tag", base)
+    t, after = timed(lambda: [find_text(single, "id") for _ in range(10_000)], args.repeat)
+    row("después: find_text", t, base)
+    assert before == after
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from urllib.parse import unquote, urlsplit
+from dotenv import load_dotenv
+
+try:
+    import msgpack
+except ImportError:  # msgpack es opcional: sin él se serializa en JSON compacto
+    msgpack = None
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")  # memory | redis
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_REDIS_POOL_SIZE = int(os.getenv("CACHE_REDIS_POOL_SIZE", "10"))
+CACHE_REDIS_TIMEOUT = float(os.getenv("CACHE_REDIS_TIMEOUT", "0.5"))
+CACHE_NAMESPACE = os.getenv("CACHE_NAMESPACE", "repo-api")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))
+
+# segundos de vida por tipo de recurso
+CACHE_TTL = {
+    "product": float(os.getenv("CACHE_TTL_PRODUCT", "60")),
+    "order": float(os.getenv("CACHE_TTL_ORDER", "30")),
+    "customer": float(os.getenv("CACHE_TTL_CUSTOMER", "60")),
+    "payment": float(os.getenv("CACHE_TTL_PAYMENT", "60")),
+    "supplier": float(os.getenv("CACHE_TTL_SUPPLIER", "300")),
+    "odoo_product": float(os.getenv("CACHE_TTL_ODOO_PRODUCT", "60")),
+    "odoo_category": float(os.getenv("CACHE_TTL_ODOO_CATEGORY", "300")),
+    "odoo_supplier": float(os.getenv("CACHE_TTL_ODOO_SUPPLIER", "300")),
+    "odoo_stock": float(os.getenv("CACHE_TTL_ODOO_STOCK", "10")),
+    "odoo_order": float(os.getenv("CACHE_TTL_ODOO_ORDER", "30")),
+    "catalog_view": float(os.getenv("CACHE_TTL_CATALOG_VIEW", "30")),
+}
+
+_MISSING = object()
+
+
+def successful(envelope):
+    # solo se cachean respuestas buenas; los errores se vuelven a consultar
+    return isinstance(envelope, dict) and envelope.get("status") == "success"
+
+
+def always(value):
+    return True
+
+
+def dumps(value) -> bytes:
+    if msgpack is not None:
+        return msgpack.packb(value, use_bin_type=True)
+    return json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def loads(raw: bytes):
+    if msgpack is not None:
+        return msgpack.unpackb(raw, raw=False)
+    return json.loads(raw)
+
+
+# ---------- BACKENDS ----------
+# Interfaz común, asíncrona: get(clave) -> valor | _MISSING, set(clave, valor, ttl), delete(clave)
+
+class MemoryBackend:
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # clave -> (expira, valor)
+
+    async def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        expires, value = entry
+        if expires <= time.monotonic():
+            del self._entries[key]
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key, value, ttl):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key):
+        self._entries.pop(key, None)
+
+    async def close(self):
+        self._entries.clear()
+
+
+class RedisError(Exception):
+    pass
+
+
+def _encode_command(args):
+    out = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode("utf-8")
+        out.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(out)
+
+
+async def _read_reply(reader):
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("Redis cerró la conexión")
+    kind, rest = line[:1], line[1:-2]
+    if kind == b"+":
+        return rest
+    if kind == b"-":
+        raise RedisError(rest.decode("utf-8", "replace"))
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        size = int(rest)
+        if size < 0:
+            return None
+        data = await reader.readexactly(size + 2)
+        return data[:-2]
+    if kind == b"*":
+        size = int(rest)
+        return None if size < 0 else [await _read_reply(reader) for _ in range(size)]
+    raise RedisError(f"Respuesta RESP desconocida: {line!r}")
+
+
+# Cliente mínimo del protocolo Redis (RESP2): vale para Redis, Valkey, KeyDB o un doble local
+class RedisBackend:
+    def __init__(self, url=CACHE_REDIS_URL, pool_size=CACHE_REDIS_POOL_SIZE, timeout=CACHE_REDIS_TIMEOUT):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "localhost"
+        self.port = parts.port or 6379
+        self.password = unquote(parts.password) if parts.password else None
+        self.db = int(parts.path.strip("/") or 0)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle = []
+        # cota de conexiones abiertas (en uso + libres): con muchos fallos de caché a la vez
+        # se espera turno en lugar de abrir un socket por petición
+        self._slots = asyncio.Semaphore(pool_size)
+
+    async def _connect(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        conn = (reader, writer)
+        if self.password:
+            await self._send(conn, "AUTH", self.password)
+        if self.db:
+            await self._send(conn, "SELECT", self.db)
+        return conn
+
+    async def _send(self, conn, *args):
+        reader, writer = conn
+        writer.write(_encode_command(args))
+        await writer.drain()
+        return await _read_reply(reader)
+
+    async def _execute(self, *args):
+        async with self._slots:
+            conn = self._idle.pop() if self._idle else await self._connect()
+            try:
+                reply = await self._send(conn, *args)
+            except RedisError:
+                self._idle.append(conn)
+                raise
+            except BaseException:
+                # conexión a medias: no se puede reutilizar
+                conn[1].close()
+                raise
+            self._idle.append(conn)
+            return reply
+
+    async def command(self, *args):
+        return await asyncio.wait_for(self._execute(*args), self.timeout)
+
+    async def get(self, key):
+        raw = await self.command("GET", key)
+        return _MISSING if raw is None else loads(raw)
+
+    async def set(self, key, value, ttl):
+        await self.command("SET", key, dumps(value), "PX", max(1, int(ttl * 1000)))
+
+    async def delete(self, key):
+        await self.command("DEL", key)
+
+    async def close(self):
+        while self._idle:
+            self._idle.pop()[1].close()
+
+
+# ---------- CACHÉ ----------
+# Fachada común: espacio de nombres en las claves, TTL por recurso y single-flight
+# (las peticiones concurrentes a una misma clave ausente comparten una sola carga).
+# Si el backend falla (también una respuesta cortada: IncompleteReadError es un EOFError)
+# se trata como un fallo de caché: la API sigue respondiendo
+class Cache:
+    def __init__(self, backend, namespace=CACHE_NAMESPACE):
+        self.backend = backend
+        self.namespace = namespace
+        self._inflight = {}  # clave -> (token, future)
+
+    def _key(self, key):
+        parts = key if isinstance(key, tuple) else (key,)
+        return ":".join([self.namespace, *(str(p) for p in parts)])
+
+    async def get(self, key):
+        try:
+            return await self.backend.get(self._key(key))
+        except (OSError, EOFError, asyncio.TimeoutError, RedisError, ValueError) as e:
+            logger.warning(f"Caché no disponible (get): {e}")
+            return _MISSING
+
+    async def set(self, key, value, ttl):
+        try:
+            await self.backend.set(self._key(key), value, ttl)
+        except (OSError, EOFError, asyncio.TimeoutError, RedisError, TypeError, ValueError) as e:
+            logger.warning(f"Caché no disponible (set): {e}")
+
+    async def invalidate(self, key):
+        # una carga en curso puede traer el dato viejo: que no llegue a guardarse
+        self._inflight.pop(self._key(key), None)
+        try:
+            await self.backend.delete(self._key(key))
+        except (OSError, EOFError, asyncio.TimeoutError, RedisError) as e:
+            logger.warning(f"Caché no disponible (delete): {e}")
+
+    async def get_or_load(self, key, loader, ttl, cache_if=successful):
+        value = await self.get(key)
+        if value is not _MISSING:
+            return value
+
+        full_key = self._key(key)
+        inflight = self._inflight.get(full_key)
+        if inflight is None:
+            token = object()
+            future = asyncio.ensure_future(self._load(key, full_key, token, loader, ttl, cache_if))
+            self._inflight[full_key] = (token, future)
+        else:
+            future = inflight[1]
+        # shield: si un cliente se desconecta, la carga sigue para los demás
+        return await asyncio.shield(future)
+
+    async def _load(self, key, full_key, token, loader, ttl, cache_if):
+        try:
+            value = await loader()
+            current = self._inflight.get(full_key)
+            if current is not None and current[0] is token and cache_if(value):
+                await self.set(key, value, ttl)
+            return value
+        finally:
+            current = self._inflight.get(full_key)
+            if current is not None and current[0] is token:
+                del self._inflight[full_key]
+
+    async def close(self):
+        await self.backend.close()
+
+
+def create_backend(kind=CACHE_BACKEND, max_entries=CACHE_MAX_ENTRIES, redis_url=CACHE_REDIS_URL):
+    if kind == "redis":
+        return RedisBackend(redis_url)
+    if kind == "memory":
+        return MemoryBackend(max_entries)
+    raise ValueError(f"CACHE_BACKEND desconocido: {kind}")
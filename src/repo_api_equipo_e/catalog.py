@@ -0,0 +1,305 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import suppress
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CATALOG_DB_PATH = os.getenv("CATALOG_DB_PATH", "catalog_replica.db")
+CATALOG_REPLICA = os.getenv("CATALOG_REPLICA", "1") == "1"
+# refresco incremental por write_date cada N segundos; completo (detecta borrados) cada M
+CATALOG_REFRESH_INTERVAL = float(os.getenv("CATALOG_REFRESH_INTERVAL", "30"))
+CATALOG_FULL_REFRESH_INTERVAL = float(os.getenv("CATALOG_FULL_REFRESH_INTERVAL", "3600"))
+# cota de frescura: si el último refresco correcto es más antiguo, se lee Odoo en vivo
+CATALOG_MAX_AGE = float(os.getenv("CATALOG_MAX_AGE", "120"))
+CATALOG_BATCH_SIZE = int(os.getenv("CATALOG_BATCH_SIZE", "500"))
+
+MODEL = "product.product"
+# el precio vive en product.template y la cantidad en stock.quant: sus write_date también cuentan
+WATERMARK_MODELS = ("product.product", "product.template", "stock.quant")
+CATALOG_FIELDS = ["id", "name", "default_code", "list_price", "qty_available", "write_date"]
+# campos con columna propia: se pueden filtrar y ordenar en SQL
+COLUMNS = ("id", "name", "default_code", "list_price", "qty_available", "write_date")
+# ilike con py_lower: LIKE de SQLite solo ignora mayúsculas en ASCII ("Ñ", "É" no casarían)
+OPERATORS = {"=": "{} = ?", "ilike": "py_lower({}) LIKE py_lower(?) ESCAPE '\\'", ">=": "{} >= ?", "<=": "{} <= ?", ">": "{} > ?", "<": "{} < ?"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalog_products (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    default_code TEXT,
+    list_price REAL,
+    qty_available REAL,
+    write_date TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS catalog_products_default_code ON catalog_products (default_code);
+CREATE INDEX IF NOT EXISTS catalog_products_write_date ON catalog_products (write_date);
+CREATE TABLE IF NOT EXISTS catalog_meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+# Dominio de Odoo que la réplica no sabe traducir a SQL: se lee en vivo
+class UnsupportedDomain(Exception):
+    pass
+
+
+def _column(value):
+    # Odoo devuelve False en los campos vacíos
+    return None if value is False else value
+
+
+def _lower(value):
+    return value.lower() if isinstance(value, str) else value
+
+
+def _like(value):
+    return "%" + value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _where(domain):
+    # solo conjunciones de (campo, operador, valor) sobre columnas propias
+    clauses, params = [], []
+    for term in domain:
+        if not isinstance(term, (list, tuple)) or len(term) != 3:
+            raise UnsupportedDomain(term)
+        field, operator, value = term
+        if field not in COLUMNS or operator not in OPERATORS:
+            raise UnsupportedDomain(term)
+        if operator == "=" and _column(value) is None:
+            # ("campo", "=", False) es "sin valor" en Odoo: en la réplica es NULL
+            clauses.append(f"{field} IS NULL")
+            continue
+        clauses.append(OPERATORS[operator].format(field))
+        params.append(_like(value) if operator == "ilike" else value)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _order(order):
+    # "name desc, id" -> "name DESC NULLS FIRST, id ASC NULLS LAST"; los vacíos van donde los pone
+    # PostgreSQL (al final en ASC, al principio en DESC) y siempre se desempata por id como Odoo
+    if not order:
+        return " ORDER BY id"
+    parts = []
+    for item in order.split(","):
+        field, _, direction = item.strip().partition(" ")
+        if field not in COLUMNS:
+            raise UnsupportedDomain(order)
+        parts.append(f"{field} DESC NULLS FIRST" if direction.strip().lower() == "desc" else f"{field} ASC NULLS LAST")
+    if not any(p.startswith("id ") for p in parts):
+        parts.append("id ASC NULLS LAST")
+    return " ORDER BY " + ", ".join(parts)
+
+
+# Copia local de product.product, indexada por default_code
+class CatalogReplica:
+    def __init__(self, path=CATALOG_DB_PATH):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        self._conn.create_function("py_lower", 1, _lower, deterministic=True)
+
+    def _meta(self, name):
+        row = self._conn.execute("SELECT value FROM catalog_meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, name, value):
+        self._conn.execute(
+            "INSERT INTO catalog_meta (name, value) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+            (name, str(value)),
+        )
+
+    def meta(self, name):
+        with self._lock:
+            return self._meta(name)
+
+    def age(self):
+        # segundos desde el último refresco correcto (de cualquier proceso), o None
+        refreshed = self.meta("refreshed_at")
+        return time.time() - float(refreshed) if refreshed else None
+
+    def is_fresh(self, max_age=CATALOG_MAX_AGE):
+        age = self.age()
+        return CATALOG_REPLICA and age is not None and age <= max_age
+
+    def version(self):
+        # cambia con cada refresco que modifica filas: sirve para el ETag
+        return self.meta("version") or "0"
+
+    # ---------- escritura ----------
+    def _write(self, rows, removed_ids, watermark, full):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                before = self._conn.total_changes
+                if full:
+                    self._conn.execute("DELETE FROM catalog_products")
+                self._conn.executemany(
+                    "DELETE FROM catalog_products WHERE id = ?", [(i,) for i in removed_ids]
+                )
+                self._conn.executemany(
+                    "INSERT INTO catalog_products (id, name, default_code, list_price, qty_available, write_date, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(id) DO UPDATE SET "
+                    "name = excluded.name, default_code = excluded.default_code, list_price = excluded.list_price, "
+                    "qty_available = excluded.qty_available, write_date = excluded.write_date, data = excluded.data "
+                    "WHERE data != excluded.data",
+                    [
+                        (r["id"], _column(r.get("name")), _column(r.get("default_code")), _column(r.get("list_price")),
+                         _column(r.get("qty_available")), _column(r.get("write_date")),
+                         json.dumps({f: r.get(f) for f in CATALOG_FIELDS}))
+                        for r in rows
+                    ],
+                )
+                if self._conn.total_changes != before:
+                    self._set_meta("version", int(self._meta("version") or 0) + 1)
+                if watermark:
+                    self._set_meta("watermark", watermark)
+                if full:
+                    self._set_meta("full_refreshed_at", now)
+                self._set_meta("refreshed_at", now)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def replace_all(self, rows, watermark):
+        self._write(rows, (), watermark, full=True)
+
+    def upsert(self, rows, removed_ids, watermark):
+        self._write(rows, removed_ids, watermark, full=False)
+
+    # ---------- lectura ----------
+    def lookup(self, default_code):
+        # mismo formato que search_read([("default_code", "=", ref)])
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM catalog_products WHERE default_code = ? ORDER BY id", (default_code,)
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def count(self, domain):
+        where, params = _where(domain)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM catalog_products{where}", params).fetchone()[0]
+
+    def search_read(self, domain, kwargs):
+        # kwargs como los de search_read de Odoo: fields, order, limit, offset
+        where, params = _where(domain)
+        sql = f"SELECT data FROM catalog_products{where}{_order(kwargs.get('order'))}"
+        if kwargs.get("limit") or kwargs.get("offset"):
+            sql += " LIMIT ? OFFSET ?"
+            params = params + [kwargs.get("limit") or -1, kwargs.get("offset") or 0]
+        fields = kwargs.get("fields")
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        records = (json.loads(r[0]) for r in rows)
+        if not fields:
+            return list(records)
+        # como Odoo: el id siempre viaja y los campos sin valor son False
+        return [{f: record.get(f, False) for f in dict.fromkeys(["id", *fields])} for record in records]
+
+    def iter_search_read(self, domain, kwargs, batch_size=CATALOG_BATCH_SIZE):
+        # por bloques, para el NDJSON: el lock no se retiene durante todo el stream
+        offset = kwargs.get("offset") or 0
+        remaining = kwargs.get("limit")
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            rows = self.search_read(domain, {**kwargs, "limit": size, "offset": offset})
+            yield from rows
+            if len(rows) < size:
+                return
+            offset += size
+            if remaining is not None:
+                remaining -= size
+
+
+# Refresco periódico de la réplica desde Odoo. Con varios procesos comparten el fichero:
+# el que encuentra la réplica recién refrescada por otro se salta su turno
+class CatalogRefresher:
+    def __init__(self, replica, odoo, interval=CATALOG_REFRESH_INTERVAL, full_interval=CATALOG_FULL_REFRESH_INTERVAL):
+        self._replica = replica
+        self._odoo = odoo
+        self._interval = interval
+        self._full_interval = full_interval
+        self._task = None
+
+    def start(self):
+        if CATALOG_REPLICA:
+            self._task = asyncio.create_task(self._loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+
+    async def _loop(self):
+        while True:
+            age = self._replica.age()
+            if age is not None and age < self._interval:
+                await asyncio.sleep(self._interval - age)
+                continue
+            try:
+                await self.refresh()
+            except Exception:
+                # la réplica envejece y, pasada la cota de frescura, las lecturas van a Odoo
+                logger.exception("No se pudo refrescar la réplica del catálogo")
+            await asyncio.sleep(self._interval)
+
+    async def _high_watermark(self):
+        # la marca se toma ANTES de leer: lo que cambie durante el refresco entra en el siguiente
+        rows = await asyncio.gather(*(
+            self._odoo.execute_kw(m, "search_read", [[]], {"fields": ["write_date"], "order": "write_date desc", "limit": 1})
+            for m in WATERMARK_MODELS
+        ))
+        return max((r[0]["write_date"] for r in rows if r), default=None)
+
+    async def refresh(self, full=False):
+        watermark = await self._high_watermark()
+        since = self._replica.meta("watermark")
+        full_at = self._replica.meta("full_refreshed_at")
+        if full or since is None or full_at is None or time.time() - float(full_at) >= self._full_interval:
+            rows = await self._odoo.execute_kw(MODEL, "search_read", [[]], {"fields": CATALOG_FIELDS})
+            await asyncio.to_thread(self._replica.replace_all, rows, watermark)
+            return len(rows)
+
+        # incremental: variantes tocadas directamente, por su plantilla o por movimientos de stock.
+        # active_test=False para ver también las archivadas y sacarlas de la réplica
+        context = {"context": {"active_test": False}}
+        products, templates, quants = await asyncio.gather(
+            self._odoo.execute_kw(MODEL, "search", [[("write_date", ">=", since)]], context),
+            self._odoo.execute_kw("product.template", "search_read", [[("write_date", ">=", since)]],
+                                  {"fields": ["product_variant_ids"], **context}),
+            self._odoo.execute_kw("stock.quant", "search_read", [[("write_date", ">=", since)]], {"fields": ["product_id"]}),
+        )
+        ids = set(products)
+        for t in templates:
+            ids.update(t["product_variant_ids"])
+        for q in quants:
+            if q["product_id"]:
+                ids.add(q["product_id"][0])
+
+        rows = []
+        if ids:
+            rows = await self._odoo.execute_kw(
+                MODEL, "search_read", [[("id", "in", sorted(ids))]], {"fields": CATALOG_FIELDS + ["active"], **context}
+            )
+        removed = [r["id"] for r in rows if r.get("active") is False]
+        found = {r["id"] for r in rows}
+        removed += [i for i in ids if i not in found]
+        await asyncio.to_thread(self._replica.upsert, [r for r in rows if r.get("active") is not False], removed, watermark)
+        return len(rows)
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import os
+import httpx
+from dotenv import load_dotenv
+from repo_api_equipo_e.metrics import UPSTREAM_COALESCED
+
+load_dotenv()
+
+# Lecturas idénticas y simultáneas a un origen comparten una sola llamada: la primera la hace
+# y las que llegan mientras está en curso esperan su resultado (o su excepción). No guarda nada
+# al terminar, así que no sirve datos viejos: es independiente de la caché
+UPSTREAM_COALESCING = os.getenv("UPSTREAM_COALESCING", "1") == "1"
+
+# métodos de Odoo sin efectos: solo estos se agrupan
+ODOO_READ_METHODS = frozenset({
+    "search", "search_read", "search_count", "read", "read_group", "name_search", "name_get", "fields_get",
+})
+
+
+class _Call:
+    def __init__(self, future):
+        self.future = future
+        self.callers = 1
+
+
+class Coalescer:
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}  # clave -> _Call
+
+    async def run(self, key, loader, share=None):
+        # share(valor): copia que recibe cada llamante cuando la llamada se compartió, para que
+        # ninguno vea lo que otro modifique
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(self._load(key, loader)))
+            self._calls[key] = call
+        else:
+            call.callers += 1
+            UPSTREAM_COALESCED.inc(self.name)
+        # shield: si un llamante se cancela (cliente desconectado), la llamada sigue para los demás
+        value = await asyncio.shield(call.future)
+        # la clave ya se soltó al acabar _load: callers es definitivo
+        return share(value) if share is not None and call.callers > 1 else value
+
+    async def _load(self, key, loader):
+        try:
+            return await loader()
+        finally:
+            del self._calls[key]
+
+
+def odoo_call_key(model, method, args, kwargs):
+    # None si la llamada no se puede agrupar (escrituras o argumentos no serializables)
+    if method not in ODOO_READ_METHODS:
+        return None
+    try:
+        return model, method, json.dumps([args, kwargs or {}], sort_keys=True)
+    except (TypeError, ValueError):
+        return None
+
+
+# Transporte httpx que agrupa los GET idénticos (misma URL, parámetros y cabeceras). Va por
+# fuera de GuardedTransport: los que esperan no ocupan hueco de concurrencia ni token de ritmo
+class CoalescingTransport(httpx.AsyncBaseTransport):
+    def __init__(self, name, transport: httpx.AsyncBaseTransport):
+        self._coalescer = Coalescer(name)
+        self._transport = transport
+
+    async def _fetch(self, request):
+        response = await self._transport.handle_async_request(request)
+        try:
+            # el cuerpo tal como llega (sin descomprimir): cada llamante lo decodifica en su respuesta
+            body = b"".join([chunk async for chunk in response.stream])
+        finally:
+            await response.stream.aclose()
+        extensions = {k: v for k, v in response.extensions.items() if k in ("http_version", "reason_phrase")}
+        return response.status_code, response.headers.raw, body, extensions
+
+    async def handle_async_request(self, request):
+        if request.method != "GET" or not UPSTREAM_COALESCING:
+            return await self._transport.handle_async_request(request)
+        key = (str(request.url), tuple(request.headers.raw))
+        status_code, headers, body, extensions = await self._coalescer.run(key, lambda: self._fetch(request))
+        return httpx.Response(status_code, headers=headers, stream=httpx.ByteStream(body), extensions=extensions)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
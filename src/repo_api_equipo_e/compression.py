@@ -0,0 +1,161 @@
+import asyncio
+import os
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from dotenv import load_dotenv
+from repo_api_equipo_e.conditional import encoded_etag
+
+try:
+    import brotli
+except ImportError:  # sin brotli se negocia solo gzip
+    brotli = None
+
+load_dotenv()
+
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+# por encima de este tamaño se comprime en un hilo para no bloquear el event loop
+COMPRESS_THREAD_MIN_SIZE = int(os.getenv("COMPRESS_THREAD_MIN_SIZE", str(128 * 1024)))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "application/xml", "text/")
+
+
+class _Gzip:
+    def __init__(self, level=COMPRESS_GZIP_LEVEL):
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = formato gzip
+
+    def compress(self, data):
+        return self._z.compress(data)
+
+    def flush(self):
+        return self._z.flush()
+
+
+class _Brotli:
+    def __init__(self, quality=COMPRESS_BROTLI_QUALITY):
+        self._b = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._b.process(data)
+
+    def flush(self):
+        return self._b.finish()
+
+
+ENCODERS = {"gzip": _Gzip}
+if brotli is not None:
+    ENCODERS["br"] = _Brotli
+
+
+def choose_encoding(accept_encoding: str):
+    # Accept-Encoding con pesos q; a igual peso se prefiere br (comprime más a igual coste)
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for name in ("br", "gzip"):
+        if name not in ENCODERS:
+            continue
+        q = weights.get(name, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+async def _run(func, data):
+    if len(data) >= COMPRESS_THREAD_MIN_SIZE:
+        return await asyncio.to_thread(func, data)
+    return func(data)
+
+
+# Middleware ASGI: comprime JSON/NDJSON/XML con br o gzip según lo que acepte el cliente.
+# Las respuestas pequeñas salen tal cual; las que van por streaming se comprimen trozo a trozo
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size=COMPRESS_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        encoder = None
+        started = False
+
+        async def send_compressed(message):
+            nonlocal start, encoder, started
+            if message["type"] == "http.response.start":
+                # se retiene hasta ver el primer trozo del cuerpo
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more = message.get("more_body", False)
+
+            if not started:
+                started = True
+                headers = MutableHeaders(raw=start["headers"])
+                content_type = headers.get("content-type", "")
+                # con codificación negociada el ETag lleva su sufijo, también en los 304 y en las
+                # respuestas pequeñas que salen sin comprimir: así nunca comparten validador dos
+                # representaciones con bytes distintos (RFC 9110) y el 304 repite el ETag del 200
+                etag = headers.get("etag")
+                if etag and "content-encoding" not in headers and (
+                    start["status"] == 304 or content_type.startswith(COMPRESSIBLE_TYPES)
+                ):
+                    headers["ETag"] = encoded_etag(etag, encoding)
+                if "content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    await send(start)
+                    await send(message)
+                    return
+                headers.add_vary_header("Accept-Encoding")
+                if not more and len(body) < self.minimum_size:
+                    await send(start)
+                    await send(message)
+                    return
+
+                encoder = ENCODERS[encoding]()
+                headers["Content-Encoding"] = encoding
+                if not more:
+                    compressed = await _run(lambda data: encoder.compress(data) + encoder.flush(), body)
+                    headers["Content-Length"] = str(len(compressed))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                # streaming: la longitud final no se conoce
+                del headers["Content-Length"]
+                await send(start)
+            elif encoder is None:
+                await send(message)
+                return
+
+            chunk = await _run(encoder.compress, body) if body else b""
+            if not more:
+                chunk += encoder.flush()
+            if chunk or not more:
+                await send({"type": "http.response.body", "body": chunk, "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
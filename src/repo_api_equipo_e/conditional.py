@@ -0,0 +1,68 @@
+import hashlib
+import json
+from fastapi import Request, Response
+from repo_api_equipo_e.responses import dumps
+
+
+def render_json(value) -> str:
+    # mismo formato que ORJSONResponse; se guarda ya serializado para no repetirlo en cada petición
+    return dumps(value).decode("utf-8")
+
+
+def etag_for(*parts) -> str:
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return '"' + hashlib.sha1(raw.encode("utf-8")).hexdigest() + '"'
+
+
+def content_etag(body: str) -> str:
+    return '"' + hashlib.sha1(body.encode("utf-8")).hexdigest() + '"'
+
+
+# codificaciones que CompressionMiddleware anota en el ETag
+ETAG_ENCODINGS = ("gzip", "br")
+
+
+def encoded_etag(etag, encoding) -> str:
+    # cada representación comprimida lleva su propio validador: "x" -> "x-gzip"
+    return etag[:-1] + f'-{encoding}"'
+
+
+def _identity_etag(tag) -> str:
+    for encoding in ETAG_ENCODINGS:
+        if tag.endswith(f'-{encoding}"'):
+            return tag[:-len(encoding) - 2] + '"'
+    return tag
+
+
+def etag_matches(request: Request, etag) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header or not etag:
+        return False
+    if header.strip() == "*":
+        return True
+    # comparación débil (RFC 9110): W/"x" equivale a "x"; "x-gzip" y "x-br" son "x" comprimido
+    return any(_identity_etag(tag.strip().removeprefix("W/")) == etag for tag in header.split(","))
+
+
+# 304 sin cuerpo si el cliente ya tiene esta versión; si no, el JSON ya serializado
+def conditional_response(request: Request, body: str, etag=None, headers=None):
+    headers = dict(headers or {})
+    if etag:
+        headers["ETag"] = etag
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def render_envelope(loader):
+    # el sobre ya serializado y con su ETag (hash del contenido): se cachea así y cada
+    # petición lo devuelve tal cual, sin jsonable_encoder ni volver a serializar
+    envelope = await loader()
+    body = render_json(envelope)
+    return {"status": envelope["status"], "etag": content_etag(body), "body": body}
+
+
+def rendered_response(request: Request, rendered):
+    # solo las respuestas buenas llevan ETag
+    etag = rendered["etag"] if rendered["status"] == "success" else None
+    return conditional_response(request, rendered["body"], etag)
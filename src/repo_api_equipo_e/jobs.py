@@ -0,0 +1,193 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import suppress
+from datetime import datetime, timezone
+from repo_api_equipo_e.upstream import UpstreamUnavailable
+
+logger = logging.getLogger(__name__)
+
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "5"))
+JOB_HEARTBEAT = float(os.getenv("JOB_HEARTBEAT", "5"))
+# un trabajo "running" sin latido en este tiempo se da por huérfano (proceso caído) y se retoma
+JOB_STALE_AFTER = float(os.getenv("JOB_STALE_AFTER", "30"))
+JOB_CHECKPOINT_EVERY = int(os.getenv("JOB_CHECKPOINT_EVERY", "200"))
+JOB_CHECKPOINT_SECONDS = float(os.getenv("JOB_CHECKPOINT_SECONDS", "1"))
+
+FINISHED = ("done", "failed")
+
+# tipo de trabajo -> async handler(job, tenant)
+HANDLERS = {}
+
+
+def job_handler(kind):
+    def register(handler):
+        HANDLERS[kind] = handler
+        return handler
+    return register
+
+
+# Fallo esperado del trabajo: se guarda el mensaje, sin traza en el log
+class JobError(Exception):
+    pass
+
+
+# Estado en memoria de un trabajo en ejecución. Los elementos se procesan en paralelo pero
+# solo se confirma el prefijo contiguo ya terminado: el cursor guardado nunca salta
+# elementos pendientes y los contadores persistidos cuadran con él
+class Job:
+    def __init__(self, store, row):
+        self._store = store
+        self.id = row["id"]
+        self.kind = row["kind"]
+        self.params = row["params"]
+        self.total = row["total"]
+        self.processed = row["processed"]
+        self.counters = row["counters"]
+        self.cursor = row["cursor"]
+        self._ready = {}
+        self._next = 0
+        self._errors = []
+        self._dirty = False
+        self._flushed_processed = self.processed
+        self._flushed_at = time.monotonic()
+
+    def save_params(self):
+        self._store.set_job_params(self.id, self.params)
+
+    def set_total(self, total):
+        self.total = total
+        self._dirty = True
+
+    def done(self, index, cursor, counters, errors=()):
+        # index: posición del elemento en la lista de esta ejecución (empieza en 0)
+        self._ready[index] = (cursor, counters, errors)
+        while self._next in self._ready:
+            cursor, counters, errors = self._ready.pop(self._next)
+            self._next += 1
+            self.processed += 1
+            self.cursor = cursor
+            for key, amount in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + amount
+            self._errors.extend(errors)
+            self._dirty = True
+        if (self.processed - self._flushed_processed >= JOB_CHECKPOINT_EVERY
+                or time.monotonic() - self._flushed_at >= JOB_CHECKPOINT_SECONDS):
+            self.checkpoint()
+
+    def checkpoint(self):
+        if not self._dirty:
+            return
+        self._store.checkpoint_job(self.id, self.total, self.processed, self.counters, self.cursor, self._errors)
+        self._errors = []
+        self._dirty = False
+        self._flushed_processed = self.processed
+        self._flushed_at = time.monotonic()
+
+
+# Un worker por proceso y tenant: toma trabajos de su SQLite de uno en uno. POST despierta al worker;
+# el sondeo periódico recoge los que quedaron de un reinicio o de otro proceso caído
+class JobRunner:
+    def __init__(self, store, tenant, poll_interval=JOB_POLL_INTERVAL):
+        self._store = store
+        self._tenant = tenant
+        self._poll_interval = poll_interval
+        self._wake = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    def wake(self):
+        self._wake.set()
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+
+    async def _loop(self):
+        while True:
+            try:
+                row = self._store.claim_job(JOB_STALE_AFTER)
+            except Exception:
+                logger.exception("No se pudo leer la cola de trabajos")
+                row = None
+            if row is None:
+                self._wake.clear()
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wake.wait(), self._poll_interval)
+                continue
+            retry_after = await self._run(row)
+            if retry_after:
+                await asyncio.sleep(retry_after)
+
+    async def _heartbeat(self, job_id):
+        while True:
+            await asyncio.sleep(JOB_HEARTBEAT)
+            self._store.heartbeat_job(job_id)
+
+    async def _run(self, row):
+        # devuelve los segundos a esperar antes de tomar otro trabajo (origen no disponible)
+        job = Job(self._store, row)
+        heartbeat = asyncio.create_task(self._heartbeat(job.id))
+        try:
+            handler = HANDLERS.get(job.kind)
+            if handler is None:
+                raise JobError(f"Tipo de trabajo desconocido: {job.kind}")
+            await handler(job, self._tenant)
+        except asyncio.CancelledError:
+            job.checkpoint()
+            self._store.requeue_job(job.id)
+            raise
+        except UpstreamUnavailable as e:
+            # se pausa, no se da por fallido: vuelve a la cola y se retoma desde el cursor
+            logger.warning(f"Trabajo {job.id} ({job.kind}) en pausa: {e}")
+            job.checkpoint()
+            self._store.requeue_job(job.id)
+            return e.retry_after
+        except JobError as e:
+            job.checkpoint()
+            self._store.finish_job(job.id, "failed", str(e))
+        except Exception as e:
+            logger.exception(f"Trabajo {job.id} ({job.kind}) fallido")
+            job.checkpoint()
+            self._store.finish_job(job.id, "failed", repr(e))
+        else:
+            job.checkpoint()
+            self._store.finish_job(job.id, "done")
+        finally:
+            heartbeat.cancel()
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat() if timestamp else None
+
+
+def job_snapshot(row, now=None):
+    # rendimiento de la ejecución actual (tras un reinicio no cuenta lo hecho antes)
+    now = now or time.time()
+    end = row["finished_at"] or now
+    throughput = None
+    eta = None
+    if row["run_started_at"] and end > row["run_started_at"]:
+        throughput = (row["processed"] - row["run_processed"]) / (end - row["run_started_at"])
+        if row["status"] == "running" and throughput > 0 and row["total"] is not None:
+            eta = max(row["total"] - row["processed"], 0) / throughput
+    return {
+        "job_id": row["id"],
+        "kind": row["kind"],
+        "status": row["status"],
+        "params": row["params"],
+        "total": row["total"],
+        "processed": row["processed"],
+        "counters": row["counters"],
+        "throughput_per_second": round(throughput, 2) if throughput is not None else None,
+        "eta_seconds": round(eta, 1) if eta is not None else None,
+        "error": row["error"],
+        "created_at": _iso(row["created_at"]),
+        "started_at": _iso(row["started_at"]),
+        "finished_at": _iso(row["finished_at"]),
+    }
@@ -1,6 +1,43 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from repo_api_equipo_e.compression import CompressionMiddleware
+from repo_api_equipo_e.metrics import TimingMiddleware, metrics_response
+from repo_api_equipo_e.responses import ORJSONResponse
 from repo_api_equipo_e.routers.api import router as api_router
+from repo_api_equipo_e.tenants import TenantMiddleware, TenantRegistry, UnknownTenant, load_tenant_config, tenant_error
+from repo_api_equipo_e.upstream import UpstreamUnavailable, upstream_error
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # un juego de clientes, caché, réplica y cola de trabajos por tenant
+    app.state.tenants = TenantRegistry(load_tenant_config())
+    app.state.tenants.start()
+    try:
+        yield
+    finally:
+        await app.state.tenants.close()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(TimingMiddleware)
+app.add_middleware(TenantMiddleware)
 
 app.include_router(api_router)
+
+
+@app.exception_handler(UnknownTenant)
+async def unknown_tenant(request, exc):
+    return ORJSONResponse(tenant_error(exc))
+
+
+# circuito abierto o origen saturado: se responde al momento en lugar de esperar al timeout
+@app.exception_handler(UpstreamUnavailable)
+async def upstream_unavailable(request, exc):
+    return ORJSONResponse(upstream_error(exc))
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return metrics_response()
@@ -0,0 +1,258 @@
+import bisect
+import threading
+import time
+import xmlrpc.client
+from fastapi.responses import PlainTextResponse
+
+# Métricas en memoria del proceso, expuestas en /metrics con el formato de texto de Prometheus.
+# Con varios workers cada uno tiene las suyas: Prometheus las agrega por instancia
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        with self._lock:
+            values = list(self._values.items())
+        return self._header() + [f"{self.name}{_labels(self.labelnames, k)} {_number(v)}" for k, v in values]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # conteo por bucket (no acumulado) + [suma, total]
+                series = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        with self._lock:
+            values = [(k, (list(s[0]), s[1], s[2])) for k, s in self._values.items()]
+        lines = self._header()
+        for labels, (counts, total, count) in values:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            inf = _labels(self.labelnames, labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+def render():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def metrics_response():
+    return PlainTextResponse(render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+# ---------- MÉTRICAS ----------
+HTTP_REQUEST_SECONDS = Histogram(
+    "api_http_request_duration_seconds", "Duración de las peticiones a la API", ("method", "route", "status")
+)
+HTTP_IN_FLIGHT = Gauge("api_http_requests_in_flight", "Peticiones en curso en este proceso")
+
+ODOO_CALL_SECONDS = Histogram(
+    "odoo_call_duration_seconds", "Duración de cada execute_kw a Odoo", ("model", "method", "status")
+)
+ODOO_REQUEST_BYTES = Histogram(
+    "odoo_call_request_bytes", "Tamaño de la petición XML-RPC", ("model", "method"), SIZE_BUCKETS
+)
+ODOO_RESPONSE_BYTES = Histogram(
+    "odoo_call_response_bytes", "Tamaño de la respuesta XML-RPC", ("model", "method"), SIZE_BUCKETS
+)
+
+PRESTASHOP_CALL_SECONDS = Histogram(
+    "prestashop_call_duration_seconds", "Duración de cada petición al webservice de PrestaShop",
+    ("resource", "method", "status")
+)
+PRESTASHOP_RESPONSE_BYTES = Histogram(
+    "prestashop_call_response_bytes", "Tamaño del cuerpo devuelto por PrestaShop", ("resource", "method"), SIZE_BUCKETS
+)
+
+UPSTREAM_CONCURRENCY_LIMIT = Gauge(
+    "upstream_concurrency_limit", "Límite de concurrencia adaptativo de cada origen", ("upstream",)
+)
+UPSTREAM_IN_FLIGHT = Gauge("upstream_requests_in_flight", "Llamadas en curso a cada origen", ("upstream",))
+UPSTREAM_BREAKER_STATE = Gauge(
+    "upstream_circuit_state", "Estado del circuit breaker (0 cerrado, 1 semiabierto, 2 abierto)", ("upstream",)
+)
+UPSTREAM_REJECTED = Counter(
+    "upstream_rejected_total", "Llamadas rechazadas sin llegar al origen", ("upstream", "reason")
+)
+UPSTREAM_COALESCED = Counter(
+    "upstream_coalesced_total", "Lecturas que se sumaron a una llamada idéntica en curso", ("upstream",)
+)
+
+# ---------- ODOO ----------
+class _MeteredTransportMixin:
+    # guarda los tamaños de la última llamada; cada ServerProxy del pool tiene su transporte
+    request_bytes = 0
+    response_bytes = 0
+
+    def send_content(self, connection, request_body):
+        self.request_bytes = len(request_body)
+        super().send_content(connection, request_body)
+
+    def parse_response(self, response):
+        self.response_bytes = int(response.getheader("Content-Length") or 0)
+        return super().parse_response(response)
+
+
+class MeteredTransport(_MeteredTransportMixin, xmlrpc.client.Transport):
+    pass
+
+
+class MeteredSafeTransport(_MeteredTransportMixin, xmlrpc.client.SafeTransport):
+    pass
+
+
+def observe_odoo_call(model, method, status, seconds, transport=None):
+    ODOO_CALL_SECONDS.observe(seconds, model, method, status)
+    if transport is not None and status == "ok":
+        ODOO_REQUEST_BYTES.observe(transport.request_bytes, model, method)
+        if transport.response_bytes:
+            ODOO_RESPONSE_BYTES.observe(transport.response_bytes, model, method)
+
+
+# ---------- PRESTASHOP ----------
+def prestashop_resource(path):
+    # /.../api/products/12 -> products; la etiqueta no lleva ids para no disparar la cardinalidad
+    parts = [p for p in path.split("/") if p]
+    if "api" in parts:
+        rest = parts[parts.index("api") + 1:]
+        return rest[0] if rest else "root"
+    return "other"
+
+
+async def on_prestashop_request(request):
+    request.extensions["metrics_start"] = time.perf_counter()
+
+
+async def on_prestashop_response(response):
+    # se lee aquí el cuerpo (la API no usa client.stream) para medir la llamada completa
+    await response.aread()
+    request = response.request
+    start = request.extensions.get("metrics_start")
+    if start is None:
+        return
+    resource = prestashop_resource(request.url.path)
+    PRESTASHOP_CALL_SECONDS.observe(time.perf_counter() - start, resource, request.method, str(response.status_code))
+    PRESTASHOP_RESPONSE_BYTES.observe(len(response.content), resource, request.method)
+
+
+PRESTASHOP_EVENT_HOOKS = {"request": [on_prestashop_request], "response": [on_prestashop_response]}
+
+
+# ---------- API ----------
+def route_template(scope):
+    # /api/prestashop/order/ORD01 -> /api/prestashop/order/{reference}. Se reconstruye desde
+    # path_params porque con routers incluidos scope["route"].path no lleva el prefijo
+    if scope.get("route") is None:
+        return "unmatched"
+    # sin root_path (prefijo del proxy o /t/{tenant}): la misma ruta cuenta igual en todos los tenants
+    path, root_path = scope["path"], scope.get("root_path", "")
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    names = {str(v): k for k, v in scope.get("path_params", {}).items()}
+    return "/".join("{" + names[part] + "}" if part in names else part for part in path.split("/"))
+
+
+# Middleware ASGI: tiempo total de cada petición (incluye el streaming del cuerpo) por ruta
+class TimingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = "500"
+
+        async def send_timed(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_timed)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # plantilla de la ruta, no la URL concreta, para no disparar la cardinalidad
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, scope["method"], route_template(scope), status)
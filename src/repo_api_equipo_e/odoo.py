@@ -1,7 +1,18 @@
+import asyncio
+import copy
+import http.client
 import os
+import queue
+import threading
+import time
 import xmlrpc.client
-from fastapi import FastAPI, HTTPException
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from fastapi import HTTPException
 from dotenv import load_dotenv
+from repo_api_equipo_e.coalesce import UPSTREAM_COALESCING, Coalescer, odoo_call_key
+from repo_api_equipo_e.metrics import MeteredSafeTransport, MeteredTransport, observe_odoo_call
+from repo_api_equipo_e.upstream import ThreadUpstream
 
 load_dotenv()
 
@@ -9,12 +20,171 @@ ODOO_URL = os.getenv("ODOO_URL")
 ODOO_DB = os.getenv("ODOO_DB")
 ODOO_USER = os.getenv("ODOO_USER")
 ODOO_PASSWORD = os.getenv("ODOO_PASSWORD")
+ODOO_POOL_SIZE = int(os.getenv("ODOO_POOL_SIZE", "8"))
+ODOO_MAX_CONCURRENCY = int(os.getenv("ODOO_MAX_CONCURRENCY", str(ODOO_POOL_SIZE)))
+# sin timeout una llamada colgada retiene su hilo y su conexión indefinidamente
+ODOO_TIMEOUT = float(os.getenv("ODOO_TIMEOUT", "40"))
+# llamadas por segundo a cada Odoo (0 = sin límite)
+ODOO_RATE_LIMIT = float(os.getenv("ODOO_RATE_LIMIT", "0"))
+ODOO_RATE_BURST = int(os.getenv("ODOO_RATE_BURST", "20"))
 
-def connect_odoo():
-    common = xmlrpc.client.ServerProxy(f"{ODOO_URL}/xmlrpc/2/common")
-    uid = common.authenticate(ODOO_DB, ODOO_USER, ODOO_PASSWORD, {})
-    if not uid:
-        raise HTTPException(status_code=401, detail="Error al conectar con Odoo")
+# faultCode que Odoo devuelve por XML-RPC cuando uid/password ya no son válidos
+ACCESS_DENIED_FAULT = 3
 
-    models = xmlrpc.client.ServerProxy(f"{ODOO_URL}/xmlrpc/2/object")
-    return uid, models, ODOO_DB, ODOO_PASSWORD
\ No newline at end of file
+
+class _TimeoutMixin:
+    def make_connection(self, host):
+        connection = super().make_connection(host)
+        connection.timeout = ODOO_TIMEOUT
+        return connection
+
+
+class OdooTransport(_TimeoutMixin, MeteredTransport):
+    pass
+
+
+class OdooSafeTransport(_TimeoutMixin, MeteredSafeTransport):
+    pass
+
+
+def upstream_failure(exc):
+    # (fallo del origen, sobrecarga). Un Fault es un error de negocio: Odoo respondió bien
+    if isinstance(exc, xmlrpc.client.ProtocolError):
+        return exc.errcode >= 500 or exc.errcode == 429, exc.errcode in (429, 503)
+    if isinstance(exc, (OSError, http.client.HTTPException)):
+        return True, isinstance(exc, TimeoutError)
+    return False, False
+
+
+def create_odoo_upstream(name, max_concurrency=ODOO_POOL_SIZE, rate=ODOO_RATE_LIMIT, burst=ODOO_RATE_BURST):
+    return ThreadUpstream(name, max_concurrency, rate, burst)
+
+
+# Cliente XML-RPC de larga vida: cachea el uid y reutiliza conexiones keep-alive.
+# upstream: protección compartida (ritmo, concurrencia adaptativa y circuit breaker)
+class OdooClient:
+    def __init__(self, url, db, user, password, pool_size=ODOO_POOL_SIZE, upstream=None):
+        self.url = url
+        self.db = db
+        self.upstream = upstream
+        self.user = user
+        self.password = password
+        self._uid = None
+        self._auth_lock = threading.Lock()
+        # cada ServerProxy tiene su propio Transport (y su conexión HTTP), no son thread-safe
+        self._proxies = queue.LifoQueue(maxsize=pool_size)
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def _authenticate(self):
+        with xmlrpc.client.ServerProxy(f"{self.url}/xmlrpc/2/common", transport=self._transport()) as common:
+            uid = common.authenticate(self.db, self.user, self.password, {})
+        if not uid:
+            raise HTTPException(status_code=401, detail="Error al conectar con Odoo")
+        return uid
+
+    @property
+    def uid(self):
+        if self._uid is None:
+            with self._auth_lock:
+                if self._uid is None:
+                    self._uid = self._authenticate()
+        return self._uid
+
+    def _invalidate_uid(self, uid):
+        with self._auth_lock:
+            if self._uid == uid:
+                self._uid = None
+
+    @contextmanager
+    def _models(self):
+        self._slots.acquire()
+        try:
+            try:
+                proxy = self._proxies.get_nowait()
+            except queue.Empty:
+                proxy = xmlrpc.client.ServerProxy(
+                    f"{self.url}/xmlrpc/2/object", transport=self._transport(), allow_none=True
+                )
+            try:
+                yield proxy
+            except xmlrpc.client.Fault:
+                # error de negocio: la conexión sigue sana
+                self._proxies.put_nowait(proxy)
+                raise
+            except Exception:
+                # conexión rota o a medias: se descarta
+                proxy("close")()
+                raise
+            else:
+                self._proxies.put_nowait(proxy)
+        finally:
+            self._slots.release()
+
+    def _transport(self):
+        return OdooSafeTransport() if self.url.startswith("https") else OdooTransport()
+
+    def _execute(self, uid, model, method, args, kwargs):
+        with self._models() as models:
+            start = time.perf_counter()
+            status = "error"
+            try:
+                result = models.execute_kw(self.db, uid, self.password, model, method, args, kwargs or {})
+                status = "ok"
+                return result
+            except xmlrpc.client.Fault:
+                status = "fault"
+                raise
+            finally:
+                observe_odoo_call(model, method, status, time.perf_counter() - start, models("transport"))
+
+    def execute_kw(self, model, method, args, kwargs=None):
+        if self.upstream is None:
+            return self._execute_kw(model, method, args, kwargs)
+        with self.upstream.call(upstream_failure):
+            return self._execute_kw(model, method, args, kwargs)
+
+    def _execute_kw(self, model, method, args, kwargs):
+        uid = self.uid
+        try:
+            return self._execute(uid, model, method, args, kwargs)
+        except xmlrpc.client.Fault as e:
+            if e.faultCode != ACCESS_DENIED_FAULT:
+                raise
+            # sesión caducada o credenciales rotadas: reautenticar una sola vez
+            self._invalidate_uid(uid)
+            return self._execute(self.uid, model, method, args, kwargs)
+
+    def close(self):
+        while True:
+            try:
+                self._proxies.get_nowait()("close")()
+            except queue.Empty:
+                break
+
+
+# Fachada async: el XML-RPC bloqueante corre en un executor propio, acotado,
+# para no congelar el event loop ni competir con el threadpool de FastAPI.
+# Las lecturas idénticas simultáneas comparten una sola llamada (ver coalesce.py)
+class AsyncOdoo:
+    def __init__(self, client: OdooClient, max_workers=ODOO_MAX_CONCURRENCY, name="odoo"):
+        self.client = client
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="odoo")
+        self._coalescer = Coalescer(name)
+
+    async def _execute_kw(self, model, method, args, kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self.client.execute_kw, model, method, args, kwargs
+        )
+
+    async def execute_kw(self, model, method, args, kwargs=None):
+        key = odoo_call_key(model, method, args, kwargs) if UPSTREAM_COALESCING else None
+        if key is None:
+            return await self._execute_kw(model, method, args, kwargs)
+        # cada llamante recibe su copia: los routers pueden modificar los registros
+        return await self._coalescer.run(
+            key, lambda: self._execute_kw(model, method, args, kwargs), share=copy.deepcopy
+        )
+
+    def close(self):
+        self._executor.shutdown(wait=False)
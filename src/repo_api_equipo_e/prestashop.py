@@ -0,0 +1,99 @@
+import os
+import importlib.util
+import logging
+import httpx
+from dotenv import load_dotenv
+from repo_api_equipo_e.coalesce import CoalescingTransport
+from repo_api_equipo_e.metrics import PRESTASHOP_EVENT_HOOKS
+from repo_api_equipo_e.upstream import AsyncUpstream, GuardedTransport
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# pareja del tenant por defecto (ver tenants.py)
+PRESTASHOP_BASE_URL = os.getenv("PRESTASHOP_BASE_URL", "").rstrip("/")
+PRESTASHOP_API_KEY = os.getenv("PRESTASHOP_API_KEY", "")
+PRESTASHOP_TIMEOUT = float(os.getenv("PRESTASHOP_TIMEOUT", "40"))
+PRESTASHOP_CONNECT_TIMEOUT = float(os.getenv("PRESTASHOP_CONNECT_TIMEOUT", "10"))
+PRESTASHOP_MAX_CONNECTIONS = int(os.getenv("PRESTASHOP_MAX_CONNECTIONS", "100"))
+PRESTASHOP_MAX_KEEPALIVE = int(os.getenv("PRESTASHOP_MAX_KEEPALIVE", "20"))
+PRESTASHOP_KEEPALIVE_EXPIRY = float(os.getenv("PRESTASHOP_KEEPALIVE_EXPIRY", "30"))
+PRESTASHOP_HTTP2 = os.getenv("PRESTASHOP_HTTP2", "1") == "1"
+PRESTASHOP_PAGE_SIZE = int(os.getenv("PRESTASHOP_PAGE_SIZE", "500"))
+# peticiones por segundo a cada tienda, sumando todos los routers (0 = sin límite)
+PRESTASHOP_RATE_LIMIT = float(os.getenv("PRESTASHOP_RATE_LIMIT", "0"))
+PRESTASHOP_RATE_BURST = int(os.getenv("PRESTASHOP_RATE_BURST", "50"))
+
+
+def create_prestashop_upstream(name, max_concurrency=PRESTASHOP_MAX_CONNECTIONS, rate=PRESTASHOP_RATE_LIMIT,
+                               burst=PRESTASHOP_RATE_BURST):
+    return AsyncUpstream(name, max_concurrency, rate, burst)
+
+
+def create_prestashop_client(base_url="", api_key="", max_connections=PRESTASHOP_MAX_CONNECTIONS,
+                             max_keepalive=PRESTASHOP_MAX_KEEPALIVE, upstream=None) -> httpx.AsyncClient:
+    # Un cliente por tienda: base_url y ws_key van en el cliente y las peticiones usan rutas
+    # relativas (/api/products). HTTP/2 solo si está instalado el extra httpx[http2].
+    # upstream: protección compartida (ritmo, concurrencia adaptativa y circuit breaker).
+    # Los GET idénticos simultáneos comparten una sola petición (ver coalesce.py)
+    http2 = PRESTASHOP_HTTP2 and importlib.util.find_spec("h2") is not None
+    transport = httpx.AsyncHTTPTransport(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=PRESTASHOP_KEEPALIVE_EXPIRY,
+        ),
+    )
+    if upstream is not None:
+        transport = GuardedTransport(upstream, transport)
+    return httpx.AsyncClient(
+        base_url=base_url,
+        params={"ws_key": api_key} if api_key else None,
+        timeout=httpx.Timeout(PRESTASHOP_TIMEOUT, connect=PRESTASHOP_CONNECT_TIMEOUT),
+        transport=CoalescingTransport(upstream.name if upstream is not None else "prestashop", transport),
+        event_hooks=PRESTASHOP_EVENT_HOOKS,
+    )
+
+
+def resource_rows(data, resource):
+    # PrestaShop devuelve [] (no {"recurso": []}) cuando no hay resultados
+    return data.get(resource, []) if isinstance(data, dict) else data
+
+
+async def get_resource_page(client, resource, params, offset, page_size=PRESTASHOP_PAGE_SIZE):
+    return await client.get(
+        f"/api/{resource}",
+        params={
+            **params,
+            "output_format": "JSON",
+            "sort": "[id_ASC]",
+            "limit": f"{offset},{page_size}"
+        }
+    )
+
+
+async def stream_resource(client, resource, params, transform=None, page_size=PRESTASHOP_PAGE_SIZE):
+    # La primera página se pide antes de responder para poder devolver el error normal.
+    # Devuelve (respuesta, registros); registros es None si la primera página falló
+    first = await get_resource_page(client, resource, params, 0, page_size)
+    if first.status_code != 200:
+        return first, None
+
+    async def records():
+        r, offset = first, 0
+        while True:
+            rows = resource_rows(r.json(), resource)
+            for row in rows:
+                yield transform(row) if transform else row
+            if len(rows) < page_size:
+                return
+            offset += page_size
+            r = await get_resource_page(client, resource, params, offset, page_size)
+            if r.status_code != 200:
+                # la respuesta ya salió con 200: solo queda cortar el stream y dejar rastro
+                logger.error(f"PrestaShop {resource} offset {offset}: {r.status_code}")
+                return
+
+    return first, records()
@@ -0,0 +1,15 @@
+import orjson
+from fastapi.responses import JSONResponse
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def dumps(value) -> bytes:
+    # default=str: fechas, Decimal y demás tipos que no son JSON nativo salen como texto
+    return orjson.dumps(value, default=str, option=ORJSON_OPTIONS)
+
+
+# Respuesta por defecto de toda la API: orjson serializa varias veces más rápido que json
+class ORJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
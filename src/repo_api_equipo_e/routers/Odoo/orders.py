@@ -1,25 +1,44 @@
-from fastapi import APIRouter
-from repo_api_equipo_e.odoo import connect_odoo
+from fastapi import APIRouter, Depends, Query, Request
+from repo_api_equipo_e.cache import CACHE_TTL, Cache
+from repo_api_equipo_e.odoo import AsyncOdoo
+from repo_api_equipo_e.tenants import get_async_odoo, get_cache
+from .paging import OdooPage, search_read_page, stream_search_read
 
 router = APIRouter()
 
+ORDER_FIELDS = [
+    "id",
+    "name",
+    "date_order",
+    "state",
+    "amount_total",
+    "partner_id"
+]
+
 @router.get("/orders")
-def get_orders():
-    uid, models, db, password = connect_odoo()
+async def get_orders(
+    request: Request,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    state: str | None = None,
+    partner_id: int | None = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    page: OdooPage = Depends(),
+    odoo: AsyncOdoo = Depends(get_async_odoo),
+    cache: Cache = Depends(get_cache),
+):
+    domain = []
+    if date_from:
+        domain.append(("date_order", ">=", date_from))
+    if date_to:
+        domain.append(("date_order", "<=", date_to))
+    if state:
+        domain.append(("state", "=", state))
+    if partner_id:
+        domain.append(("partner_id", "=", partner_id))
+
+    if format == "ndjson":
+        return stream_search_read(odoo, page, "sale.order", domain, ORDER_FIELDS)
 
-    orders = models.execute_kw(
-        db, uid, password,
-        "sale.order", "search_read",
-        [[]],
-        {
-            "fields": [
-                "id",
-                "name",
-                "date_order",
-                "state",
-                "amount_total",
-                "partner_id"
-            ]
-        }
-    )
+    orders = await search_read_page(odoo, cache, CACHE_TTL["odoo_order"], request, page, "sale.order", domain, ORDER_FIELDS)
     return orders
@@ -0,0 +1,132 @@
+import asyncio
+import os
+from fastapi import HTTPException, Query, Request
+from repo_api_equipo_e.cache import always
+from repo_api_equipo_e.catalog import MODEL as CATALOG_MODEL
+from repo_api_equipo_e.conditional import conditional_response, content_etag, etag_for, etag_matches, render_json
+from repo_api_equipo_e.streaming import ndjson_response
+
+ODOO_MAX_PAGE_SIZE = int(os.getenv("ODOO_MAX_PAGE_SIZE", "1000"))
+ODOO_STREAM_PAGE_SIZE = int(os.getenv("ODOO_STREAM_PAGE_SIZE", "500"))
+
+
+# Parámetros comunes de los listados: ?limit=&offset=&order=&fields=a,b
+class OdooPage:
+    def __init__(
+        self,
+        limit: int | None = Query(None, ge=1, le=ODOO_MAX_PAGE_SIZE),
+        offset: int = Query(0, ge=0),
+        order: str | None = Query(None, pattern=r"^\w+( (asc|desc))?(, *\w+( (asc|desc))?)*$"),
+        fields: str | None = None,
+    ):
+        self.limit = limit
+        self.offset = offset
+        self.order = order
+        self.fields = fields
+
+    def select_fields(self, allowed):
+        if not self.fields:
+            return list(allowed)
+        selected = [f.strip() for f in self.fields.split(",") if f.strip()]
+        unknown = [f for f in selected if f not in allowed]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Campos no permitidos: {', '.join(unknown)}")
+        # el id siempre viaja, hace falta para paginar y cruzar datos
+        return ["id"] + [f for f in selected if f != "id"]
+
+    def search_read_kwargs(self, allowed):
+        kwargs = {"fields": self.select_fields(allowed)}
+        if self.order:
+            unknown = [o.split()[0] for o in self.order.split(",") if o.split()[0] not in allowed]
+            if unknown:
+                raise HTTPException(status_code=400, detail=f"No se puede ordenar por: {', '.join(unknown)}")
+            kwargs["order"] = self.order
+        if self.limit:
+            kwargs["limit"] = self.limit
+            kwargs["offset"] = self.offset
+        elif self.offset:
+            kwargs["offset"] = self.offset
+        return kwargs
+
+
+def page_headers(request: Request, limit, offset, total):
+    # sin limit se mantiene el comportamiento de siempre: todo el listado, sin cabeceras
+    headers = {}
+    if limit:
+        headers["X-Total-Count"] = str(total)
+        next_offset = offset + limit
+        if next_offset < total:
+            next_url = request.url.include_query_params(offset=next_offset)
+            headers["X-Next-Offset"] = str(next_offset)
+            headers["Link"] = f'<{next_url}>; rel="next"'
+    return headers
+
+
+async def search_read_page(odoo, cache, ttl, request: Request, page: OdooPage, model, domain, allowed_fields):
+    kwargs = page.search_read_kwargs(allowed_fields)
+
+    # una sola lectura (más el total si se pagina) y el ETag sale del propio contenido: no se
+    # pregunta nada a Odoo solo para validar. Dentro del TTL los 304 y las páginas salen de la caché
+    async def load():
+        if page.limit:
+            rows, total = await asyncio.gather(
+                odoo.execute_kw(model, "search_read", [domain], kwargs),
+                odoo.execute_kw(model, "search_count", [domain]),
+            )
+        else:
+            rows = await odoo.execute_kw(model, "search_read", [domain], kwargs)
+            total = len(rows)
+        body = render_json(rows)
+        return {"body": body, "etag": content_etag(body), "total": total}
+
+    key = etag_for(model, domain, kwargs).strip('"')
+    cached = await cache.get_or_load(("odoo", model, key), load, ttl, cache_if=always)
+    headers = page_headers(request, page.limit, page.offset, cached["total"])
+    return conditional_response(request, cached["body"], cached["etag"], headers)
+
+
+async def iter_search_read(odoo, model, domain, kwargs, page_size=ODOO_STREAM_PAGE_SIZE):
+    # recorre el resultado por bloques; sin orden explícito se ordena por id para que
+    # las páginas sean estables. Cada bloque pasa por AsyncOdoo: mismo executor acotado
+    # (ODOO_MAX_CONCURRENCY) y misma protección del origen que el resto de lecturas
+    kwargs = {**kwargs, "order": kwargs.get("order") or "id"}
+    offset = kwargs.pop("offset", 0)
+    remaining = kwargs.pop("limit", None)
+    while remaining is None or remaining > 0:
+        size = page_size if remaining is None else min(page_size, remaining)
+        rows = await odoo.execute_kw(model, "search_read", [domain], {**kwargs, "limit": size, "offset": offset})
+        for row in rows:
+            yield row
+        if len(rows) < size:
+            return
+        offset += size
+        if remaining is not None:
+            remaining -= size
+
+
+def stream_search_read(odoo, page: OdooPage, model, domain, allowed_fields):
+    # el stream no se cachea: va por bloques, sin tener el listado entero en memoria
+    return ndjson_response(iter_search_read(odoo, model, domain, page.search_read_kwargs(allowed_fields)))
+
+
+async def catalog_page(catalog, cache, ttl, request: Request, page: OdooPage, domain, allowed_fields):
+    # igual que search_read_page pero contra la réplica local: la versión de la réplica
+    # sustituye a la huella de Odoo y no hay ninguna llamada remota
+    kwargs = page.search_read_kwargs(allowed_fields)
+    total = catalog.count(domain)
+    etag = etag_for(CATALOG_MODEL, domain, kwargs, "replica", catalog.version())
+    headers = {**page_headers(request, page.limit, page.offset, total), "X-Catalog-Source": "replica",
+               "X-Catalog-Age": f"{catalog.age():.0f}"}
+
+    if etag_matches(request, etag):
+        return conditional_response(request, None, etag, headers)
+
+    async def load():
+        return render_json(await asyncio.to_thread(catalog.search_read, domain, kwargs))
+
+    body = await cache.get_or_load(("odoo", CATALOG_MODEL, etag.strip('"')), load, ttl, cache_if=always)
+    return conditional_response(request, body, etag, headers)
+
+
+def stream_catalog(catalog, page: OdooPage, domain, allowed_fields):
+    return ndjson_response(catalog.iter_search_read(domain, page.search_read_kwargs(allowed_fields)))
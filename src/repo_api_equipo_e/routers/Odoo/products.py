@@ -1,16 +1,43 @@
-from fastapi import APIRouter
-from repo_api_equipo_e.odoo import connect_odoo
+from fastapi import APIRouter, Depends, Query, Request
+from repo_api_equipo_e.cache import CACHE_TTL, Cache
+from repo_api_equipo_e.catalog import CatalogReplica
+from repo_api_equipo_e.odoo import AsyncOdoo
+from repo_api_equipo_e.tenants import get_async_odoo, get_cache, get_catalog
+from .paging import OdooPage, catalog_page, search_read_page, stream_catalog, stream_search_read
 
 router = APIRouter()
 
+PRODUCT_FIELDS = ["id", "name", "default_code", "list_price"]
+
 @router.get("/products")
-def get_products():
-    uid, models, db, password = connect_odoo()
-    
-    products = models.execute_kw(
-        db, uid, password,
-        "product.product", "search_read",
-        [[]],
-        {"fields": ["id", "name", "default_code", "list_price"]}
-    )
+async def get_products(
+    request: Request,
+    default_code: str | None = None,
+    name: str | None = None,
+    updated_since: str | None = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    live: bool = Query(False),
+    page: OdooPage = Depends(),
+    odoo: AsyncOdoo = Depends(get_async_odoo),
+    cache: Cache = Depends(get_cache),
+    catalog: CatalogReplica = Depends(get_catalog),
+):
+    domain = []
+    if default_code:
+        domain.append(("default_code", "=", default_code))
+    if name:
+        domain.append(("name", "ilike", name))
+    if updated_since:
+        domain.append(("write_date", ">=", updated_since))
+
+    # réplica local si está dentro de la cota de frescura; si no, Odoo en vivo
+    if not live and catalog.is_fresh():
+        if format == "ndjson":
+            return stream_catalog(catalog, page, domain, PRODUCT_FIELDS)
+        return await catalog_page(catalog, cache, CACHE_TTL["odoo_product"], request, page, domain, PRODUCT_FIELDS)
+
+    if format == "ndjson":
+        return stream_search_read(odoo, page, "product.product", domain, PRODUCT_FIELDS)
+
+    products = await search_read_page(odoo, cache, CACHE_TTL["odoo_product"], request, page, "product.product", domain, PRODUCT_FIELDS)
     return products
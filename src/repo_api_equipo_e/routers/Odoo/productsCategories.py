@@ -1,18 +1,25 @@
-from fastapi import APIRouter
-from repo_api_equipo_e.odoo import connect_odoo
+from fastapi import APIRouter, Depends, Request
+from repo_api_equipo_e.cache import CACHE_TTL, Cache
+from repo_api_equipo_e.odoo import AsyncOdoo
+from repo_api_equipo_e.tenants import get_async_odoo, get_cache
+from .paging import OdooPage, search_read_page
 
 router = APIRouter()
 
+CATEGORY_FIELDS = ["id", "name", "display_name"]
+
 @router.get("/productCategories")
-def get_product_categories():
-    uid, models, db, password = connect_odoo()
+async def get_product_categories(
+    request: Request,
+    name: str | None = None,
+    page: OdooPage = Depends(),
+    odoo: AsyncOdoo = Depends(get_async_odoo),
+    cache: Cache = Depends(get_cache),
+):
+    domain = []
+    if name:
+        domain.append(("name", "ilike", name))
 
-    categories = models.execute_kw(
-        db, uid, password,
-        "product.category", "search_read",
-        [[]],
-        {"fields": ["id", "name", "display_name"]}
-    )
+    categories = await search_read_page(odoo, cache, CACHE_TTL["odoo_category"], request, page, "product.category", domain, CATEGORY_FIELDS)
 
     return categories
-    
\ No newline at end of file
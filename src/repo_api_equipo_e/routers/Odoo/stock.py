@@ -1,16 +1,30 @@
-from fastapi import APIRouter
-from repo_api_equipo_e.odoo import connect_odoo
+from fastapi import APIRouter, Depends, Request
+from repo_api_equipo_e.cache import CACHE_TTL, Cache
+from repo_api_equipo_e.odoo import AsyncOdoo
+from repo_api_equipo_e.tenants import get_async_odoo, get_cache
+from .paging import OdooPage, search_read_page
 
 router = APIRouter()
 
+STOCK_FIELDS = ["id", "product_id", "location_id", "quantity"]
+
 @router.get("/productStock")
-def get_product_stock():
-    uid, models, db, password = connect_odoo()
+async def get_product_stock(
+    request: Request,
+    product_id: int | None = None,
+    location_id: int | None = None,
+    updated_since: str | None = None,
+    page: OdooPage = Depends(),
+    odoo: AsyncOdoo = Depends(get_async_odoo),
+    cache: Cache = Depends(get_cache),
+):
+    domain = []
+    if product_id:
+        domain.append(("product_id", "=", product_id))
+    if location_id:
+        domain.append(("location_id", "=", location_id))
+    if updated_since:
+        domain.append(("write_date", ">=", updated_since))
 
-    stock_quant = models.execute_kw(
-        db, uid, password,
-        "stock.quant", "search_read",
-        [[]],
-        {"fields": ["id", "product_id", "location_id", "quantity"]}
-    )
+    stock_quant = await search_read_page(odoo, cache, CACHE_TTL["odoo_stock"], request, page, "stock.quant", domain, STOCK_FIELDS)
     return stock_quant
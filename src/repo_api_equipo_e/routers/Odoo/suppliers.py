@@ -1,16 +1,27 @@
-from fastapi import APIRouter
-from repo_api_equipo_e.odoo import connect_odoo
+from fastapi import APIRouter, Depends, Request
+from repo_api_equipo_e.cache import CACHE_TTL, Cache
+from repo_api_equipo_e.odoo import AsyncOdoo
+from repo_api_equipo_e.tenants import get_async_odoo, get_cache
+from .paging import OdooPage, search_read_page
 
 router = APIRouter()
 
+SUPPLIER_FIELDS = ["id", "name", "active", "contact_address", "email", "is_company", "display_name"]
+
 @router.get("/suppliers")
-def get_suppliers():
-    uid, models, db, password = connect_odoo()
+async def get_suppliers(
+    request: Request,
+    name: str | None = None,
+    is_company: bool | None = None,
+    page: OdooPage = Depends(),
+    odoo: AsyncOdoo = Depends(get_async_odoo),
+    cache: Cache = Depends(get_cache),
+):
+    domain = [("supplier_rank", ">", 0)]
+    if name:
+        domain.append(("name", "ilike", name))
+    if is_company is not None:
+        domain.append(("is_company", "=", is_company))
 
-    suppliers = models.execute_kw(
-        db, uid, password,
-        "res.partner", "search_read",
-        [[("supplier_rank", ">", 0)]],
-        {"fields": ["id", "name", "active", "contact_address", "email", "is_company", "display_name"]}
-    )
+    suppliers = await search_read_page(odoo, cache, CACHE_TTL["odoo_supplier"], request, page, "res.partner", domain, SUPPLIER_FIELDS)
     return suppliers
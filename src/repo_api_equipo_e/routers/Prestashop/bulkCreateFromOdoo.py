@@ -1,41 +1,83 @@
-import os
-import re
+import asyncio
 import httpx
-from fastapi import APIRouter
-from repo_api_equipo_e.odoo import connect_odoo
+from fastapi import APIRouter, Depends, Query
+from repo_api_equipo_e.cache import Cache
+from repo_api_equipo_e.jobs import FINISHED, JobError, job_handler, job_snapshot
+from repo_api_equipo_e.odoo import AsyncOdoo
+from repo_api_equipo_e.store import SyncStore
+from repo_api_equipo_e.streaming import ndjson_response
+from repo_api_equipo_e.sync import PATCH_SUPPORT, SYNC_WORKERS, ReferenceIndex, StockIndex, SyncClient, filter_safe, resolve_reference, run_bounded, stock_unchanged
+from repo_api_equipo_e.tenants import Tenant, get_async_odoo, get_cache, get_prestashop_client, get_sync_store, get_tenant
+from repo_api_equipo_e.xmlrecords import find_text
 
 router = APIRouter()
 
-BASE_URL = os.getenv("PRESTASHOP_BASE_URL", "").rstrip("/")
-API_KEY = os.getenv("PRESTASHOP_API_KEY", "")
+
+WATERMARK = "products_from_odoo"
+# el precio vive en product.template y la cantidad en stock.quant
+WATERMARK_MODELS = ("product.product", "product.template", "stock.quant")
+PRODUCT_FIELDS = ["id", "name", "default_code", "list_price", "qty_available"]
+REPORT_KEYS = ("created", "updated_existing", "skipped_price0_stock0", "unchanged", "create_errors", "stock_errors")
+BULK_JOB = "products_from_odoo_bulk"
 
 # ---------- ODOO ----------
-def get_odoo_products():
-    uid, models, db, password = connect_odoo()
-    return models.execute_kw(
-        db, uid, password,
+async def get_odoo_products(odoo):
+    return await odoo.execute_kw(
         "product.product", "search_read",
         [[]],
-        {"fields": ["id", "name", "default_code", "list_price", "qty_available"]}
+        {"fields": PRODUCT_FIELDS}
     )
 
-# ---------- XML helpers ----------
-def _tag(xml: str, name: str):
-    m = re.search(rf"<{name}[^>]*>\s*(?:<!\[CDATA\[)?(.*?)(?:\]\]>)?\s*</{name}>", xml, re.S)
-    return m.group(1).strip() if m else None
+async def get_odoo_max_write_date(odoo, model):
+    rows = await odoo.execute_kw(
+        model, "search_read",
+        [[]],
+        {"fields": ["write_date"], "order": "write_date desc", "limit": 1}
+    )
+    return rows[0]["write_date"] if rows else None
+
+async def get_odoo_changed_products(odoo, since, extra_ids):
+    # ">=" para no perder escrituras del mismo segundo; reenviar alguna es inocuo
+    templates, quants = await asyncio.gather(
+        odoo.execute_kw(
+            "product.template", "search_read",
+            [[("write_date", ">=", since)]],
+            {"fields": ["product_variant_ids"]}
+        ),
+        odoo.execute_kw(
+            "stock.quant", "search_read",
+            [[("write_date", ">=", since)]],
+            {"fields": ["product_id"]}
+        ),
+    )
+    ids = set(extra_ids)
+    for t in templates:
+        ids.update(t["product_variant_ids"])
+    for q in quants:
+        if q["product_id"]:
+            ids.add(q["product_id"][0])
+
+    return await odoo.execute_kw(
+        "product.product", "search_read",
+        [["|", ("write_date", ">=", since), ("id", "in", sorted(ids))]],
+        {"fields": PRODUCT_FIELDS}
+    )
 
-def _first_id(xml: str):
+# ---------- XML helpers ----------
+def _first_id(xml):
     # primer <id> encontrado en el xml
-    return _tag(xml, "id")
+    return find_text(xml, "id")
 
 # ---------- PRESTASHOP (usar XML para evitar respuestas raras JSON) ----------
 async def get_product_id_by_reference(client, sku):
+    if not filter_safe(sku):
+        return await resolve_reference(client, sku)
     r = await client.get(
-        f"{BASE_URL}/api/products",
-        params={"ws_key": API_KEY, "filter[reference]": f"[{sku}]", "display": "[id]"},
+        "/api/products",
+        params={"filter[reference]": f"[{sku}]", "display": "[id]"},
         headers={"Accept": "application/xml"},
     )
-    return _first_id(r.text) if r.status_code == 200 else None
+    return _first_id(r.content) if r.status_code == 200 else None
 
 async def create_product(client, name, sku, price):
     xml = f"""<?xml version="1.0" encoding="UTF-8"?>
@@ -64,34 +106,11 @@ async def create_product(client, name, sku, price):
 </product></prestashop>"""
 
     return await client.post(
-        f"{BASE_URL}/api/products",
-        params={"ws_key": API_KEY},
+        "/api/products",
         headers={"Content-Type": "application/xml", "Accept": "application/xml"},
         content=xml.encode("utf-8"),
     )
 
-async def get_stock_available_full_by_product(client, product_id):
-    r = await client.get(
-        f"{BASE_URL}/api/stock_availables",
-        params={"ws_key": API_KEY, "filter[id_product]": f"[{product_id}]", "display": "full"},
-        headers={"Accept": "application/xml"},
-    )
-    if r.status_code != 200:
-        return None
-    return r.text
-
-def parse_stock_info(stock_xml: str):
-    # toma el primer stock_available que venga
-    return {
-        "id": _tag(stock_xml, "id"),
-        "id_product": _tag(stock_xml, "id_product"),
-        "id_product_attribute": _tag(stock_xml, "id_product_attribute") or "0",
-        "id_shop": _tag(stock_xml, "id_shop") or "1",
-        "id_shop_group": _tag(stock_xml, "id_shop_group") or "0",  # 👈 en tu doc es 0
-        "depends_on_stock": _tag(stock_xml, "depends_on_stock") or "0",
-        "out_of_stock": _tag(stock_xml, "out_of_stock") or "2",
-    }
-
 async def patch_stock_quantity(client, stock_id, qty):
     xml = f"""<?xml version="1.0" encoding="UTF-8"?>
 <prestashop><stock_available>
@@ -99,8 +118,7 @@ async def patch_stock_quantity(client, stock_id, qty):
 <quantity><![CDATA[{int(qty)}]]></quantity>
 </stock_available></prestashop>"""
     return await client.patch(
-        f"{BASE_URL}/api/stock_availables/{stock_id}",
-        params={"ws_key": API_KEY},
+        f"/api/stock_availables/{stock_id}",
         headers={"Content-Type": "application/xml", "Accept": "application/xml"},
         content=xml.encode("utf-8"),
     )
@@ -118,81 +136,276 @@ async def put_stock_full(client, info, qty):
 <out_of_stock><![CDATA[{info['out_of_stock']}]]></out_of_stock>
 </stock_available></prestashop>"""
     return await client.put(
-        f"{BASE_URL}/api/stock_availables/{info['id']}",
-        params={"ws_key": API_KEY},
+        f"/api/stock_availables/{info['id']}",
         headers={"Content-Type": "application/xml", "Accept": "application/xml"},
         content=xml.encode("utf-8"),
     )
 
+# ---------- SYNC POR PRODUCTO ----------
+async def sync_product(client, index, stock_index, p):
+    # devuelve (lista_del_reporte, valor) por cada anotación; un SKU puede
+    # quedar en "created" y también en "stock_errors", igual que antes. Uno que ya
+    # existía cuenta como "updated_existing" solo si se escribe su stock, si no "unchanged"
+    sku = (p.get("default_code") or "").strip()
+    name = (p.get("name") or "").strip()
+    price = float(p.get("list_price") or 0)
+    stock = float(p.get("qty_available") or 0)
+
+    if not sku:
+        return [("create_errors", p.get("id"))]
+
+    # NO crear si precio=0 Y stock=0
+    if price == 0 and stock == 0:
+        return [("skipped_price0_stock0", sku)]
+
+    try:
+        # buscar por reference en el índice precargado
+        product_id = index.get(sku)
+
+        # Si no existe, crear
+        if not product_id:
+            rc = await create_product(client, name, sku, price)
+            if rc.status_code not in (200, 201):
+                return [("create_errors", sku)]
+            # PrestaShop devuelve el producto creado; solo se consulta si no trae id
+            product_id = _first_id(rc.content) or await get_product_id_by_reference(client, sku)
+            if not product_id:
+                return [("create_errors", sku)]
+            index.add(sku, product_id)
+            outcome = [("created", sku)]
+        else:
+            outcome = []
+    except httpx.HTTPError:
+        return [("create_errors", sku)]
+
+    try:
+        # Stock: del índice; los productos recién creados se consultan aparte
+        info = stock_index.get(product_id)
+        if not info:
+            await stock_index.load(client, [product_id])
+            info = stock_index.get(product_id)
+        if not info:
+            return outcome + [("stock_errors", sku)]
+
+        # Misma cantidad ya en PrestaShop: no se escribe nada
+        if stock_unchanged(info, stock):
+            return outcome or [("unchanged", sku)]
+
+        # PATCH quantity. Si falla, fallback a PUT completo; si la tienda no admite
+        # PATCH se recuerda y el resto de SKUs van directos al PUT
+        rs = None
+        shop = str(client.base_url)
+        if PATCH_SUPPORT.enabled(shop, "stock_availables"):
+            rs = await patch_stock_quantity(client, info["id"], stock)
+            if rs.status_code not in (200, 201):
+                PATCH_SUPPORT.observe(shop, "stock_availables", rs)
+        if rs is None or rs.status_code not in (200, 201):
+            rs2 = await put_stock_full(client, info, stock)
+            if rs2.status_code not in (200, 201):
+                return outcome + [("stock_errors", sku)]
+    except httpx.HTTPError:
+        return outcome + [("stock_errors", sku)]
+
+    return outcome or [("updated_existing", sku)]
+
+# ---------- PREPARACIÓN ----------
+async def get_high_watermark(odoo):
+    # la marca se toma ANTES de leer: lo que cambie durante la ejecución entra en la siguiente
+    write_dates = await asyncio.gather(*(get_odoo_max_write_date(odoo, m) for m in WATERMARK_MODELS))
+    return max(filter(None, write_dates), default=None)
+
+async def load_products(odoo, store, since):
+    if since:
+        return await get_odoo_changed_products(odoo, since, store.get_pending(WATERMARK))
+    return await get_odoo_products(odoo)
+
+async def load_indexes(sync_client, products, since):
+    # devuelve (índice de referencias, índice de stock, sobre de error o None)
+    index = ReferenceIndex()
+    stock_index = StockIndex()
+    if since:
+        # delta: solo las referencias y stocks afectados, no el catálogo entero
+        skus = [sku for sku in ((p.get("default_code") or "").strip() for p in products) if sku]
+        error = await index.load(sync_client, skus)
+    else:
+        error = await index.load(sync_client)
+    if error is not None:
+        return index, stock_index, {"status":"error","data":None,"errors":[{"code":str(error.status_code),"message":"Error al consultar PrestaShop"}]}
+
+    if since:
+        product_ids = [pid for pid in (index.get(sku) for sku in skus) if pid]
+        error = await stock_index.load(sync_client, product_ids)
+    else:
+        error = await stock_index.load(sync_client)
+    if error is not None:
+        return index, stock_index, {"status":"error","data":None,"errors":[{"code":str(error.status_code),"message":"Error al consultar stock en PrestaShop"}]}
+    return index, stock_index, None
+
+def changed_skus(outcome):
+    # lo escrito en PrestaShop deja de ser válido en la caché de lecturas
+    return [sku for key, sku in outcome if key in ("created", "updated_existing")]
+
+def has_failed(p, outcome):
+    # los fallos con SKU se reintentan en el siguiente delta aunque Odoo no los toque
+    return bool((p.get("default_code") or "").strip()) and any(k in ("create_errors", "stock_errors") for k, _ in outcome)
+
 # ---------- ENDPOINT PRINCIPAL ----------
 @router.get("/products/from-odoo/bulk")
-async def import_products_from_odoo():
+async def import_products_from_odoo(
+    mode: str = Query("full", pattern="^(full|delta)$"),
+    workers: int = Query(SYNC_WORKERS, ge=1, le=64),
+    odoo: AsyncOdoo = Depends(get_async_odoo),
+    client: httpx.AsyncClient = Depends(get_prestashop_client),
+    tenant: Tenant = Depends(get_tenant),
+    store: SyncStore = Depends(get_sync_store),
+    cache: Cache = Depends(get_cache),
+):
+    # síncrono: la petición espera a que termine todo. Para catálogos grandes usar el POST (trabajo)
 
-    if not BASE_URL or not API_KEY:
+    if not tenant.prestashop_configured:
         return {"status":"error","data":None,"errors":[{"code":"500","message":"PrestaShop no configurado"}]}
 
-    created, updated, skipped_price_stock_0, create_errors, stock_errors = [], [], [], [], []
-    products = get_odoo_products()
+    report = {key: [] for key in REPORT_KEYS}
 
-    async with httpx.AsyncClient(timeout=40) as client:
-        for p in products:
-            sku = (p.get("default_code") or "").strip()
-            name = (p.get("name") or "").strip()
-            price = float(p.get("list_price") or 0)
-            stock = float(p.get("qty_available") or 0)
+    high_watermark = await get_high_watermark(odoo)
+    since = store.get_watermark(WATERMARK) if mode == "delta" else None
+    products = await load_products(odoo, store, since)
 
-            if not sku:
-                create_errors.append(p.get("id"))
-                continue
+    sync_client = SyncClient(client)
+    index, stock_index, error = await load_indexes(sync_client, products, since)
+    if error is not None:
+        return error
 
-            # NO crear si precio=0 Y stock=0
-            if price == 0 and stock == 0:
-                skipped_price_stock_0.append(sku)
-                continue
+    outcomes = await run_bounded(products, lambda p: sync_product(sync_client, index, stock_index, p), workers)
+    failed = []
+    for p, outcome in zip(products, outcomes):
+        for key, value in outcome:
+            report[key].append(value)
+        if has_failed(p, outcome):
+            failed.append(p["id"])
 
-            # buscar por reference
-            product_id = await get_product_id_by_reference(client, sku)
+    for outcome in outcomes:
+        for sku in changed_skus(outcome):
+            await cache.invalidate(("product", sku))
+    await cache.invalidate(("products",))
 
-            # Si no existe, crear
-            if not product_id:
-                rc = await create_product(client, name, sku, price)
-                if rc.status_code not in (200, 201):
-                    create_errors.append(sku)
-                    continue
-                product_id = await get_product_id_by_reference(client, sku)
-                if not product_id:
-                    create_errors.append(sku)
-                    continue
-                created.append(sku)
-            else:
-                updated.append(sku)
-
-            # Stock: GET stock_available (se crea automáticamente)
-            stock_xml = await get_stock_available_full_by_product(client, product_id)
-            if not stock_xml:
-                stock_errors.append(sku)
-                continue
-
-            info = parse_stock_info(stock_xml)
-            if not info["id"]:
-                stock_errors.append(sku)
-                continue
-
-            # PATCH quantity. Si falla, fallback a PUT completo.
-            rs = await patch_stock_quantity(client, info["id"], stock)
-            if rs.status_code not in (200, 201):
-                rs2 = await put_stock_full(client, info, stock)
-                if rs2.status_code not in (200, 201):
-                    stock_errors.append(sku)
+    store.set_pending(WATERMARK, failed)
+    if high_watermark:
+        store.set_watermark(WATERMARK, high_watermark)
+
+    return {
+        "status":"success",
+        "data": report,
+        "errors":[]
+    }
+
+# ---------- TRABAJO EN SEGUNDO PLANO ----------
+def _job_key(p):
+    # orden estable por SKU: el cursor guardado es el último (sku, id) confirmado
+    return [(p.get("default_code") or "").strip(), p["id"]]
+
+@job_handler(BULK_JOB)
+async def run_bulk_job(job, tenant):
+    if not tenant.prestashop_configured:
+        raise JobError("PrestaShop no configurado")
+
+    odoo = tenant.odoo
+    store = tenant.store
+    cache = tenant.cache
+    params = job.params
+
+    # primera ejecución: se fija la foto de Odoo; al retomar se reutiliza la misma
+    if "high_watermark" not in params:
+        params["high_watermark"] = await get_high_watermark(odoo)
+        params["since"] = store.get_watermark(WATERMARK) if params["mode"] == "delta" else None
+        job.save_params()
+
+    products = await load_products(odoo, store, params["since"])
+    products.sort(key=_job_key)
+    job.set_total(len(products))
+    if job.cursor is not None:
+        products = [p for p in products if _job_key(p) > job.cursor]
+
+    sync_client = SyncClient(tenant.prestashop_client)
+    index, stock_index, error = await load_indexes(sync_client, products, params["since"])
+    if error is not None:
+        raise JobError(f"{error['errors'][0]['code']}: {error['errors'][0]['message']}")
+
+    async def worker(item):
+        i, p = item
+        outcome = await sync_product(sync_client, index, stock_index, p)
+        for sku in changed_skus(outcome):
+            await cache.invalidate(("product", sku))
+        counters = {}
+        for key, _ in outcome:
+            counters[key] = counters.get(key, 0) + 1
+        failed_id = p["id"] if has_failed(p, outcome) else None
+        errors = [(key, str(value), failed_id) for key, value in outcome if key in ("create_errors", "stock_errors")]
+        job.done(i, _job_key(p), counters, errors)
+
+    await run_bounded(list(enumerate(products)), worker, params["workers"])
+    job.checkpoint()
+    await cache.invalidate(("products",))
+
+    # pendientes: fallos de todas las ejecuciones del trabajo, no solo de la última
+    failed = {product_id for _, _, product_id in store.get_job_errors(job.id) if product_id is not None}
+    store.set_pending(WATERMARK, sorted(failed))
+    if params["high_watermark"]:
+        store.set_watermark(WATERMARK, params["high_watermark"])
+
+@router.post("/products/from-odoo/bulk")
+async def create_bulk_job(
+    mode: str = Query("full", pattern="^(full|delta)$"),
+    workers: int = Query(SYNC_WORKERS, ge=1, le=64),
+    tenant: Tenant = Depends(get_tenant),
+    store: SyncStore = Depends(get_sync_store),
+):
+    if not tenant.prestashop_configured:
+        return {"status":"error","data":None,"errors":[{"code":"500","message":"PrestaShop no configurado"}]}
+
+    job_id = store.create_job(BULK_JOB, {"mode": mode, "workers": workers})
+    tenant.job_runner.wake()
+    return {
+        "status":"success",
+        "data": job_snapshot(store.get_job(job_id)),
+        "errors":[]
+    }
+
+def _job_report(store, row):
+    data = job_snapshot(row)
+    if row["status"] in FINISHED:
+        errors = {"create_errors": [], "stock_errors": []}
+        for kind, value, _ in store.get_job_errors(row["id"]):
+            errors[kind].append(value)
+        data["errors"] = errors
+    return data
+
+async def _follow(store, job_id, interval):
+    # una línea NDJSON por intervalo hasta que el trabajo termina
+    while True:
+        row = store.get_job(job_id)
+        if row["status"] in FINISHED:
+            yield _job_report(store, row)
+            return
+        yield job_snapshot(row)
+        await asyncio.sleep(interval)
+
+@router.get("/products/from-odoo/bulk/jobs/{job_id}")
+async def get_bulk_job(
+    job_id: str,
+    follow: bool = Query(False),
+    interval: float = Query(1.0, gt=0, le=60),
+    store: SyncStore = Depends(get_sync_store),
+):
+    row = store.get_job(job_id)
+    if row is None or row["kind"] != BULK_JOB:
+        return {"status":"error","data":None,"errors":[{"code":"404","message":"Trabajo no encontrado"}]}
+
+    if follow:
+        return ndjson_response(_follow(store, job_id, interval))
 
     return {
         "status":"success",
-        "data":{
-            "created": created,
-            "updated_existing": updated,
-            "skipped_price0_stock0": skipped_price_stock_0,
-            "create_errors": create_errors,
-            "stock_errors": stock_errors
-        },
+        "data": _job_report(store, row),
         "errors":[]
-    }
\ No newline at end of file
+    }
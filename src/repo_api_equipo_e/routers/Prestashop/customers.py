@@ -1,43 +1,28 @@
-import os
 import httpx
 import logging
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Query, Request
+from repo_api_equipo_e.cache import CACHE_TTL, Cache
+from repo_api_equipo_e.prestashop import stream_resource
+from repo_api_equipo_e.conditional import render_envelope, rendered_response
+from repo_api_equipo_e.streaming import ndjson_response
+from repo_api_equipo_e.tenants import Tenant, get_cache, get_prestashop_client, get_tenant
+from repo_api_equipo_e.upstream import UpstreamUnavailable
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-BASE_URL = os.getenv("PRESTASHOP_BASE_URL", "").rstrip("/")
-API_KEY = os.getenv("PRESTASHOP_API_KEY", "")
-
-
-@router.get("/customers")
-async def get_customers():
-
-    if not BASE_URL or not API_KEY:
-        return {
-            "status": "error",
-            "data": None,
-            "errors": [
-                {
-                    "code": "500",
-                    "message": "PrestaShop no configurado - falta BASE_URL o API_KEY"
-                }
-            ]
-        }
 
+async def _fetch_customers(client):
     try:
-        async with httpx.AsyncClient() as client:
-            url = f"{BASE_URL}/api/customers"
-            logger.debug(f"Requesting: {url}")
-            
-            r = await client.get(
-                url,
-                params={
-                    "ws_key": API_KEY,
-                    "display": "full",
-                    "output_format": "JSON"
-                }
-            )
+        url = "/api/customers"
+
+        r = await client.get(
+            url,
+            params={
+                "display": "full",
+                "output_format": "JSON"
+            }
+        )
 
         if r.status_code != 200:
             logger.error(f"PrestaShop API error: {r.status_code} - {r.text}")
@@ -51,6 +36,9 @@ async def get_customers():
                     }
                 ]
             }
+    except UpstreamUnavailable:
+        # respuesta estándar de origen no disponible (manejador global)
+        raise
     except Exception as e:
         logger.error(f"Exception calling PrestaShop: {e}")
         return {
@@ -83,9 +71,71 @@ async def get_customers():
             ]
         }
 
-    # SUCCESS
+    # SUCCESS: en JSON se mantiene la respuesta de siempre (un cliente); el listado
+    # completo está en format=ndjson
     return {
         "status": "success",
         "data": customers[0],
         "errors": []
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/customers")
+async def get_customers(
+    request: Request,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    client: httpx.AsyncClient = Depends(get_prestashop_client),
+    tenant: Tenant = Depends(get_tenant),
+    cache: Cache = Depends(get_cache),
+):
+
+    if not tenant.prestashop_configured:
+        return {
+            "status": "error",
+            "data": None,
+            "errors": [
+                {
+                    "code": "500",
+                    "message": "PrestaShop no configurado - falta base_url o api_key"
+                }
+            ]
+        }
+
+    if format == "ndjson":
+        try:
+            r, records = await stream_resource(client, "customers", {"display": "full"})
+        except UpstreamUnavailable:
+            raise
+        except Exception as e:
+            logger.error(f"Exception calling PrestaShop: {e}")
+            return {
+                "status": "error",
+                "data": None,
+                "errors": [
+                    {
+                        "code": "500",
+                        "message": f"Error de conexión: {str(e)}"
+                    }
+                ]
+            }
+        if records is None:
+            logger.error(f"PrestaShop API error: {r.status_code} - {r.text}")
+            return {
+                "status": "error",
+                "data": None,
+                "errors": [
+                    {
+                        "code": str(r.status_code),
+                        "message": f"Error al consultar PrestaShop: {r.text[:200]}"
+                    }
+                ]
+            }
+        return ndjson_response(records)
+
+    # se cachea ya serializado y con su ETag (hash del contenido)
+    rendered = await cache.get_or_load(
+        ("customers", "json"),
+        lambda: render_envelope(lambda: _fetch_customers(client)),
+        CACHE_TTL["customer"]
+    )
+    return rendered_response(request, rendered)
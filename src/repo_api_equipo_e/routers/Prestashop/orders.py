@@ -1,38 +1,33 @@
-import os
 import httpx
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Query, Request
+from repo_api_equipo_e.cache import CACHE_TTL, Cache
+from repo_api_equipo_e.prestashop import stream_resource
+from repo_api_equipo_e.conditional import render_envelope, rendered_response
+from repo_api_equipo_e.streaming import ndjson_response
+from repo_api_equipo_e.tenants import Tenant, get_cache, get_prestashop_client, get_tenant
 
 router = APIRouter()
 
-BASE_URL = os.getenv("PRESTASHOP_BASE_URL", "").rstrip("/")
-API_KEY = os.getenv("PRESTASHOP_API_KEY", "")
 
-@router.get("/orders")
-async def getOrders():
-  
-    if not BASE_URL or not API_KEY:
-        return {
-            "status": "error",
-            "data": None,
-            "errors": [
-                {
-                    "code": "500",
-                    "message": "PrestaShop no configurado"
-                }
-            ]
-        }
+def clean_order(order):
+    return {
+        "id": order.get("id"),
+        "referencia": order.get("reference"),
+        "total_pagado": order.get("total_paid"),
+        "fecha": order.get("date_add"),
+        "id_cliente": order.get("id_customer"),
+        "estado_actual": order.get("current_state")
+    }
 
-    async with httpx.AsyncClient() as client:
-        r = await client.get(
-            f"{BASE_URL}/api/orders",
-            params={
-                "ws_key": API_KEY,
-                "display": "full",
-                "output_format": "JSON"
-            }
-        )
-        print(f"Status Code: {r.status_code}")
-        print(f"Respuesta: {r.text}")
+
+async def _fetch_orders(client):
+    r = await client.get(
+        "/api/orders",
+        params={
+            "display": "full",
+            "output_format": "JSON"
+        }
+    )
 
     if r.status_code != 200:
         return {
@@ -64,19 +59,55 @@ async def getOrders():
                 }
             ]
         }
-    cleaned_orders = []
-    for order in orders:
-        cleaned_orders.append({
-            "id": order.get("id"),
-            "referencia": order.get("reference"),
-            "total_pagado": order.get("total_paid"),
-            "fecha": order.get("date_add"),
-            "id_cliente": order.get("id_customer"),
-            "estado_actual": order.get("current_state")
-        })
+    cleaned_orders = [clean_order(order) for order in orders]
 
     return {
         "status": "success",
         "data": cleaned_orders,
         "errors": []
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/orders")
+async def getOrders(
+    request: Request,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    client: httpx.AsyncClient = Depends(get_prestashop_client),
+    tenant: Tenant = Depends(get_tenant),
+    cache: Cache = Depends(get_cache),
+):
+  
+    if not tenant.prestashop_configured:
+        return {
+            "status": "error",
+            "data": None,
+            "errors": [
+                {
+                    "code": "500",
+                    "message": "PrestaShop no configurado"
+                }
+            ]
+        }
+
+    if format == "ndjson":
+        r, records = await stream_resource(client, "orders", {"display": "full"}, clean_order)
+        if records is None:
+            return {
+                "status": "error",
+                "data": None,
+                "errors": [
+                    {
+                        "code": str(r.status_code),
+                        "message": "Error al consultar PrestaShop"
+                    }
+                ]
+            }
+        return ndjson_response(records)
+
+    # se cachea ya serializado y con su ETag (hash del contenido)
+    rendered = await cache.get_or_load(
+        ("orders", "json"),
+        lambda: render_envelope(lambda: _fetch_orders(client)),
+        CACHE_TTL["order"]
+    )
+    return rendered_response(request, rendered)
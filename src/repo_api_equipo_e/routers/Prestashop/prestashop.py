@@ -3,6 +3,7 @@ from . import productSku, orderReference, customers, suppliers, payments, orders
 
 router = APIRouter(prefix="/prestashop", tags=["PrestaShop"])
 
+router.include_router(productSku.router)
 router.include_router(orderReference.router)
 router.include_router(customers.router)
 router.include_router(suppliers.router)
@@ -1,19 +1,31 @@
 import os
+import xmlrpc.client
 import httpx
 import xml.etree.ElementTree as ET
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Query, Response
+from pydantic import BaseModel
+from repo_api_equipo_e.cache import Cache
+from repo_api_equipo_e.odoo import AsyncOdoo
+from repo_api_equipo_e.sync import PATCH_SUPPORT, SYNC_WORKERS, ReferenceIndex, SyncClient, filter_safe, run_bounded
+from repo_api_equipo_e.tenants import Tenant, get_async_odoo, get_cache, get_prestashop_client, get_tenant
 
 router = APIRouter()
 
-BASE_URL = os.getenv("PRESTASHOP_BASE_URL", "").rstrip("/")
-API_KEY = os.getenv("PRESTASHOP_API_KEY", "")
+DEACTIVATE_MAX_REFERENCES = int(os.getenv("DEACTIVATE_MAX_REFERENCES", "20000"))
+
+NON_WRITABLE_FIELDS = {
+    "manufacturer_name",
+    "quantity",
+    "position_in_category",
+    "id_default_image",
+    "id_default_combination",
+}
 
 
 async def _get_product_by_reference(client: httpx.AsyncClient, reference: str):
     response = await client.get(
-        f"{BASE_URL}/api/products",
+        "/api/products",
         params={
-            "ws_key": API_KEY,
             "filter[reference]": f"[{reference}]",
             "display": "full",
             "output_format": "JSON",
@@ -25,59 +37,88 @@ async def _get_product_by_reference(client: httpx.AsyncClient, reference: str):
 
 async def _get_product_xml_by_id(client: httpx.AsyncClient, product_id: str):
     response = await client.get(
-        f"{BASE_URL}/api/products/{product_id}",
-        params={"ws_key": API_KEY},
+        f"/api/products/{product_id}",
         headers={"Accept": "application/xml"}
     )
     return response
 
 
-async def _disable_product_active_field(client: httpx.AsyncClient, product_id: str):
-    product_xml_response = await _get_product_xml_by_id(client, product_id)
-
-    if product_xml_response.status_code != 200:
-        return product_xml_response
-
+def _deactivated_xml(xml_text: str):
+    # (xml para el PUT, estaba_activo), o None si la respuesta no trae un producto
     try:
-        root = ET.fromstring(product_xml_response.text)
+        root = ET.fromstring(xml_text)
     except ET.ParseError:
-        return product_xml_response
+        return None
 
     active_node = root.find(".//product/active")
     if active_node is None:
-        return product_xml_response
-
+        return None
+    was_active = (active_node.text or "").strip() != "0"
     active_node.text = "0"
 
     product_node = root.find(".//product")
     if product_node is not None:
-        non_writable_fields = {
-            "manufacturer_name",
-            "quantity",
-            "position_in_category",
-            "id_default_image",
-            "id_default_combination",
-        }
         for child in list(product_node):
             tag_name = child.tag.split("}")[-1]
-            if tag_name in non_writable_fields:
+            if tag_name in NON_WRITABLE_FIELDS:
                 product_node.remove(child)
 
-    xml_payload = ET.tostring(root, encoding="utf-8", xml_declaration=True)
+    return ET.tostring(root, encoding="utf-8", xml_declaration=True), was_active
+
+
+async def _patch_product_inactive(client: httpx.AsyncClient, product_id: str):
+    # solo <active>: unos cientos de bytes frente al documento completo con todos los idiomas
+    xml = f"""<?xml version="1.0" encoding="UTF-8"?>
+<prestashop><product>
+<id><![CDATA[{product_id}]]></id>
+<active><![CDATA[0]]></active>
+</product></prestashop>"""
+    return await client.patch(
+        f"/api/products/{product_id}",
+        headers={"Content-Type": "application/xml", "Accept": "application/xml"},
+        content=xml.encode("utf-8"),
+    )
+
+
+async def _disable_product_active_field(client: httpx.AsyncClient, product_id: str):
+    # PATCH mínimo; si la tienda no lo admite (o lo rechaza) se cae al GET + PUT completo
+    shop = str(client.base_url)
+    if PATCH_SUPPORT.enabled(shop, "products"):
+        response = await _patch_product_inactive(client, product_id)
+        if response.status_code in (200, 201, 404):
+            return response
+        PATCH_SUPPORT.observe(shop, "products", response)
+    return await _put_product_inactive(client, product_id)
+
+
+async def _put_product_inactive(client: httpx.AsyncClient, product_id: str):
+    # devuelve la respuesta del PUT; si el producto ya estaba inactivo, la del GET (sin escribir)
+    product_xml_response = await _get_product_xml_by_id(client, product_id)
+
+    if product_xml_response.status_code != 200:
+        return product_xml_response
+
+    deactivated = _deactivated_xml(product_xml_response.text)
+    if deactivated is None:
+        return product_xml_response
+
+    xml_payload, was_active = deactivated
+    if not was_active:
+        return product_xml_response
 
     response = await client.put(
-        f"{BASE_URL}/api/products/{product_id}",
-        params={"ws_key": API_KEY},
+        f"/api/products/{product_id}",
         headers={"Content-Type": "application/xml"},
         content=xml_payload
     )
     return response
 
 
-@router.get("/product/{reference}")
-async def deactivate_product(reference: str):
+# POST: escribe en PrestaShop. La consulta por SKU es GET /product/sku/{sku} (productSku.py)
+@router.post("/product/{reference}/deactivate")
+async def deactivate_product(reference: str, client: httpx.AsyncClient = Depends(get_prestashop_client), tenant: Tenant = Depends(get_tenant), cache: Cache = Depends(get_cache)):
 
-    if not BASE_URL or not API_KEY:
+    if not tenant.prestashop_configured:
         return {
             "status": "error",
             "data": None,
@@ -89,52 +130,68 @@ async def deactivate_product(reference: str):
             ]
         }
 
-    async with httpx.AsyncClient() as client:
-        product_response = await _get_product_by_reference(client, reference)
-
-        if product_response.status_code != 200:
-            return {
-                "status": "error",
-                "data": None,
-                "errors": [
-                    {
-                        "code": str(product_response.status_code),
-                        "message": "Error al consultar PrestaShop"
-                    }
-                ]
-            }
-
-        product_data = product_response.json()
-        products = product_data if isinstance(product_data, list) else product_data.get("products", [])
-
-        if not products:
-            return {
-                "status": "error",
-                "data": None,
-                "errors": [
-                    {
-                        "code": "404",
-                        "message": "Producto no encontrado"
-                    }
-                ]
-            }
-
-        product = products[0]
-        product_id = str(product.get("id", "")).strip()
-
-        if not product_id:
-            return {
-                "status": "error",
-                "data": None,
-                "errors": [
-                    {
-                        "code": "500",
-                        "message": "El producto no tiene id válido"
-                    }
-                ]
-            }
+    if not filter_safe(reference):
+        return {
+            "status": "error",
+            "data": None,
+            "errors": [
+                {
+                    "code": "400",
+                    "message": "La referencia no puede contener | [ ]"
+                }
+            ]
+        }
+
+    product_response = await _get_product_by_reference(client, reference)
+
+    if product_response.status_code != 200:
+        return {
+            "status": "error",
+            "data": None,
+            "errors": [
+                {
+                    "code": str(product_response.status_code),
+                    "message": "Error al consultar PrestaShop"
+                }
+            ]
+        }
+
+    product_data = product_response.json()
+    products = product_data if isinstance(product_data, list) else product_data.get("products", [])
+
+    if not products:
+        return {
+            "status": "error",
+            "data": None,
+            "errors": [
+                {
+                    "code": "404",
+                    "message": "Producto no encontrado"
+                }
+            ]
+        }
+
+    product = products[0]
+    product_id = str(product.get("id", "")).strip()
+
+    if not product_id:
+        return {
+            "status": "error",
+            "data": None,
+            "errors": [
+                {
+                    "code": "500",
+                    "message": "El producto no tiene id válido"
+                }
+            ]
+        }
 
+    if str(product.get("active", "1")) == "0":
+        update_response = product_response
+    else:
         update_response = await _disable_product_active_field(client, product_id)
+        await cache.invalidate(("product", reference))
+        await cache.invalidate(("products",))
 
     if update_response.status_code not in (200, 201):
         error_detail = update_response.text[:300] if update_response.text else ""
@@ -165,3 +222,106 @@ async def deactivate_product(reference: str):
         },
         "errors": []
     }
+
+
+# Alias obsoleto: la desactivación era GET /product/{reference}. Se mantiene una versión más para
+# los clientes existentes y se quitará en la siguiente; usar POST /product/{reference}/deactivate
+@router.get("/product/{reference}", deprecated=True)
+async def deactivate_product_deprecated(reference: str, response: Response, client: httpx.AsyncClient = Depends(get_prestashop_client), tenant: Tenant = Depends(get_tenant), cache: Cache = Depends(get_cache)):
+    response.headers["Deprecation"] = "true"
+    return await deactivate_product(reference, client, tenant, cache)
+
+
+# ---------- DESACTIVACIÓN MASIVA ----------
+class BulkDeactivateRequest(BaseModel):
+    # referencias de PrestaShop, o un dominio de product.product en Odoo (p. ej. [["active", "=", false]])
+    references: list[str] | None = None
+    domain: list | None = None
+
+
+async def _odoo_references(odoo, domain):
+    # active_test=False: los productos archivados en Odoo también cuentan
+    rows = await odoo.execute_kw(
+        "product.product", "search_read",
+        [domain],
+        {"fields": ["default_code"], "context": {"active_test": False}}
+    )
+    return [(r.get("default_code") or "").strip() for r in rows]
+
+
+async def _deactivate_one(client, index, reference):
+    product_id = index.get(reference)
+    if not product_id:
+        return {"referencia": reference, "id": None, "estado": "no_encontrado", "code": "404"}
+    if index.attr(reference, "active") == "0":
+        return {"referencia": reference, "id": product_id, "estado": "ya_inactivo", "code": "200"}
+
+    try:
+        response = await _disable_product_active_field(client, product_id)
+    except httpx.HTTPError as e:
+        return {"referencia": reference, "id": product_id, "estado": "error", "code": "502", "detail": str(e)[:300]}
+
+    if response.status_code not in (200, 201):
+        return {"referencia": reference, "id": product_id, "estado": "error", "code": str(response.status_code),
+                "detail": response.text[:300] if response.text else ""}
+
+    # GET sin escritura: ya estaba inactivo
+    estado = "ya_inactivo" if response.request.method == "GET" else "desactivado"
+    return {"referencia": reference, "id": product_id, "estado": estado, "code": str(response.status_code)}
+
+
+@router.post("/products/deactivate/bulk")
+async def deactivate_products_bulk(
+    body: BulkDeactivateRequest,
+    workers: int = Query(SYNC_WORKERS, ge=1, le=64),
+    odoo: AsyncOdoo = Depends(get_async_odoo),
+    client: httpx.AsyncClient = Depends(get_prestashop_client),
+    tenant: Tenant = Depends(get_tenant),
+    cache: Cache = Depends(get_cache),
+):
+
+    if not tenant.prestashop_configured:
+        return {"status":"error","data":None,"errors":[{"code":"500","message":"PrestaShop no configurado"}]}
+
+    if (body.references is None) == (body.domain is None):
+        return {"status":"error","data":None,"errors":[{"code":"400","message":"Indicar references o domain (solo uno)"}]}
+
+    if body.domain is not None:
+        try:
+            references = await _odoo_references(odoo, body.domain)
+        except xmlrpc.client.Fault as e:
+            return {"status":"error","data":None,"errors":[{"code":"400","message":f"Dominio de Odoo no válido: {e.faultString}"}]}
+    else:
+        references = body.references
+        # del dominio de Odoo pueden venir (ReferenceIndex las resuelve sin filtro); a mano, no
+        invalid = [r for r in references if r and not filter_safe(r)]
+        if invalid:
+            return {"status":"error","data":None,"errors":[{"code":"400","message":f"Referencias con | [ ] no admitidas: {', '.join(invalid[:20])}"}]}
+
+    references = list(dict.fromkeys(r.strip() for r in references if r and r.strip()))
+    if len(references) > DEACTIVATE_MAX_REFERENCES:
+        return {"status":"error","data":None,"errors":[{"code":"413","message":f"Máximo {DEACTIVATE_MAX_REFERENCES} referencias por llamada"}]}
+
+    # ids en bloque (filter[reference]=[a|b|...]) en lugar de una búsqueda por referencia
+    sync_client = SyncClient(client)
+    index = ReferenceIndex(fields=("active",))
+    error = await index.load(sync_client, references) if references else None
+    if error is not None:
+        return {"status":"error","data":None,"errors":[{"code":str(error.status_code),"message":"Error al consultar PrestaShop"}]}
+
+    results = await run_bounded(references, lambda ref: _deactivate_one(sync_client, index, ref), workers)
+
+    for result in results:
+        if result["estado"] == "desactivado":
+            await cache.invalidate(("product", result["referencia"]))
+    await cache.invalidate(("products",))
+
+    summary = {"solicitadas": len(references), "desactivado": 0, "ya_inactivo": 0, "no_encontrado": 0, "error": 0}
+    for result in results:
+        summary[result["estado"]] += 1
+
+    return {
+        "status": "success",
+        "data": {**summary, "resultados": results},
+        "errors": []
+    }
@@ -1,38 +1,21 @@
-import os
 import httpx
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from repo_api_equipo_e.cache import CACHE_TTL, Cache
+from repo_api_equipo_e.sync import filter_safe
+from repo_api_equipo_e.tenants import Tenant, get_cache, get_prestashop_client, get_tenant
 
 router = APIRouter()
 
-BASE_URL = os.getenv("PRESTASHOP_BASE_URL", "").rstrip("/")
-API_KEY = os.getenv("PRESTASHOP_API_KEY", "")
 
-
-@router.get("/product/{sku}")
-async def get_product_by_sku(sku: str):
-
-    if not BASE_URL or not API_KEY:
-        return {
-            "status": "error",
-            "data": None,
-            "errors": [
-                {
-                    "code": "500",
-                    "message": "PrestaShop no configurado"
-                }
-            ]
+async def _fetch_product(client, sku):
+    r = await client.get(
+        "/api/products",
+        params={
+            "filter[reference]": f"[{sku}]",
+            "display": "full",
+            "output_format": "JSON"
         }
-
-    async with httpx.AsyncClient() as client:
-        r = await client.get(
-            f"{BASE_URL}/api/products",
-            params={
-                "ws_key": API_KEY,
-                "filter[reference]": f"[{sku}]",
-                "display": "full",
-                "output_format": "JSON"
-            }
-        )
+    )
 
     if r.status_code != 200:
         return {
@@ -70,4 +53,39 @@ async def get_product_by_sku(sku: str):
         "status": "success",
         "data": products[0],
         "errors": []
-    }
\ No newline at end of file
+    }
+
+
+# GET /product/{reference} sigue siendo, por compatibilidad, la desactivación (productDeactivate.py)
+@router.get("/product/sku/{sku}")
+async def get_product_by_sku(sku: str, client: httpx.AsyncClient = Depends(get_prestashop_client), tenant: Tenant = Depends(get_tenant), cache: Cache = Depends(get_cache)):
+
+    if not tenant.prestashop_configured:
+        return {
+            "status": "error",
+            "data": None,
+            "errors": [
+                {
+                    "code": "500",
+                    "message": "PrestaShop no configurado"
+                }
+            ]
+        }
+
+    if not filter_safe(sku):
+        return {
+            "status": "error",
+            "data": None,
+            "errors": [
+                {
+                    "code": "400",
+                    "message": "La referencia no puede contener | [ ]"
+                }
+            ]
+        }
+
+    return await cache.get_or_load(
+        ("product", sku),
+        lambda: _fetch_product(client, sku),
+        CACHE_TTL["product"]
+    )
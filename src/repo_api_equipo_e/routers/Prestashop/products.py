@@ -1,37 +1,36 @@
-import os
 import httpx
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Query, Request
+from repo_api_equipo_e.cache import CACHE_TTL, Cache
+from repo_api_equipo_e.conditional import render_envelope, rendered_response
+from repo_api_equipo_e.prestashop import stream_resource
+from repo_api_equipo_e.streaming import ndjson_response
+from repo_api_equipo_e.tenants import Tenant, get_cache, get_prestashop_client, get_tenant
 
 router = APIRouter()
 
-BASE_URL = os.getenv("PRESTASHOP_BASE_URL", "").rstrip("/")
-API_KEY = os.getenv("PRESTASHOP_API_KEY", "")
 
+def clean_product(product):
+    composed_name = product.get("name", "")
+    name = composed_name[0].get("value") if isinstance(composed_name, list) else composed_name
 
-@router.get("/product")
-async def get_products():
+    return {
+        "id": product.get("id"),
+        "nombre": name,
+        "referencia": product.get("reference"),
+        "precio": product.get("price"),
+        "stock": product.get("quantity"),
+        "activo": "Sí" if product.get("active") == "1" else "No"
+    }
 
-    if not BASE_URL or not API_KEY:
-        return {
-            "status": "error",
-            "data": None,
-            "errors": [
-                {
-                    "code": "500",
-                    "message": "PrestaShop no configurado"
-                }
-            ]
-        }
 
-    async with httpx.AsyncClient() as client:
-        r = await client.get(
-            f"{BASE_URL}/api/products",
-            params={
-                "ws_key": API_KEY,
-                "display": "full",
-                "output_format": "JSON"
-            }
-        )
+async def _fetch_products(client):
+    r = await client.get(
+        "/api/products",
+        params={
+            "display": "full",
+            "output_format": "JSON"
+        }
+    )
 
     if r.status_code != 200:
         return {
@@ -63,23 +62,56 @@ async def get_products():
                 }
             ]
         }
-    cleaned_products = []
-    for product in products:
-        composed_name = product.get("name", "")
-        name = composed_name[0].get("value") if isinstance(composed_name, list) else composed_name
-        
-        cleaned_products.append({
-            "id": product.get("id"),
-            "nombre": name,
-            "referencia": product.get("reference"),
-            "precio": product.get("price"),
-            "stock": product.get("quantity"),
-            "activo": "Sí" if product.get("active") == "1" else "No"
-        })
+    cleaned_products = [clean_product(product) for product in products]
 
     # SUCCESS
     return {
         "status": "success",
         "data": cleaned_products,
         "errors": []
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/product")
+async def get_products(
+    request: Request,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    client: httpx.AsyncClient = Depends(get_prestashop_client),
+    tenant: Tenant = Depends(get_tenant),
+    cache: Cache = Depends(get_cache),
+):
+
+    if not tenant.prestashop_configured:
+        return {
+            "status": "error",
+            "data": None,
+            "errors": [
+                {
+                    "code": "500",
+                    "message": "PrestaShop no configurado"
+                }
+            ]
+        }
+
+    if format == "ndjson":
+        r, records = await stream_resource(client, "products", {"display": "full"}, clean_product)
+        if records is None:
+            return {
+                "status": "error",
+                "data": None,
+                "errors": [
+                    {
+                        "code": str(r.status_code),
+                        "message": "Error al consultar PrestaShop"
+                    }
+                ]
+            }
+        return ndjson_response(records)
+
+    # se cachea ya serializado y con su ETag (hash del contenido)
+    rendered = await cache.get_or_load(
+        ("products",),
+        lambda: render_envelope(lambda: _fetch_products(client)),
+        CACHE_TTL["product"]
+    )
+    return rendered_response(request, rendered)
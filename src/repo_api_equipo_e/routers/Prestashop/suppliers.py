@@ -1,36 +1,20 @@
-import os
 import httpx
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, Request
+from repo_api_equipo_e.cache import CACHE_TTL, Cache
+from repo_api_equipo_e.conditional import render_envelope, rendered_response
+from repo_api_equipo_e.tenants import Tenant, get_cache, get_prestashop_client, get_tenant
 
 router = APIRouter()
 
-BASE_URL = os.getenv("PRESTASHOP_BASE_URL", "").rstrip("/")
-API_KEY = os.getenv("PRESTASHOP_API_KEY", "")
 
-
-@router.get("/suppliers")
-async def get_suppliers():
-    if not BASE_URL or not API_KEY:
-        return {
-            "status": "error",
-            "data": None,
-            "errors": [
-                {
-                    "code": "500",
-                    "message": "PrestaShop no configurado"
-                }
-            ]
+async def _fetch_suppliers(client):
+    r = await client.get(
+        "/api/suppliers",
+        params={
+            "display": "full",
+            "output_format": "JSON"
         }
-
-    async with httpx.AsyncClient() as client:
-        r = await client.get(
-            f"{BASE_URL}/api/suppliers",
-            params={
-                "ws_key": API_KEY,
-                "display": "full",
-                "output_format": "JSON"
-            }
-        )
+    )
 
     if r.status_code != 200:
         return {
@@ -52,9 +36,9 @@ async def get_suppliers():
     }
 
 
-@router.get("/suppliers/{supplier_id}")
-async def get_supplier(supplier_id: int):
-    if not BASE_URL or not API_KEY:
+@router.get("/suppliers")
+async def get_suppliers(request: Request, client: httpx.AsyncClient = Depends(get_prestashop_client), tenant: Tenant = Depends(get_tenant), cache: Cache = Depends(get_cache)):
+    if not tenant.prestashop_configured:
         return {
             "status": "error",
             "data": None,
@@ -66,15 +50,23 @@ async def get_supplier(supplier_id: int):
             ]
         }
 
-    async with httpx.AsyncClient() as client:
-        r = await client.get(
-            f"{BASE_URL}/api/suppliers/{supplier_id}",
-            params={
-                "ws_key": API_KEY,
-                "display": "full",
-                "output_format": "JSON"
-            }
-        )
+    # se cachea ya serializado y con su ETag (hash del contenido)
+    rendered = await cache.get_or_load(
+        ("suppliers", "json"),
+        lambda: render_envelope(lambda: _fetch_suppliers(client)),
+        CACHE_TTL["supplier"]
+    )
+    return rendered_response(request, rendered)
+
+
+async def _fetch_supplier(client, supplier_id):
+    r = await client.get(
+        f"/api/suppliers/{supplier_id}",
+        params={
+            "display": "full",
+            "output_format": "JSON"
+        }
+    )
 
     if r.status_code != 200:
         return {
@@ -93,4 +85,25 @@ async def get_supplier(supplier_id: int):
         "status": "success",
         "data": data,
         "errors": []
-    }
\ No newline at end of file
+    }
+
+
+@router.get("/suppliers/{supplier_id}")
+async def get_supplier(supplier_id: int, client: httpx.AsyncClient = Depends(get_prestashop_client), tenant: Tenant = Depends(get_tenant), cache: Cache = Depends(get_cache)):
+    if not tenant.prestashop_configured:
+        return {
+            "status": "error",
+            "data": None,
+            "errors": [
+                {
+                    "code": "500",
+                    "message": "PrestaShop no configurado"
+                }
+            ]
+        }
+
+    return await cache.get_or_load(
+        ("supplier", supplier_id),
+        lambda: _fetch_supplier(client, supplier_id),
+        CACHE_TTL["supplier"]
+    )
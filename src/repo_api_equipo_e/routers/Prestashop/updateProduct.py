@@ -1,41 +1,44 @@
-import os
-import re
 import httpx
-from fastapi import APIRouter
-from repo_api_equipo_e.odoo import connect_odoo
+from fastapi import APIRouter, Depends, Query
+from repo_api_equipo_e.cache import Cache
+from repo_api_equipo_e.catalog import CatalogReplica
+from repo_api_equipo_e.odoo import AsyncOdoo
+from repo_api_equipo_e.sync import PATCH_SUPPORT, StockIndex, filter_safe, resolve_reference, stock_unchanged
+from repo_api_equipo_e.tenants import Tenant, get_async_odoo, get_cache, get_catalog, get_prestashop_client, get_tenant
+from repo_api_equipo_e.xmlrecords import find_text
 
 router = APIRouter()
 
-BASE_URL = os.getenv("PRESTASHOP_BASE_URL", "").rstrip("/")
-API_KEY = os.getenv("PRESTASHOP_API_KEY", "")
 
 # ---------- ODOO ----------
-def get_odoo_products(reference):
-    uid, models, db, password = connect_odoo()
-    return models.execute_kw(
-        db, uid, password,
+async def get_odoo_products(odoo, reference, catalog=None):
+    # réplica local si está al día; un "no existe" de la réplica se confirma en vivo
+    # (el producto puede ser más nuevo que el último refresco)
+    if catalog is not None and catalog.is_fresh():
+        results = catalog.lookup(reference)
+        if results:
+            return results
+    return await odoo.execute_kw(
         "product.product", "search_read",
         [[("default_code", "=", reference)]],
         {"fields": ["id", "name", "default_code", "list_price", "qty_available"]}
     )
 
 # ---------- XML helpers ----------
-def _tag(xml: str, name: str):
-    m = re.search(rf"<{name}[^>]*>\s*(?:<!\[CDATA\[)?(.*?)(?:\]\]>)?\s*</{name}>", xml, re.S)
-    return m.group(1).strip() if m else None
-
-def _first_id(xml: str):
+def _first_id(xml):
     # primer <id> encontrado en el xml
-    return _tag(xml, "id")
+    return find_text(xml, "id")
 
 # ---------- PRESTASHOP (usar XML para evitar respuestas raras JSON) ----------
 async def get_product_id_by_reference(client, sku):
+    if not filter_safe(sku):
+        return await resolve_reference(client, sku)
     r = await client.get(
-        f"{BASE_URL}/api/products",
-        params={"ws_key": API_KEY, "filter[reference]": f"[{sku}]", "display": "[id]"},
+        "/api/products",
+        params={"filter[reference]": f"[{sku}]", "display": "[id]"},
         headers={"Accept": "application/xml"},
     )
-    return _first_id(r.text) if r.status_code == 200 else None
+    return _first_id(r.content) if r.status_code == 200 else None
 
 async def create_product(client, name, sku, price):
     xml = f"""<?xml version="1.0" encoding="UTF-8"?>
@@ -64,34 +67,11 @@ async def create_product(client, name, sku, price):
 </product></prestashop>"""
 
     return await client.post(
-        f"{BASE_URL}/api/products",
-        params={"ws_key": API_KEY},
+        "/api/products",
         headers={"Content-Type": "application/xml", "Accept": "application/xml"},
         content=xml.encode("utf-8"),
     )
 
-async def get_stock_available_full_by_product(client, product_id):
-    r = await client.get(
-        f"{BASE_URL}/api/stock_availables",
-        params={"ws_key": API_KEY, "filter[id_product]": f"[{product_id}]", "display": "full"},
-        headers={"Accept": "application/xml"},
-    )
-    if r.status_code != 200:
-        return None
-    return r.text
-
-def parse_stock_info(stock_xml: str):
-    # toma el primer stock_available que venga
-    return {
-        "id": _tag(stock_xml, "id"),
-        "id_product": _tag(stock_xml, "id_product"),
-        "id_product_attribute": _tag(stock_xml, "id_product_attribute") or "0",
-        "id_shop": _tag(stock_xml, "id_shop") or "1",
-        "id_shop_group": _tag(stock_xml, "id_shop_group") or "0",
-        "depends_on_stock": _tag(stock_xml, "depends_on_stock") or "0",
-        "out_of_stock": _tag(stock_xml, "out_of_stock") or "2",
-    }
-
 async def patch_stock_quantity(client, stock_id, qty):
     xml = f"""<?xml version="1.0" encoding="UTF-8"?>
 <prestashop><stock_available>
@@ -99,8 +79,7 @@ async def patch_stock_quantity(client, stock_id, qty):
 <quantity><![CDATA[{int(qty)}]]></quantity>
 </stock_available></prestashop>"""
     return await client.patch(
-        f"{BASE_URL}/api/stock_availables/{stock_id}",
-        params={"ws_key": API_KEY},
+        f"/api/stock_availables/{stock_id}",
         headers={"Content-Type": "application/xml", "Accept": "application/xml"},
         content=xml.encode("utf-8"),
     )
@@ -118,67 +97,77 @@ async def put_stock_full(client, info, qty):
 <out_of_stock><![CDATA[{info['out_of_stock']}]]></out_of_stock>
 </stock_available></prestashop>"""
     return await client.put(
-        f"{BASE_URL}/api/stock_availables/{info['id']}",
-        params={"ws_key": API_KEY},
+        f"/api/stock_availables/{info['id']}",
         headers={"Content-Type": "application/xml", "Accept": "application/xml"},
         content=xml.encode("utf-8"),
     )
 
 # ---------- ENDPOINT PRINCIPAL ----------
 @router.get("/update_products/from-odoo/{reference}")
-async def import_product_from_odoo(reference):
-    if not BASE_URL or not API_KEY:
+async def import_product_from_odoo(reference, live: bool = Query(False), odoo: AsyncOdoo = Depends(get_async_odoo), client: httpx.AsyncClient = Depends(get_prestashop_client), tenant: Tenant = Depends(get_tenant), cache: Cache = Depends(get_cache), catalog: CatalogReplica = Depends(get_catalog)):
+    if not tenant.prestashop_configured:
         return {"status":"error","data":None,"errors":[{"code":"500","message":"PrestaShop no configurado"}]}
 
-    results = get_odoo_products(reference)
+    results = await get_odoo_products(odoo, reference, None if live else catalog)
     if not results:
       return {"status": "error", "message": "Referencia no encontrada en Odoo"}
     product = results[0]
 
-    async with httpx.AsyncClient(timeout=40) as client:
-      sku = (product.get("default_code") or "").strip()
-      name = (product.get("name") or "").strip()
-      price = float(product.get("list_price") or 0)
-      stock = float(product.get("qty_available") or 0)
-
-      # NO crear si precio=0 Y stock=0
-      if price == 0 and stock == 0:
-        return{"status": "skipped",
-               "message": "Precio y stock en cero"}
-
-      # buscar por reference
-      product_id = await get_product_id_by_reference(client, sku)
-      action_taken = "actualizado" if product_id else "creado"
-
-      # Si no existe, crear
-      if not product_id:
-         return{
-            "status": "skipped",
-            "message": "Producto no encontrado en PrestaShop. La creación de productos nuevos está deshabilitada para evitar inconsistencias. Por favor, cree el producto manualmente en PrestaShop y luego vuelva a intentar esta operación para sincronizar el stock y precio." 
-         }
-
-      # Stock: GET stock_available (se crea automáticamente)
-      stock_xml = await get_stock_available_full_by_product(client, product_id)
-      if not stock_xml:
-        return{"status": "skipped",
-               "message": "No se encontró el registro de inventario"}
-
-
-      info = parse_stock_info(stock_xml)
-      if not info["id"]:
-        return{"status": "skipped",
-               "message": "ID de inventario no válido"}
-
-      # PATCH quantity. Si falla, fallback a PUT completo.
-      rs = await patch_stock_quantity(client, info["id"], stock)
-      if rs.status_code not in (200, 201):
+    sku = (product.get("default_code") or "").strip()
+    name = (product.get("name") or "").strip()
+    price = float(product.get("list_price") or 0)
+    stock = float(product.get("qty_available") or 0)
+
+    # NO crear si precio=0 Y stock=0
+    if price == 0 and stock == 0:
+      return{"status": "skipped",
+             "message": "Precio y stock en cero"}
+
+    # buscar por reference
+    product_id = await get_product_id_by_reference(client, sku)
+    action_taken = "actualizado" if product_id else "creado"
+
+    # Si no existe, crear
+    if not product_id:
+       return{
+          "status": "skipped",
+          "message": "Producto no encontrado en PrestaShop. La creación de productos nuevos está deshabilitada para evitar inconsistencias. Por favor, cree el producto manualmente en PrestaShop y luego vuelva a intentar esta operación para sincronizar el stock y precio." 
+       }
+
+    # Stock: GET stock_available (se crea automáticamente)
+    stock_index = StockIndex()
+    error = await stock_index.load(client, [product_id])
+    if error is not None:
+      return{"status": "skipped",
+             "message": "No se encontró el registro de inventario"}
+
+    info = stock_index.get(product_id)
+    if not info:
+      return{"status": "skipped",
+             "message": "ID de inventario no válido"}
+
+    # PATCH quantity solo si cambia. Si falla, fallback a PUT completo; si la tienda no
+    # admite PATCH se recuerda y las siguientes importaciones van directas al PUT
+    message = f"Producto {action_taken} correctamente"
+    if stock_unchanged(info, stock):
+      message = "Producto sin cambios: el stock ya estaba sincronizado"
+    else:
+      rs = None
+      shop = str(client.base_url)
+      if PATCH_SUPPORT.enabled(shop, "stock_availables"):
+        rs = await patch_stock_quantity(client, info["id"], stock)
+        if rs.status_code not in (200, 201):
+          PATCH_SUPPORT.observe(shop, "stock_availables", rs)
+      if rs is None or rs.status_code not in (200, 201):
         rs2 = await put_stock_full(client, info, stock)
         if rs2.status_code not in (200, 201):
           return {"status": "error", "message": "No se pudo actualizar la cantidad de stock"}
+      await cache.invalidate(("product", sku))
+      await cache.invalidate(("products",))
 
     return {
         "status":"success",
-        "message": f"Producto {action_taken} correctamente",
+        "message": message,
         "data":{
             "id_prestashop": product_id,
             "referencia": sku,
@@ -1,8 +1,10 @@
 from fastapi import APIRouter
 from .Odoo.odoo import router as odoo_router
 from .Prestashop.prestashop import router as prestashop_router
+from .catalog import router as catalog_router
 
 router = APIRouter(prefix="/api")
 
 router.include_router(odoo_router)
-router.include_router(prestashop_router)
\ No newline at end of file
+router.include_router(prestashop_router)
+router.include_router(catalog_router)
\ No newline at end of file
@@ -0,0 +1,138 @@
+import asyncio
+import os
+from fastapi import APIRouter, Depends, Query, Request
+from repo_api_equipo_e.cache import CACHE_TTL, Cache
+from repo_api_equipo_e.conditional import conditional_response, content_etag, render_json
+from repo_api_equipo_e.sync import ReferenceIndex, StockIndex, stock_unchanged
+from repo_api_equipo_e.tenants import Tenant, get_cache, get_tenant
+from .Odoo.paging import page_headers
+
+router = APIRouter(prefix="/catalog", tags=["Catálogo"])
+
+CATALOG_VIEW_PAGE_SIZE = int(os.getenv("CATALOG_VIEW_PAGE_SIZE", "100"))
+CATALOG_VIEW_MAX_PAGE_SIZE = int(os.getenv("CATALOG_VIEW_MAX_PAGE_SIZE", "1000"))
+
+ODOO_FIELDS = ["id", "name", "default_code", "list_price"]
+# stock disponible: suma de los quants en ubicaciones internas
+STOCK_DOMAIN = [("location_id.usage", "=", "internal")]
+
+DRIFT_FILTERS = {
+    "price": lambda row: row["desfase_precio"],
+    "stock": lambda row: row["desfase_stock"],
+    # referencia que solo existe en uno de los dos lados
+    "missing": lambda row: row["odoo"] is None or row["prestashop"] is None,
+    "any": lambda row: row["desfase_precio"] or row["desfase_stock"] or row["odoo"] is None or row["prestashop"] is None,
+}
+
+
+def _price_drift(odoo_price, prestashop_price):
+    try:
+        return round(float(odoo_price or 0), 2) != round(float(prestashop_price or 0), 2)
+    except ValueError:
+        return True
+
+
+def merge_catalog(products, stock_groups, references: ReferenceIndex, stock: StockIndex):
+    # join por hash: default_code de Odoo contra reference de PrestaShop, ordenado por referencia
+    quantities = {g["product_id"][0]: g.get("quantity") or 0 for g in stock_groups if g.get("product_id")}
+    odoo_by_code = {}
+    for p in products:
+        # ante default_code duplicados gana el id más bajo
+        if p.get("default_code"):
+            odoo_by_code.setdefault(p["default_code"], p)
+
+    rows = []
+    for sku in sorted(odoo_by_code.keys() | references.references()):
+        p = odoo_by_code.get(sku)
+        odoo = None
+        if p is not None:
+            odoo = {"id": p["id"], "nombre": p.get("name"), "precio": p.get("list_price"),
+                    "stock": quantities.get(p["id"], 0)}
+
+        prestashop = info = None
+        product_id = references.get(sku)
+        if product_id is not None:
+            info = stock.get(product_id)
+            prestashop = {
+                "id": product_id,
+                "nombre": references.attr(sku, "name"),
+                "precio": references.attr(sku, "price"),
+                "stock": info["quantity"] if info else None,
+                "activo": "Sí" if references.attr(sku, "active") == "1" else "No",
+            }
+
+        both = odoo is not None and prestashop is not None
+        rows.append({
+            "referencia": sku,
+            "odoo": odoo,
+            "prestashop": prestashop,
+            "desfase_precio": both and _price_drift(odoo["precio"], prestashop["precio"]),
+            "desfase_stock": both and not (info is not None and stock_unchanged(info, odoo["stock"])),
+        })
+    return rows
+
+
+async def _load_catalog(tenant: Tenant):
+    # las cuatro descargas a la vez: productos y stock de Odoo, productos y stock de PrestaShop
+    references = ReferenceIndex(fields=("name", "price", "active"))
+    stock = StockIndex()
+    products, stock_groups, failed_references, failed_stock = await asyncio.gather(
+        tenant.odoo.execute_kw("product.product", "search_read", [[("default_code", "!=", False)]],
+                               {"fields": ODOO_FIELDS, "order": "id"}),
+        tenant.odoo.execute_kw("stock.quant", "read_group", [STOCK_DOMAIN, ["product_id", "quantity:sum"], ["product_id"]],
+                               {"lazy": False}),
+        references.load(tenant.prestashop_client),
+        stock.load(tenant.prestashop_client),
+    )
+    failed = failed_references or failed_stock
+    if failed is not None:
+        return {
+            "status": "error",
+            "data": None,
+            "errors": [
+                {
+                    "code": str(failed.status_code),
+                    "message": "Error al consultar PrestaShop"
+                }
+            ]
+        }
+    return {
+        "status": "success",
+        "data": merge_catalog(products, stock_groups, references, stock),
+        "errors": []
+    }
+
+
+# Vista combinada del catálogo: cada referencia con sus datos en Odoo y en PrestaShop y las
+# marcas de desfase de precio y stock. El cruce completo se cachea; las páginas salen de ahí
+@router.get("/products")
+async def get_catalog_products(
+    request: Request,
+    drift: str | None = Query(None, pattern="^(price|stock|missing|any)$"),
+    limit: int = Query(CATALOG_VIEW_PAGE_SIZE, ge=1, le=CATALOG_VIEW_MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    tenant: Tenant = Depends(get_tenant),
+    cache: Cache = Depends(get_cache),
+):
+
+    if not tenant.prestashop_configured:
+        return {
+            "status": "error",
+            "data": None,
+            "errors": [
+                {
+                    "code": "500",
+                    "message": "PrestaShop no configurado"
+                }
+            ]
+        }
+
+    envelope = await cache.get_or_load(("catalog_view",), lambda: _load_catalog(tenant), CACHE_TTL["catalog_view"])
+    if envelope["status"] != "success":
+        return envelope
+
+    rows = envelope["data"]
+    if drift:
+        rows = [row for row in rows if DRIFT_FILTERS[drift](row)]
+    body = render_json({"status": "success", "data": rows[offset:offset + limit], "errors": []})
+    return conditional_response(request, body, content_etag(body), page_headers(request, limit, offset, len(rows)))
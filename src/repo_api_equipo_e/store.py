@@ -0,0 +1,184 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SYNC_DB_PATH = os.getenv("SYNC_DB_PATH", "sync_state.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watermarks (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pending_products (
+    name TEXT NOT NULL,
+    product_id INTEGER NOT NULL,
+    PRIMARY KEY (name, product_id)
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total INTEGER,
+    processed INTEGER NOT NULL DEFAULT 0,
+    counters TEXT NOT NULL DEFAULT '{}',
+    cursor TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    run_started_at REAL,
+    run_processed INTEGER NOT NULL DEFAULT 0,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_errors (
+    job_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    value TEXT,
+    product_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS job_errors_job ON job_errors (job_id);
+"""
+
+JOB_COLUMNS = (
+    "id", "kind", "params", "status", "total", "processed", "counters", "cursor", "error",
+    "created_at", "started_at", "run_started_at", "run_processed", "heartbeat_at", "finished_at",
+)
+
+
+def _job_row(row):
+    if row is None:
+        return None
+    job = dict(zip(JOB_COLUMNS, row))
+    job["params"] = json.loads(job["params"])
+    job["counters"] = json.loads(job["counters"])
+    job["cursor"] = json.loads(job["cursor"]) if job["cursor"] is not None else None
+    return job
+
+
+# Estado persistente de la sincronización (SQLite local, compartido entre peticiones)
+class SyncStore:
+    def __init__(self, path=SYNC_DB_PATH):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def get_watermark(self, name):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM watermarks WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def set_watermark(self, name, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO watermarks (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET value = excluded.value",
+                (name, value),
+            )
+
+    def get_pending(self, name):
+        with self._lock:
+            rows = self._conn.execute("SELECT product_id FROM pending_products WHERE name = ?", (name,)).fetchall()
+        return [r[0] for r in rows]
+
+    def set_pending(self, name, product_ids):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM pending_products WHERE name = ?", (name,))
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO pending_products (name, product_id) VALUES (?, ?)",
+                [(name, pid) for pid in product_ids],
+            )
+            self._conn.execute("COMMIT")
+
+
+    # ---------- trabajos en segundo plano ----------
+    def create_job(self, kind, params):
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, params, status, created_at) VALUES (?, ?, ?, 'queued', ?)",
+                (job_id, kind, json.dumps(params), time.time()),
+            )
+        return job_id
+
+    def get_job(self, job_id):
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _job_row(row)
+
+    def claim_job(self, stale_after):
+        # toma el trabajo en cola más antiguo, o uno "running" cuyo proceso dejó de latir.
+        # BEGIN IMMEDIATE lo hace atómico entre procesos; solo corre un trabajo a la vez
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                busy = self._conn.execute(
+                    "SELECT 1 FROM jobs WHERE status = 'running' AND heartbeat_at >= ? LIMIT 1",
+                    (now - stale_after,),
+                ).fetchone()
+                row = None if busy else self._conn.execute(
+                    "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', started_at = COALESCE(started_at, ?), "
+                        "run_started_at = ?, run_processed = processed, heartbeat_at = ? WHERE id = ?",
+                        (now, now, now, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self.get_job(row[0]) if row is not None else None
+
+    def set_job_params(self, job_id, params):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET params = ? WHERE id = ?", (json.dumps(params), job_id))
+
+    def heartbeat_job(self, job_id):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET heartbeat_at = ? WHERE id = ?", (time.time(), job_id))
+
+    def checkpoint_job(self, job_id, total, processed, counters, cursor, errors):
+        # errors: [(tipo, valor, product_id)] nuevos desde el último punto de control
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute(
+                "UPDATE jobs SET total = ?, processed = ?, counters = ?, cursor = ?, heartbeat_at = ? WHERE id = ?",
+                (total, processed, json.dumps(counters), json.dumps(cursor), time.time(), job_id),
+            )
+            self._conn.executemany(
+                "INSERT INTO job_errors (job_id, kind, value, product_id) VALUES (?, ?, ?, ?)",
+                [(job_id, kind, value, product_id) for kind, value, product_id in errors],
+            )
+            self._conn.execute("COMMIT")
+
+    def finish_job(self, job_id, status, error=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, error, time.time(), job_id),
+            )
+
+    def requeue_job(self, job_id):
+        # parada ordenada: vuelve a la cola y se retoma desde el último punto de control
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET status = 'queued' WHERE id = ? AND status = 'running'", (job_id,))
+
+    def get_job_errors(self, job_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT kind, value, product_id FROM job_errors WHERE job_id = ? ORDER BY rowid", (job_id,)
+            ).fetchall()
+        return rows
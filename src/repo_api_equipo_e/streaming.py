@@ -0,0 +1,18 @@
+from fastapi.responses import StreamingResponse
+from repo_api_equipo_e.responses import dumps
+
+
+def _lines(records):
+    for record in records:
+        yield dumps(record) + b"\n"
+
+
+async def _alines(records):
+    async for record in records:
+        yield dumps(record) + b"\n"
+
+
+# Un registro por línea, según llega del origen: la memoria no crece con el tamaño del listado
+def ndjson_response(records):
+    body = _alines(records) if hasattr(records, "__aiter__") else _lines(records)
+    return StreamingResponse(body, media_type="application/x-ndjson")
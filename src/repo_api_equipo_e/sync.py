@@ -0,0 +1,265 @@
+import asyncio
+import os
+import random
+import httpx
+from repo_api_equipo_e.xmlrecords import iter_records
+
+SYNC_WORKERS = int(os.getenv("SYNC_WORKERS", "8"))
+SYNC_MAX_RETRIES = int(os.getenv("SYNC_MAX_RETRIES", "3"))
+SYNC_RETRY_BACKOFF = float(os.getenv("SYNC_RETRY_BACKOFF", "0.5"))
+SYNC_PAGE_SIZE = int(os.getenv("SYNC_PAGE_SIZE", "1000"))
+SYNC_FILTER_CHUNK = int(os.getenv("SYNC_FILTER_CHUNK", "100"))  # ids por filtro [1|2|...]
+
+RETRY_STATUS = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "PUT", "PATCH", "DELETE"}
+# respuestas con las que una tienda indica que no admite PATCH en el webservice
+PATCH_UNSUPPORTED_STATUS = {405, 501}
+
+
+# Envuelve el AsyncClient del tenant con la misma interfaz (get/post/put/patch) y reintenta
+# con backoff exponencial + jitter. El ritmo y la concurrencia los pone el transporte del cliente
+# (GuardedTransport): el mismo límite por tienda para la sincronización y para el resto de la API,
+# y cada reintento vuelve a pasar por él
+class SyncClient:
+    def __init__(self, client: httpx.AsyncClient, retries=SYNC_MAX_RETRIES, backoff=SYNC_RETRY_BACKOFF):
+        self._client = client
+        self._retries = retries
+        self._backoff = backoff
+
+    @property
+    def base_url(self):
+        return self._client.base_url
+
+    async def request(self, method, url, **kwargs):
+        for attempt in range(self._retries + 1):
+            last = attempt == self._retries
+            try:
+                response = await self._client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                # un POST que pudo llegar al servidor no se repite (duplicaría el producto)
+                if last or (method not in IDEMPOTENT_METHODS and not isinstance(e, httpx.ConnectError)):
+                    raise
+            else:
+                if last or response.status_code not in RETRY_STATUS:
+                    return response
+            await asyncio.sleep(self._backoff * (2 ** attempt) * (1 + random.random()))
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url, **kwargs):
+        return await self.request("PUT", url, **kwargs)
+
+    async def patch(self, url, **kwargs):
+        return await self.request("PATCH", url, **kwargs)
+
+
+# Escrituras parciales: PATCH mientras la tienda lo acepte; tras el primer rechazo se usa
+# directamente el documento completo por PUT. Se recuerda por tienda (URL base) y recurso en el
+# proceso: un módulo o un proxy puede admitir PATCH en products y no en stock_availables
+class PatchSupport:
+    def __init__(self):
+        self._unsupported = set()  # (tienda, recurso)
+
+    def enabled(self, shop, resource):
+        return (shop, resource) not in self._unsupported
+
+    def observe(self, shop, resource, response):
+        # devuelve True si la respuesta indica que la tienda no admite PATCH en ese recurso
+        if response.status_code in PATCH_UNSUPPORTED_STATUS:
+            self._unsupported.add((shop, resource))
+            return True
+        return False
+
+
+PATCH_SUPPORT = PatchSupport()
+
+
+async def run_bounded(items, worker, concurrency=SYNC_WORKERS):
+    # N workers consumen el mismo iterador; el resultado conserva el orden de entrada
+    results = [None] * len(items)
+    pending = iter(enumerate(items))
+
+    async def consume():
+        for i, item in pending:
+            results[i] = await worker(item)
+
+    tasks = [asyncio.ensure_future(consume()) for _ in range(max(1, min(concurrency, len(items))))]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # si un worker falla (p. ej. origen no disponible) los demás no siguen por su cuenta
+        for task in tasks:
+            task.cancel()
+        raise
+    return results
+
+
+# caracteres con significado en filter[campo]=[a|b] que el webservice no permite escapar:
+# una referencia que los lleve no se puede buscar con un filtro sin traer otros productos
+FILTER_RESERVED = frozenset("|[]")
+
+
+def filter_safe(value):
+    return not FILTER_RESERVED.intersection(value)
+
+
+# reference -> id de PrestaShop, cargado una vez por ejecución con listados paginados.
+# fields: campos extra del producto que se guardan junto al id (p. ej. ("active",))
+class ReferenceIndex:
+    def __init__(self, fields=()):
+        self._ids = {}
+        self._fields = tuple(fields)
+        self._attrs = {}
+
+    def _add(self, xml):
+        rows = 0
+        for record in iter_records(xml, "product", ("id", "reference") + self._fields):
+            rows += 1
+            reference = record.get("reference")
+            # ante referencias duplicadas gana el id más bajo, como filter[reference]
+            if reference and reference not in self._ids:
+                self._ids[reference] = record.get("id")
+                if self._fields:
+                    self._attrs[reference] = {f: record.get(f) for f in self._fields}
+        return rows
+
+    async def _get(self, client, params):
+        display = "[" + ",".join(("id", "reference") + self._fields) + "]"
+        return await client.get(
+            "/api/products",
+            params={"display": display, "sort": "[id_ASC]", **params},
+            headers={"Accept": "application/xml"},
+        )
+
+    async def load(self, client, references=None, page_size=SYNC_PAGE_SIZE):
+        # sin referencias: catálogo completo por páginas; con referencias: filtro OR por bloques.
+        # Devuelve la respuesta fallida, o None si todo fue bien
+        if references is not None and not all(filter_safe(r) for r in references):
+            # alguna no se puede filtrar: se resuelven todas desde el listado completo
+            references = None
+        if references is not None:
+            refs = list(dict.fromkeys(references))
+            for start in range(0, len(refs), SYNC_FILTER_CHUNK):
+                chunk = refs[start:start + SYNC_FILTER_CHUNK]
+                r = await self._get(client, {"filter[reference]": f"[{'|'.join(chunk)}]"})
+                if r.status_code != 200:
+                    return r
+                self._add(r.content)
+            return None
+
+        offset = 0
+        while True:
+            r = await self._get(client, {"limit": f"{offset},{page_size}"})
+            if r.status_code != 200:
+                return r
+            if self._add(r.content) < page_size:
+                return None
+            offset += page_size
+
+    def get(self, sku):
+        return self._ids.get(sku)
+
+    def attr(self, sku, field):
+        return self._attrs.get(sku, {}).get(field)
+
+    def add(self, sku, product_id):
+        self._ids[sku] = product_id
+
+    def references(self):
+        return self._ids.keys()
+
+    def __len__(self):
+        return len(self._ids)
+
+
+async def resolve_reference(client, reference):
+    # id de una referencia con caracteres reservados (ver FILTER_RESERVED), o None
+    index = ReferenceIndex()
+    error = await index.load(client, [reference])
+    return None if error is not None else index.get(reference)
+
+
+STOCK_FIELD_NAMES = (
+    "id", "id_product", "id_product_attribute", "id_shop", "id_shop_group",
+    "quantity", "depends_on_stock", "out_of_stock",
+)
+STOCK_FIELDS = "[" + ",".join(STOCK_FIELD_NAMES) + "]"
+
+
+def parse_stock_info(record):
+    # campos de un único <stock_available> ya leído por iter_records, con sus valores por defecto
+    return {
+        "id": record.get("id"),
+        "id_product": record.get("id_product"),
+        "id_product_attribute": record.get("id_product_attribute") or "0",
+        "id_shop": record.get("id_shop") or "1",
+        "id_shop_group": record.get("id_shop_group") or "0",
+        "quantity": record.get("quantity") or "0",
+        "depends_on_stock": record.get("depends_on_stock") or "0",
+        "out_of_stock": record.get("out_of_stock") or "2",
+    }
+
+
+def stock_unchanged(info, qty):
+    # PrestaShop guarda enteros; escribir la misma cantidad solo dispara un reindexado
+    try:
+        return int(float(info.get("quantity") or 0)) == int(qty)
+    except ValueError:
+        return False
+
+
+# id_product -> stock_available del producto (sin combinación si la hay)
+class StockIndex:
+    def __init__(self):
+        self._stock = {}
+
+    def _add(self, xml):
+        rows = 0
+        for record in iter_records(xml, "stock_available", STOCK_FIELD_NAMES):
+            rows += 1
+            info = parse_stock_info(record)
+            if not info["id"] or not info["id_product"]:
+                continue
+            current = self._stock.get(info["id_product"])
+            if current is None or (current["id_product_attribute"] != "0" and info["id_product_attribute"] == "0"):
+                self._stock[info["id_product"]] = info
+        return rows
+
+    async def _get(self, client, params):
+        return await client.get(
+            "/api/stock_availables",
+            params={"display": STOCK_FIELDS, **params},
+            headers={"Accept": "application/xml"},
+        )
+
+    async def load(self, client, product_ids=None, page_size=SYNC_PAGE_SIZE):
+        # sin ids: recorre todo stock_availables por páginas; con ids: filtro OR por bloques.
+        # Devuelve la respuesta fallida, o None si todo fue bien
+        if product_ids is not None:
+            ids = list(dict.fromkeys(str(i) for i in product_ids))
+            for start in range(0, len(ids), SYNC_FILTER_CHUNK):
+                chunk = ids[start:start + SYNC_FILTER_CHUNK]
+                r = await self._get(client, {"filter[id_product]": f"[{'|'.join(chunk)}]"})
+                if r.status_code != 200:
+                    return r
+                self._add(r.content)
+            return None
+
+        offset = 0
+        while True:
+            r = await self._get(client, {"limit": f"{offset},{page_size}"})
+            if r.status_code != 200:
+                return r
+            if self._add(r.content) < page_size:
+                return None
+            offset += page_size
+
+    def get(self, product_id):
+        return self._stock.get(str(product_id))
+
+    def __len__(self):
+        return len(self._stock)
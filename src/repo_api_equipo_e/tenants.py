@@ -0,0 +1,235 @@
+import json
+import os
+import re
+from pathlib import Path
+import httpx
+from fastapi import Request
+from dotenv import load_dotenv
+from repo_api_equipo_e.cache import CACHE_BACKEND, CACHE_MAX_ENTRIES, CACHE_NAMESPACE, CACHE_REDIS_URL, Cache, create_backend
+from repo_api_equipo_e.catalog import CATALOG_DB_PATH, CatalogRefresher, CatalogReplica
+from repo_api_equipo_e.jobs import JobRunner
+from repo_api_equipo_e.odoo import (
+    ODOO_DB, ODOO_MAX_CONCURRENCY, ODOO_PASSWORD, ODOO_POOL_SIZE, ODOO_RATE_BURST, ODOO_RATE_LIMIT, ODOO_URL, ODOO_USER,
+    AsyncOdoo, OdooClient, create_odoo_upstream,
+)
+from repo_api_equipo_e.prestashop import (
+    PRESTASHOP_API_KEY, PRESTASHOP_BASE_URL, PRESTASHOP_MAX_CONNECTIONS, PRESTASHOP_MAX_KEEPALIVE,
+    PRESTASHOP_RATE_BURST, PRESTASHOP_RATE_LIMIT, create_prestashop_client, create_prestashop_upstream,
+)
+from repo_api_equipo_e.store import SYNC_DB_PATH, SyncStore
+
+load_dotenv()
+
+# Varias parejas Odoo/PrestaShop en un mismo proceso. TENANTS_FILE (ruta a un JSON) o TENANTS
+# (el JSON en línea): {"tienda1": {"odoo": {...}, "prestashop": {...}}, ...}. Sin ninguno de
+# los dos hay un único tenant, DEFAULT_TENANT, con las variables ODOO_* y PRESTASHOP_* de siempre
+TENANTS_FILE = os.getenv("TENANTS_FILE")
+TENANTS = os.getenv("TENANTS")
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", "default")
+TENANT_HEADER = os.getenv("TENANT_HEADER", "X-Tenant")
+# /t/tienda1/api/... -> /api/... con el tenant tienda1
+TENANT_PATH_PREFIX = os.getenv("TENANT_PATH_PREFIX", "/t").rstrip("/")
+
+# el id acaba en nombres de fichero y claves de caché
+TENANT_ID = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+# Tenant que no existe (o petición sin tenant y sin DEFAULT_TENANT configurado)
+class UnknownTenant(Exception):
+    pass
+
+
+def _tenant_path(path, tenant_id):
+    # sync_state.db -> sync_state.tienda1.db
+    p = Path(path)
+    return str(p.with_name(f"{p.stem}.{tenant_id}{p.suffix}"))
+
+
+def _env_config():
+    return {
+        "odoo": {"url": ODOO_URL, "db": ODOO_DB, "user": ODOO_USER, "password": ODOO_PASSWORD},
+        "prestashop": {"base_url": PRESTASHOP_BASE_URL, "api_key": PRESTASHOP_API_KEY},
+    }
+
+
+def load_tenant_config():
+    if TENANTS_FILE:
+        with open(TENANTS_FILE, encoding="utf-8") as f:
+            config = json.load(f)
+    elif TENANTS:
+        config = json.loads(TENANTS)
+    else:
+        return {DEFAULT_TENANT: _env_config()}
+    for tenant_id in config:
+        if not TENANT_ID.match(tenant_id):
+            raise ValueError(f"Id de tenant no válido: {tenant_id!r}")
+    return config
+
+
+# Recursos de una pareja Odoo/PrestaShop: pools, caché, estado local y tareas de fondo propios,
+# así un tenant lento o muy activo no agota las conexiones ni la caché de los demás.
+# El tenant por defecto conserva los ficheros y el espacio de caché de la instalación de un solo tenant
+class Tenant:
+    def __init__(self, tenant_id, config):
+        self.id = tenant_id
+        odoo = config.get("odoo") or {}
+        shop = config.get("prestashop") or {}
+        suffixed = tenant_id != DEFAULT_TENANT
+
+        self.odoo_url = odoo.get("url") or ""
+        self.prestashop_url = (shop.get("base_url") or "").rstrip("/")
+        self.prestashop_key = shop.get("api_key") or ""
+        max_connections = int(shop.get("max_connections", PRESTASHOP_MAX_CONNECTIONS))
+        self._prestashop_limits = {
+            "max_connections": max_connections,
+            "max_keepalive": int(shop.get("max_keepalive", PRESTASHOP_MAX_KEEPALIVE)),
+        }
+        self.prestashop_upstream = create_prestashop_upstream(
+            f"prestashop:{tenant_id}", max_connections,
+            float(shop.get("rate_limit", PRESTASHOP_RATE_LIMIT)), int(shop.get("rate_burst", PRESTASHOP_RATE_BURST)),
+        )
+
+        pool_size = int(odoo.get("pool_size", ODOO_POOL_SIZE))
+        self.odoo_upstream = create_odoo_upstream(
+            f"odoo:{tenant_id}", pool_size,
+            float(odoo.get("rate_limit", ODOO_RATE_LIMIT)), int(odoo.get("rate_burst", ODOO_RATE_BURST)),
+        )
+        self.odoo = AsyncOdoo(
+            OdooClient(odoo.get("url"), odoo.get("db"), odoo.get("user"), odoo.get("password"), pool_size,
+                       self.odoo_upstream),
+            max_workers=int(odoo.get("max_concurrency", pool_size if "pool_size" in odoo else ODOO_MAX_CONCURRENCY)),
+            name=f"odoo:{tenant_id}",
+        )
+
+        # cada tenant puede tener su propio Redis (cache.redis_url); si comparten uno, las claves
+        # de los tenants adicionales llevan su id en el espacio de nombres
+        cache = config.get("cache") or {}
+        self.cache = Cache(
+            create_backend(cache.get("backend", CACHE_BACKEND), max_entries=int(cache.get("max_entries", CACHE_MAX_ENTRIES)),
+                           redis_url=cache.get("redis_url", CACHE_REDIS_URL)),
+            namespace=cache.get("namespace") or (f"{CACHE_NAMESPACE}:{tenant_id}" if suffixed else CACHE_NAMESPACE),
+        )
+        self.store = SyncStore(config.get("sync_db_path") or (_tenant_path(SYNC_DB_PATH, tenant_id) if suffixed else SYNC_DB_PATH))
+        self.catalog = CatalogReplica(
+            config.get("catalog_db_path") or (_tenant_path(CATALOG_DB_PATH, tenant_id) if suffixed else CATALOG_DB_PATH)
+        )
+
+        self.prestashop_client = None
+        self.job_runner = None
+        self.catalog_refresher = None
+
+    @property
+    def prestashop_configured(self):
+        return bool(self.prestashop_url and self.prestashop_key)
+
+    @property
+    def odoo_configured(self):
+        return bool(self.odoo_url)
+
+    def start(self):
+        # dentro del event loop (lifespan): el cliente httpx y las tareas de fondo son del loop
+        self.prestashop_client = create_prestashop_client(
+            self.prestashop_url, self.prestashop_key, upstream=self.prestashop_upstream, **self._prestashop_limits
+        )
+        self.job_runner = JobRunner(self.store, self)
+        self.job_runner.start()
+        # sin Odoo no hay de dónde refrescar la réplica: cada intento solo dejaría un error en el log
+        if self.odoo_configured:
+            self.catalog_refresher = CatalogRefresher(self.catalog, self.odoo)
+            self.catalog_refresher.start()
+
+    async def close(self):
+        if self.catalog_refresher is not None:
+            await self.catalog_refresher.close()
+        # el trabajo en curso guarda su punto de control y vuelve a la cola
+        if self.job_runner is not None:
+            await self.job_runner.close()
+        if self.prestashop_client is not None:
+            await self.prestashop_client.aclose()
+        await self.cache.close()
+        self.odoo.close()
+        self.odoo.client.close()
+
+
+# Se crea en el lifespan (app.state.tenants): abre los SQLite y arranca las tareas de cada tenant
+class TenantRegistry:
+    def __init__(self, config):
+        self.tenants = {tenant_id: Tenant(tenant_id, c) for tenant_id, c in config.items()}
+
+    def get(self, tenant_id):
+        tenant = self.tenants.get(tenant_id or DEFAULT_TENANT)
+        if tenant is None:
+            raise UnknownTenant(tenant_id or DEFAULT_TENANT)
+        return tenant
+
+    def start(self):
+        for tenant in self.tenants.values():
+            tenant.start()
+
+    async def close(self):
+        for tenant in self.tenants.values():
+            await tenant.close()
+
+
+def split_tenant_path(path):
+    # /t/tienda1/api/odoo/products -> ("tienda1", "/api/odoo/products"); sin prefijo -> (None, path)
+    if not TENANT_PATH_PREFIX or not path.startswith(TENANT_PATH_PREFIX + "/"):
+        return None, path
+    tenant_id, _, rest = path[len(TENANT_PATH_PREFIX) + 1:].partition("/")
+    return tenant_id, "/" + rest
+
+
+# Middleware ASGI: el prefijo /t/{tenant} pasa a root_path (como el de un proxy) y el id queda en
+# request.state. El enrutado trabaja sin él, pero request.url conserva la ruta completa: los
+# enlaces que se construyen desde ella (Link: rel="next") siguen apuntando al mismo tenant
+class TenantMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            root_path = scope.get("root_path", "")
+            route_path = scope["path"][len(root_path):] if scope["path"].startswith(root_path) else scope["path"]
+            tenant_id, _ = split_tenant_path(route_path)
+            if tenant_id is not None:
+                scope = dict(
+                    scope,
+                    root_path=f"{root_path}{TENANT_PATH_PREFIX}/{tenant_id}",
+                    state={**scope.get("state", {}), "tenant_id": tenant_id},
+                )
+        await self.app(scope, receive, send)
+
+
+def tenant_error(exc):
+    return {
+        "status": "error",
+        "data": None,
+        "errors": [{"code": "404", "message": f"Tenant desconocido: {exc}"}],
+    }
+
+
+# ---------- DEPENDENCIAS ----------
+# prefijo de ruta > cabecera X-Tenant > DEFAULT_TENANT
+def get_tenant(request: Request) -> Tenant:
+    tenant_id = getattr(request.state, "tenant_id", None) or request.headers.get(TENANT_HEADER)
+    return request.app.state.tenants.get(tenant_id)
+
+
+def get_async_odoo(request: Request) -> AsyncOdoo:
+    return get_tenant(request).odoo
+
+
+def get_prestashop_client(request: Request) -> httpx.AsyncClient:
+    return get_tenant(request).prestashop_client
+
+
+def get_cache(request: Request) -> Cache:
+    return get_tenant(request).cache
+
+
+def get_sync_store(request: Request) -> SyncStore:
+    return get_tenant(request).store
+
+
+def get_catalog(request: Request) -> CatalogReplica:
+    return get_tenant(request).catalog
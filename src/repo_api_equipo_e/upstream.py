@@ -0,0 +1,322 @@
+import asyncio
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+import httpx
+from dotenv import load_dotenv
+from repo_api_equipo_e.metrics import (
+    UPSTREAM_BREAKER_STATE, UPSTREAM_CONCURRENCY_LIMIT, UPSTREAM_IN_FLIGHT, UPSTREAM_REJECTED,
+)
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Protección de los orígenes (PrestaShop y Odoo de cada tenant), compartida por todos los routers:
+# límite de ritmo (token bucket), límite de concurrencia adaptativo (AIMD ante señales de
+# sobrecarga) y circuit breaker. Mientras un origen está caído o saturado se falla enseguida con
+# UpstreamUnavailable en lugar de acumular peticiones esperando al timeout
+
+# espera máxima por un hueco de concurrencia antes de rechazar la llamada
+UPSTREAM_QUEUE_TIMEOUT = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", "5"))
+UPSTREAM_MIN_CONCURRENCY = int(os.getenv("UPSTREAM_MIN_CONCURRENCY", "1"))
+UPSTREAM_BACKOFF = float(os.getenv("UPSTREAM_BACKOFF", "0.7"))
+# fallos seguidos que abren el circuito y segundos que permanece abierto antes de probar
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_RESET_TIMEOUT = float(os.getenv("BREAKER_RESET_TIMEOUT", "30"))
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+BREAKER_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+# Origen no disponible: circuito abierto, o saturado (sin hueco en UPSTREAM_QUEUE_TIMEOUT)
+class UpstreamUnavailable(Exception):
+    def __init__(self, upstream, reason, retry_after):
+        super().__init__(f"{upstream} no disponible ({reason}), reintentar en {math.ceil(retry_after)} s")
+        self.upstream = upstream
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def upstream_error(exc):
+    return {
+        "status": "error",
+        "data": None,
+        "errors": [{"code": "503", "message": str(exc)}],
+    }
+
+
+# Cerrado -> abierto tras N fallos seguidos; pasado el reset deja pasar una sola llamada de
+# prueba (semiabierto): si sale bien se cierra, si falla vuelve a abrirse
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        UPSTREAM_BREAKER_STATE.set(0, name)
+
+    def _set_state(self, state):
+        if state != self.state:
+            logger.warning(f"Circuito de {self.name}: {self.state} -> {state}")
+        self.state = state
+        UPSTREAM_BREAKER_STATE.set(BREAKER_STATE_VALUES[state], self.name)
+
+    def before(self):
+        # devuelve True si la llamada es la de prueba del estado semiabierto
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            remaining = self._opened_at + self.reset_timeout - time.monotonic()
+            if self.state == OPEN and remaining <= 0:
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+        UPSTREAM_REJECTED.inc(self.name, "circuit_open")
+        raise UpstreamUnavailable(self.name, "circuito abierto", max(remaining, 1))
+
+    def success(self, probe=False):
+        with self._lock:
+            self._failures = 0
+            if probe:
+                self._probing = False
+            if self.state != CLOSED and (probe or self.state == HALF_OPEN):
+                self._set_state(CLOSED)
+
+    def failure(self, probe=False):
+        with self._lock:
+            self._failures += 1
+            if probe:
+                self._probing = False
+            if probe or (self.state == CLOSED and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._set_state(OPEN)
+
+    def release(self, probe):
+        # llamada de prueba que no llegó a dar resultado (cancelada): otra podrá probar
+        if probe:
+            with self._lock:
+                self._probing = False
+
+
+# Token bucket con reserva: cada llamada descuenta un token (el saldo puede quedar negativo)
+# y recibe cuánto debe esperar. Sin bucle ni lock durante la espera: vale para hilos y asyncio
+class RateLimit:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(burst, 1)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+# Límite de concurrencia AIMD: +1 por cada "ventana" de llamadas sin sobrecarga, x BACKOFF
+# cuando el origen avisa de que está saturado (429/503 o timeout), como mucho una vez por
+# latencia para no desplomarlo con una sola ráfaga. La latencia por sí sola no cuenta: un
+# search_read de 5000 filas tarda más que un search_count sin que el origen esté cargado
+class AdaptiveLimit:
+    def __init__(self, name, max_limit, min_limit=UPSTREAM_MIN_CONCURRENCY, backoff=UPSTREAM_BACKOFF):
+        self.name = name
+        self.max_limit = max(max_limit, 1)
+        self.min_limit = max(min(min_limit, self.max_limit), 1)
+        self.backoff = backoff
+        self._limit = float(self.max_limit)
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+        UPSTREAM_CONCURRENCY_LIMIT.set(self.value, name)
+
+    @property
+    def value(self):
+        return int(self._limit)
+
+    def sample(self, latency, overloaded=False):
+        with self._lock:
+            now = time.monotonic()
+            if overloaded:
+                if now - self._last_decrease >= latency:
+                    self._limit = max(self.min_limit, self._limit * self.backoff)
+                    self._last_decrease = now
+            else:
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            value = self.value
+        UPSTREAM_CONCURRENCY_LIMIT.set(value, self.name)
+
+
+class _Upstream:
+    def __init__(self, name, max_concurrency, rate=0.0, burst=1, queue_timeout=UPSTREAM_QUEUE_TIMEOUT):
+        self.name = name
+        self.breaker = CircuitBreaker(name)
+        self.rate_limit = RateLimit(rate, burst)
+        self.limit = AdaptiveLimit(name, max_concurrency)
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+
+    def _saturated(self):
+        UPSTREAM_REJECTED.inc(self.name, "saturated")
+        return UpstreamUnavailable(self.name, "saturado", self.queue_timeout)
+
+    def record(self, latency, failure=False, overloaded=False, probe=False):
+        # un fallo (500, conexión rechazada) cuenta para el circuito; solo la sobrecarga baja el límite
+        if failure:
+            self.breaker.failure(probe)
+        else:
+            self.breaker.success(probe)
+        self.limit.sample(latency, overloaded)
+
+
+# Para el cliente XML-RPC de Odoo, que corre en hilos (executor y threadpool del streaming)
+class ThreadUpstream(_Upstream):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cond = threading.Condition()
+
+    def _acquire(self):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.in_flight < self.limit.value, self.queue_timeout):
+                raise self._saturated()
+            self.in_flight += 1
+            UPSTREAM_IN_FLIGHT.set(self.in_flight, self.name)
+
+    def _release(self):
+        with self._cond:
+            self.in_flight -= 1
+            UPSTREAM_IN_FLIGHT.set(self.in_flight, self.name)
+            # el límite puede haber subido: se despiertan todos y cada uno vuelve a comprobarlo
+            self._cond.notify_all()
+
+    @contextmanager
+    def call(self, is_failure):
+        # is_failure(exc) -> (fallo del origen, sobrecarga); el resto de excepciones son de negocio
+        probe = self.breaker.before()
+        try:
+            time.sleep(self.rate_limit.reserve())
+            self._acquire()
+        except BaseException:
+            self.breaker.release(probe)
+            raise
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            failure, overloaded = is_failure(e)
+            self.record(time.perf_counter() - start, failure, overloaded, probe)
+            raise
+        else:
+            self.record(time.perf_counter() - start, probe=probe)
+        finally:
+            self._release()
+
+
+# Para el AsyncClient de PrestaShop: la espera por hueco es una cola FIFO de futures
+class AsyncUpstream(_Upstream):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._waiters = deque()
+
+    async def acquire(self):
+        if self.in_flight < self.limit.value and not self._waiters:
+            self.in_flight += 1
+            UPSTREAM_IN_FLIGHT.set(self.in_flight, self.name)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(future, self.queue_timeout)
+        except BaseException as e:
+            if future in self._waiters:
+                self._waiters.remove(future)
+            # el hueco pudo asignarse justo al vencer el plazo o al cancelar: se devuelve
+            if future.done() and not future.cancelled():
+                self.release()
+            if isinstance(e, asyncio.TimeoutError):
+                raise self._saturated() from None
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < self.limit.value:
+            future = self._waiters.popleft()
+            if not future.done():
+                # el hueco pasa directamente al siguiente en la cola
+                self.in_flight += 1
+                future.set_result(None)
+        UPSTREAM_IN_FLIGHT.set(self.in_flight, self.name)
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    # el hueco de concurrencia se libera al cerrar la respuesta, no al recibir las cabeceras
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._release is not None:
+                self._release()
+                self._release = None
+
+
+# Transporte httpx que pasa cada petición por la protección del origen
+class GuardedTransport(httpx.AsyncBaseTransport):
+    def __init__(self, upstream: AsyncUpstream, transport: httpx.AsyncBaseTransport):
+        self._upstream = upstream
+        self._transport = transport
+
+    async def handle_async_request(self, request):
+        upstream = self._upstream
+        probe = upstream.breaker.before()
+        try:
+            await asyncio.sleep(upstream.rate_limit.reserve())
+            await upstream.acquire()
+        except BaseException:
+            upstream.breaker.release(probe)
+            raise
+        start = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except httpx.TransportError as e:
+            upstream.record(
+                time.perf_counter() - start,
+                failure=True, overloaded=isinstance(e, httpx.TimeoutException), probe=probe,
+            )
+            upstream.release()
+            raise
+        except BaseException:
+            upstream.breaker.release(probe)
+            upstream.release()
+            raise
+        # 5xx: origen con problemas; 429/503: pide que bajemos el ritmo (el 429 sin contar como caída)
+        upstream.record(
+            time.perf_counter() - start,
+            failure=response.status_code >= 500, overloaded=response.status_code in (429, 503), probe=probe,
+        )
+        response.stream = _ReleasingStream(response.stream, upstream.release)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
@@ -0,0 +1,161 @@
+import logging
+import re
+from functools import lru_cache
+from xml.parsers import expat
+
+logger = logging.getLogger(__name__)
+
+# Lectura de XML del webservice de PrestaShop en una sola pasada con expat (pull por bloques):
+# solo se guardan los campos pedidos, los registros salen de uno en uno y no se construye
+# ningún árbol, así que la memoria no depende del tamaño del listado
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _Collector:
+    # <tag> de primer nivel -> {campo: texto} con los hijos directos pedidos. Un campo
+    # multilenguaje (<name><language>..</language></name>) toma el texto del primer idioma
+    def __init__(self, tag, fields):
+        self.tag = tag
+        self.fields = set(fields) if fields is not None else None
+        self.records = []
+        self._depth = 0
+        self._record_depth = None
+        self._record = None
+        self._field = None
+        self._field_depth = None
+        self._text = []
+
+    def start(self, name, attrs):
+        self._depth += 1
+        if self._record is None:
+            if name == self.tag:
+                self._record = {}
+                self._record_depth = self._depth
+            return
+        if self._field is None:
+            if self._depth == self._record_depth + 1 and (self.fields is None or name in self.fields):
+                self._field = name
+                self._field_depth = self._depth
+                self._text = []
+        elif name == "language" and self._depth == self._field_depth + 1 and self._field not in self._record:
+            # el texto del campo es el de su primer <language>
+            self._text = []
+
+    def end(self, name):
+        if self._field is not None:
+            if self._depth == self._field_depth:
+                self._record.setdefault(self._field, "".join(self._text).strip())
+                self._field = None
+            elif name == "language" and self._depth == self._field_depth + 1 and self._field not in self._record:
+                self._record[self._field] = "".join(self._text).strip()
+        elif self._record is not None and self._depth == self._record_depth:
+            self.records.append(self._record)
+            self._record = None
+        self._depth -= 1
+
+    def text(self, data):
+        if self._field is not None:
+            self._text.append(data)
+
+
+def _parser(collector):
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = collector.start
+    parser.EndElementHandler = collector.end
+    parser.CharacterDataHandler = collector.text
+    return parser
+
+
+def _chunks(content, size=CHUNK_SIZE):
+    # un str se codifica por trozos: sin copia entera del documento en bytes
+    for start in range(0, len(content), size):
+        chunk = content[start:start + size]
+        yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+
+
+def iter_records(content, tag, fields=None):
+    # content: bytes/str completos o un iterable de bloques de bytes
+    collector = _Collector(tag, fields)
+    parser = _parser(collector)
+    chunks = _chunks(content) if isinstance(content, (bytes, str)) else content
+    try:
+        for chunk in chunks:
+            parser.Parse(chunk, False)
+            yield from collector.records
+            collector.records.clear()
+        parser.Parse(b"", True)
+    except expat.ExpatError as e:
+        # respuesta que no es XML (p. ej. un error en HTML): se entrega lo leído hasta ahí
+        logger.warning(f"XML de PrestaShop no válido buscando <{tag}>: {e}")
+    yield from collector.records
+
+
+def first_record(content, tag, fields=None):
+    # primer <tag> del documento; deja de leer en cuanto lo tiene
+    return next(iter_records(content, tag, fields), None)
+
+
+class _Found(Exception):
+    pass
+
+
+@lru_cache(maxsize=32)
+def _simple_element(name, binary):
+    # (apertura de <name>, <name>texto</name> | <name><![CDATA[texto]]></name> | <name/>)
+    pattern = (
+        rf"<{name}(?:\s[^>]*)?/>"
+        rf"|<{name}(?:\s[^>]*)?>\s*(?:<!\[CDATA\[(.*?)\]\]>|([^<&]*?))\s*</{name}>"
+    )
+    opening = rf"<{name}[\s/>]"
+    if binary:
+        return re.compile(opening.encode()), re.compile(pattern.encode(), re.S)
+    return re.compile(opening), re.compile(pattern, re.S)
+
+
+def find_text(content, name):
+    # texto del primer <name> a cualquier profundidad (p. ej. el <id> de un POST), o None.
+    # Camino corto para un texto simple en el primer <name>: crear un parser de expat cuesta
+    # varias veces más que la búsqueda. Entidades, hijos anidados o XML raro van por expat
+    opening, element = _simple_element(name, isinstance(content, bytes))
+    start = opening.search(content)
+    if start is None:
+        return None
+    match = element.match(content, start.start())
+    if match is not None:
+        text = match.group(1) if match.group(1) is not None else (match.group(2) or content[:0])
+        text = text.strip()
+        return text.decode("utf-8") if isinstance(text, bytes) else text
+    return _expat_find_text(content, name)
+
+
+def _expat_find_text(content, name):
+    result = []
+
+    def start(tag, attrs):
+        if tag == name:
+            result.append([])
+
+    def end(tag):
+        if tag == name and result:
+            raise _Found
+
+    def text(data):
+        if result:
+            result[-1].append(data)
+
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = text
+    try:
+        for chunk in _chunks(content):
+            parser.Parse(chunk, False)
+        parser.Parse(b"", True)
+    except _Found:
+        return "".join(result[0]).strip()
+    except expat.ExpatError:
+        pass
+    return None
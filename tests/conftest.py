@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Odoo y PrestaShop falsos de los benchmarks
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+
+from fake_odoo import FakeOdoo, generate  # noqa: E402
+from fake_prestashop import FakePrestaShop  # noqa: E402
+
+
+@pytest.fixture
+def services(tmp_path):
+    # (odoo, tienda, config del tenant); los datos se cambian con odoo.reset() / shop.reset()
+    odoo = FakeOdoo(generate(products=0, orders=0))
+    shop = FakePrestaShop(products=0, orders=0, customers=0, payments=0, suppliers=0)
+    config = {
+        "odoo": {"url": odoo.start(), "db": odoo.db, "user": odoo.login, "password": odoo.password},
+        "prestashop": {"base_url": shop.start(), "api_key": shop.api_key},
+        "sync_db_path": str(tmp_path / "sync_state.db"),
+        "catalog_db_path": str(tmp_path / "catalog_replica.db"),
+    }
+    try:
+        yield odoo, shop, config
+    finally:
+        odoo.stop()
+        shop.stop()
@@ -0,0 +1,93 @@
+import asyncio
+import time
+from collections import Counter
+
+
+# Doble en proceso del protocolo Redis (RESP2) con lo que usa RedisBackend:
+# AUTH, SELECT, PING, GET, SET (con PX) y DEL. Cuenta comandos y conexiones abiertas
+class FakeRedis:
+    def __init__(self, password=None):
+        self.password = password
+        self.data = {}  # clave -> (valor, expira | None)
+        self.commands = Counter()
+        self.open_connections = 0
+        self.max_open_connections = 0
+        self.latency = 0.0
+        # la próxima respuesta a GET sale cortada y se cierra la conexión
+        self.truncate_next = False
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        port = self._server.sockets[0].getsockname()[1]
+        auth = f":{self.password}@" if self.password else ""
+        return f"redis://{auth}127.0.0.1:{port}/0"
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _read_command(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            size = int((await reader.readline())[1:-2])
+            args.append((await reader.readexactly(size + 2))[:-2])
+        return args
+
+    def _get(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and expires <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def _reply(self, args):
+        name = args[0].decode().upper()
+        self.commands[name] += 1
+        if name == "AUTH":
+            return b"+OK\r\n" if args[1].decode() == self.password else b"-WRONGPASS invalid password\r\n"
+        if name in ("SELECT", "PING"):
+            return b"+OK\r\n" if name == "SELECT" else b"+PONG\r\n"
+        if name == "GET":
+            value = self._get(args[1])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if name == "SET":
+            expires = None
+            if len(args) >= 5 and args[3].upper() == b"PX":
+                expires = time.monotonic() + int(args[4]) / 1000
+            self.data[args[1]] = (args[2], expires)
+            return b"+OK\r\n"
+        if name == "DEL":
+            return b":%d\r\n" % sum(self.data.pop(k, None) is not None for k in args[1:])
+        return b"-ERR unknown command\r\n"
+
+    async def _handle(self, reader, writer):
+        self.open_connections += 1
+        self.max_open_connections = max(self.max_open_connections, self.open_connections)
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    return
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                reply = self._reply(args)
+                if self.truncate_next and args[0].upper() == b"GET" and reply.startswith(b"$") and reply != b"$-1\r\n":
+                    self.truncate_next = False
+                    writer.write(reply[:len(reply) // 2])
+                    await writer.drain()
+                    return
+                writer.write(reply)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.open_connections -= 1
+            writer.close()
@@ -0,0 +1,60 @@
+import asyncio
+
+from repo_api_equipo_e.routers.Prestashop.bulkCreateFromOdoo import import_products_from_odoo
+from repo_api_equipo_e.tenants import Tenant
+
+from fake_odoo import generate
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _bulk(tenant, mode):
+    response = await import_products_from_odoo(
+        mode=mode, workers=4, odoo=tenant.odoo, client=tenant.prestashop_client,
+        tenant=tenant, store=tenant.store, cache=tenant.cache,
+    )
+    assert response["status"] == "success"
+    return {key: sorted(values) for key, values in response["data"].items()}
+
+
+def _with_tenant(services, test):
+    async def main():
+        tenant = Tenant("bulk", services[2])
+        tenant.start()
+        try:
+            await test(tenant)
+        finally:
+            await tenant.close()
+    run(main())
+
+
+def test_rerun_without_changes_reports_only_unchanged(services):
+    odoo, shop, _ = services
+    # 100 productos en Odoo; los 60 primeros ya existen en la tienda con otro stock
+    odoo.reset(generate(products=100, orders=0))
+    shop.reset(products=60, orders=0, customers=0, payments=0, suppliers=0)
+    skipped = {f"SKU{i:06d}" for i in (50, 100)}  # sin precio ni stock
+    existing = {f"SKU{i:06d}" for i in range(1, 61)} - skipped
+    new = {f"SKU{i:06d}" for i in range(61, 101)} - skipped
+
+    async def test(tenant):
+        first = await _bulk(tenant, "full")
+        assert set(first["created"]) == new
+        assert set(first["skipped_price0_stock0"]) == skipped
+        assert first["create_errors"] == first["stock_errors"] == []
+        # existentes: stock i % 7 en la tienda, i % 40 en Odoo. Solo cuenta como actualizado
+        # si se escribe; si coincide, sin cambios (y nunca en las dos listas)
+        same = {f"SKU{i:06d}" for i in range(1, 61) if i % 7 == i % 40} - skipped
+        assert set(first["updated_existing"]) == existing - same
+        assert set(first["unchanged"]) == same
+
+        shop.calls.clear()
+        second = await _bulk(tenant, "full")
+        assert second["created"] == second["updated_existing"] == []
+        assert set(second["unchanged"]) == existing | new
+        assert set(second["skipped_price0_stock0"]) == skipped
+        assert shop.calls[("PATCH", "stock_availables")] == shop.calls[("PUT", "stock_availables")] == 0
+
+    _with_tenant(services, test)
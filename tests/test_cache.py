@@ -0,0 +1,117 @@
+import asyncio
+
+from repo_api_equipo_e.cache import Cache, RedisBackend
+
+from tests.fake_redis import FakeRedis
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def _with_cache(test, pool_size=4, password=None):
+    redis = FakeRedis(password=password)
+    url = await redis.start()
+    backend = RedisBackend(url, pool_size=pool_size, timeout=2)
+    cache = Cache(backend, namespace="test")
+    try:
+        await test(redis, cache)
+    finally:
+        await cache.close()
+        await redis.stop()
+
+
+def test_set_and_get_round_trip():
+    async def test(redis, cache):
+        value = {"status": "success", "data": [{"id": 1, "nombre": "Producto 1"}], "errors": []}
+        await cache.set(("product", "SKU1"), value, ttl=60)
+        assert await cache.get(("product", "SKU1")) == value
+        # las claves llevan el espacio de nombres
+        assert b"test:product:SKU1" in redis.data
+
+    run(_with_cache(test, password="secreto"))
+
+
+def test_missing_key_is_a_miss():
+    async def test(redis, cache):
+        assert await cache.get_or_load("nada", _const({"status": "success"}), ttl=60) == {"status": "success"}
+        assert redis.commands["GET"] == 1
+
+    run(_with_cache(test))
+
+
+def test_invalidate_deletes_key():
+    async def test(redis, cache):
+        await cache.set("k", [1, 2, 3], ttl=60)
+        await cache.invalidate("k")
+        assert b"test:k" not in redis.data
+        calls = []
+        await cache.get_or_load("k", _counting(calls, "nuevo"), ttl=60, cache_if=lambda v: True)
+        assert calls == [1]
+
+    run(_with_cache(test))
+
+
+def test_ttl_expires_entries():
+    async def test(redis, cache):
+        await cache.set("k", "v", ttl=0.05)
+        assert await cache.get("k") == "v"
+        await asyncio.sleep(0.1)
+        calls = []
+        assert await cache.get_or_load("k", _counting(calls, "w"), ttl=60, cache_if=lambda v: True) == "w"
+        assert calls == [1]
+
+    run(_with_cache(test))
+
+
+def test_single_flight_loads_once_for_concurrent_misses():
+    async def test(redis, cache):
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return {"status": "success", "data": 42}
+
+        results = await asyncio.gather(*(cache.get_or_load("shared", loader, ttl=60) for _ in range(20)))
+        assert calls == [1]
+        assert all(r == {"status": "success", "data": 42} for r in results)
+        assert redis.commands["SET"] == 1
+
+    run(_with_cache(test))
+
+
+def test_open_connections_are_bounded_by_pool_size():
+    async def test(redis, cache):
+        redis.latency = 0.02
+        await asyncio.gather(*(cache.get(f"k{i}") for i in range(30)))
+        assert redis.commands["GET"] == 30
+        assert redis.max_open_connections <= 3
+
+    run(_with_cache(test, pool_size=3))
+
+
+def test_truncated_reply_degrades_to_miss():
+    async def test(redis, cache):
+        await cache.set("k", "x" * 1000, ttl=60)
+        redis.truncate_next = True
+        calls = []
+        assert await cache.get_or_load("k", _counting(calls, "fresco"), ttl=60, cache_if=lambda v: True) == "fresco"
+        assert calls == [1]
+        # la conexión cortada no vuelve al pool: la siguiente lectura va bien
+        assert await cache.get("k") == "fresco"
+
+    run(_with_cache(test))
+
+
+def _const(value):
+    async def loader():
+        return value
+    return loader
+
+
+def _counting(calls, value):
+    async def loader():
+        calls.append(1)
+        return value
+    return loader
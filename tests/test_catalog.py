@@ -0,0 +1,133 @@
+import asyncio
+
+from repo_api_equipo_e.catalog import CatalogRefresher
+from repo_api_equipo_e.tenants import Tenant
+
+from fake_odoo import generate
+
+FIELDS = ["id", "name", "default_code", "list_price", "qty_available", "write_date"]
+
+DOMAINS = [
+    [],
+    [("default_code", "=", "SKU000007")],
+    [("default_code", "=", False)],
+    [("default_code", "ilike", "sku00001")],
+    [("name", "ilike", "ñandú")],
+    [("name", "ilike", "éclair")],
+    [("list_price", ">=", 40), ("qty_available", "<", 10)],
+    [("list_price", ">", 20), ("list_price", "<=", 60)],
+    [("write_date", ">=", "2024-02-01 00:00:00")],
+]
+
+KWARGS = [
+    {"fields": FIELDS},
+    {"fields": ["name"]},
+    {"fields": FIELDS, "order": "name"},
+    {"fields": FIELDS, "order": "name desc"},
+    {"fields": FIELDS, "order": "default_code"},
+    {"fields": FIELDS, "order": "default_code desc, id"},
+    {"fields": ["default_code", "list_price"], "order": "list_price desc, name"},
+    {"fields": FIELDS, "order": "qty_available, list_price desc", "limit": 5},
+    {"fields": FIELDS, "order": "name", "limit": 5, "offset": 3},
+    {"fields": FIELDS, "offset": 10},
+]
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def _catalog_data():
+    # casos que el SQL tiene que traducir igual que Odoo: referencias vacías (False),
+    # nombres con acentos y eñes, varias fechas de modificación
+    data = generate(products=60, orders=0)
+    names = {5: "Camión Ñandú", 6: "ÑANDÚ de peluche", 12: "Éclair", 13: "éclair de chocolate"}
+    for p in data["product.product"]:
+        i = p["id"]
+        p["name"] = names.get(i, p["name"])
+        if i % 9 == 0:
+            p["default_code"] = False
+        if i % 4 == 0:
+            p["write_date"] = f"2024-0{2 + i % 3}-01 00:00:00"
+    return data
+
+
+def _with_tenant(services, test):
+    async def main():
+        # sin start(): el refresco lo lanza cada prueba
+        tenant = Tenant("catalogo", services[2])
+        try:
+            await test(tenant)
+        finally:
+            await tenant.close()
+    run(main())
+
+
+async def _assert_same_as_odoo(tenant):
+    for domain in DOMAINS:
+        # Odoo no devuelve archivados (active_test); la réplica no los guarda
+        live_domain = [("active", "=", True)] + domain
+        count = await tenant.odoo.execute_kw("product.product", "search_count", [live_domain])
+        assert tenant.catalog.count(domain) == count, domain
+        for kwargs in KWARGS:
+            live = await tenant.odoo.execute_kw("product.product", "search_read", [live_domain], kwargs)
+            assert tenant.catalog.search_read(domain, kwargs) == live, (domain, kwargs)
+            assert list(tenant.catalog.iter_search_read(domain, kwargs, batch_size=4)) == live, (domain, kwargs)
+
+
+def test_replica_queries_match_live_search_read(services):
+    odoo, _, _ = services
+    odoo.reset(_catalog_data())
+
+    async def test(tenant):
+        await CatalogRefresher(tenant.catalog, tenant.odoo).refresh(full=True)
+        assert tenant.catalog.count([]) == 60
+        # los casos difíciles tienen que devolver algo para que la comparación sirva
+        assert tenant.catalog.count([("default_code", "=", False)]) == 6
+        assert [r["id"] for r in tenant.catalog.search_read([("name", "ilike", "ñandú")], {"fields": ["id"]})] == [5, 6]
+        await _assert_same_as_odoo(tenant)
+
+    _with_tenant(services, test)
+
+
+def test_incremental_refresh_matches_live_search_read(services):
+    odoo, _, _ = services
+    data = _catalog_data()
+    odoo.reset(data)
+
+    async def test(tenant):
+        refresher = CatalogRefresher(tenant.catalog, tenant.odoo)
+        await refresher.refresh(full=True)
+        products = {p["id"]: p for p in data["product.product"]}
+        # cambios posteriores a la marca: nombre, referencia vaciada, stock y un archivado
+        products[3].update(name="Ñu renombrado", write_date="2024-06-01 00:00:00")
+        products[7].update(default_code=False, write_date="2024-06-01 00:00:00")
+        products[8].update(active=False, write_date="2024-06-01 00:00:00")
+        products[20]["qty_available"] = 99.0
+        data["stock.quant"][19].update(quantity=99.0, write_date="2024-06-01 00:00:00")
+
+        await refresher.refresh()
+        assert tenant.catalog.lookup("SKU000008") == []
+        await _assert_same_as_odoo(tenant)
+
+    _with_tenant(services, test)
+
+
+def test_refresher_skipped_without_odoo_url(services, tmp_path):
+    _, _, config = services
+
+    async def test():
+        without_odoo = Tenant("sin_odoo", {"prestashop": config["prestashop"],
+                                           "sync_db_path": str(tmp_path / "sin_odoo_sync.db"),
+                                           "catalog_db_path": str(tmp_path / "sin_odoo_catalog.db")})
+        with_odoo = Tenant("con_odoo", config)
+        for tenant in (without_odoo, with_odoo):
+            tenant.start()
+        try:
+            assert without_odoo.catalog_refresher is None
+            assert with_odoo.catalog_refresher is not None
+        finally:
+            for tenant in (without_odoo, with_odoo):
+                await tenant.close()
+
+    run(test())
@@ -0,0 +1,225 @@
+import asyncio
+import threading
+import time
+
+import httpx
+
+from repo_api_equipo_e.coalesce import Coalescer, CoalescingTransport
+from repo_api_equipo_e.odoo import AsyncOdoo
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def _slow_loader(calls, value, delay=0.05):
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return value
+    return loader
+
+
+def test_concurrent_runs_share_one_load():
+    async def test():
+        coalescer = Coalescer("test")
+        calls = []
+        results = await asyncio.gather(*(coalescer.run("k", _slow_loader(calls, {"id": 1})) for _ in range(20)))
+        assert calls == [1]
+        assert results == [{"id": 1}] * 20
+        assert coalescer._calls == {}
+        # terminada la llamada no queda nada guardado: la siguiente vuelve a cargar
+        await coalescer.run("k", _slow_loader(calls, {"id": 1}))
+        assert calls == [1, 1]
+
+    run(test())
+
+
+def test_different_keys_load_separately():
+    async def test():
+        coalescer = Coalescer("test")
+        calls = []
+        await asyncio.gather(coalescer.run("a", _slow_loader(calls, 1)), coalescer.run("b", _slow_loader(calls, 2)))
+        assert calls == [1, 1]
+
+    run(test())
+
+
+def test_error_reaches_every_caller():
+    async def test():
+        coalescer = Coalescer("test")
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            raise ConnectionError("origen caído")
+
+        results = await asyncio.gather(*(coalescer.run("k", loader) for _ in range(5)), return_exceptions=True)
+        assert calls == [1]
+        assert all(isinstance(r, ConnectionError) for r in results)
+        assert coalescer._calls == {}
+
+    run(test())
+
+
+def test_cancelled_caller_does_not_cancel_shared_load():
+    async def test():
+        coalescer = Coalescer("test")
+        calls = []
+        # el primero es el que arranca la carga
+        first = asyncio.ensure_future(coalescer.run("k", _slow_loader(calls, "valor", 0.1)))
+        await asyncio.sleep(0)
+        others = [asyncio.ensure_future(coalescer.run("k", _slow_loader(calls, "otro", 0.1))) for _ in range(3)]
+        await asyncio.sleep(0.02)
+        first.cancel()
+        others[0].cancel()
+        assert await asyncio.gather(*others[1:]) == ["valor", "valor"]
+        assert first.cancelled() and others[0].cancelled()
+        assert calls == [1]
+        assert coalescer._calls == {}
+
+    run(test())
+
+
+def test_all_callers_cancelled_leaves_no_stale_entry():
+    async def test():
+        coalescer = Coalescer("test")
+        calls = []
+        tasks = [asyncio.ensure_future(coalescer.run("k", _slow_loader(calls, "viejo", 0.05))) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # la carga sigue hasta el final y suelta la clave; después se carga de nuevo
+        await asyncio.sleep(0.1)
+        assert coalescer._calls == {}
+        assert await coalescer.run("k", _slow_loader(calls, "nuevo", 0)) == "nuevo"
+        assert calls == [1, 1]
+
+    run(test())
+
+
+class _CountingTransport(httpx.AsyncBaseTransport):
+    def __init__(self):
+        self.requests = []
+
+    async def handle_async_request(self, request):
+        self.requests.append((request.method, str(request.url)))
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, headers={"Content-Type": "application/xml"},
+                              stream=httpx.ByteStream(b"<prestashop><products/></prestashop>"))
+
+
+def test_transport_coalesces_identical_gets():
+    async def test():
+        upstream = _CountingTransport()
+        async with httpx.AsyncClient(base_url="http://tienda", transport=CoalescingTransport("test", upstream)) as client:
+            responses = await asyncio.gather(*(client.get("/api/products", params={"display": "full"}) for _ in range(10)))
+            assert len(upstream.requests) == 1
+            # cada llamante tiene su propia respuesta con el cuerpo completo
+            assert len({id(r) for r in responses}) == 10
+            for r in responses:
+                assert r.status_code == 200
+                assert await r.aread() == b"<prestashop><products/></prestashop>"
+                assert r.headers["Content-Type"] == "application/xml"
+
+    run(test())
+
+
+def test_transport_does_not_coalesce_different_urls_or_writes():
+    async def test():
+        upstream = _CountingTransport()
+        async with httpx.AsyncClient(base_url="http://tienda", transport=CoalescingTransport("test", upstream)) as client:
+            await asyncio.gather(
+                client.get("/api/products/1"),
+                client.get("/api/products/2"),
+                client.put("/api/products/1", content=b"<prestashop/>"),
+                client.put("/api/products/1", content=b"<prestashop/>"),
+            )
+        assert len(upstream.requests) == 4
+
+    run(test())
+
+
+def test_transport_error_reaches_every_caller():
+    class FailingTransport(httpx.AsyncBaseTransport):
+        calls = 0
+
+        async def handle_async_request(self, request):
+            FailingTransport.calls += 1
+            await asyncio.sleep(0.05)
+            raise httpx.ConnectError("conexión rechazada", request=request)
+
+    async def test():
+        async with httpx.AsyncClient(base_url="http://tienda", transport=CoalescingTransport("test", FailingTransport())) as client:
+            results = await asyncio.gather(*(client.get("/api/products") for _ in range(5)), return_exceptions=True)
+        assert FailingTransport.calls == 1
+        assert all(isinstance(r, httpx.ConnectError) for r in results)
+
+    run(test())
+
+
+class _FakeOdooClient:
+    # execute_kw bloqueante, como el cliente XML-RPC real
+    def __init__(self):
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def execute_kw(self, model, method, args, kwargs=None):
+        with self._lock:
+            self.calls.append((model, method))
+        time.sleep(0.05)
+        if method == "read":
+            raise ConnectionRefusedError("Odoo no responde")
+        return [{"id": 1, "name": "Producto 1", "tag_ids": [1, 2]}]
+
+
+def test_async_odoo_coalesces_reads_with_independent_copies():
+    async def test():
+        client = _FakeOdooClient()
+        odoo = AsyncOdoo(client, max_workers=4)
+        try:
+            args = [[("default_code", "=", "SKU1")]]
+            results = await asyncio.gather(*(
+                odoo.execute_kw("product.product", "search_read", args, {"fields": ["id", "name"]}) for _ in range(10)
+            ))
+        finally:
+            odoo.close()
+        assert client.calls == [("product.product", "search_read")]
+        assert all(r == results[0] for r in results)
+        # copias independientes: modificar una no afecta a las demás
+        results[0][0]["tag_ids"].append(3)
+        results[0][0]["name"] = "cambiado"
+        assert results[1] == [{"id": 1, "name": "Producto 1", "tag_ids": [1, 2]}]
+
+    run(test())
+
+
+def test_async_odoo_does_not_coalesce_writes():
+    async def test():
+        client = _FakeOdooClient()
+        odoo = AsyncOdoo(client, max_workers=4)
+        try:
+            await asyncio.gather(*(odoo.execute_kw("product.product", "write", [[1], {"name": "x"}]) for _ in range(3)))
+        finally:
+            odoo.close()
+        assert client.calls == [("product.product", "write")] * 3
+
+    run(test())
+
+
+def test_async_odoo_error_reaches_every_caller():
+    async def test():
+        client = _FakeOdooClient()
+        odoo = AsyncOdoo(client, max_workers=4)
+        try:
+            results = await asyncio.gather(*(odoo.execute_kw("res.partner", "read", [[1]]) for _ in range(5)),
+                                           return_exceptions=True)
+        finally:
+            odoo.close()
+        assert client.calls == [("res.partner", "read")]
+        assert all(isinstance(r, ConnectionRefusedError) for r in results)
+        assert odoo._coalescer._calls == {}
+
+    run(test())
@@ -0,0 +1,146 @@
+import asyncio
+import random
+import time
+
+from repo_api_equipo_e import jobs
+from repo_api_equipo_e.jobs import JobRunner, job_handler
+from repo_api_equipo_e.store import SyncStore
+from repo_api_equipo_e.sync import run_bounded
+
+ITEMS = list(range(1, 21))
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class _Tenant:
+    # hace de origen: anota cada elemento terminado y puede quedarse colgado en uno (block_at)
+    def __init__(self, block_at=None, delays=None):
+        self.done = []
+        self.block_at = block_at
+        self.blocked = asyncio.Event()
+        self.delays = delays or {}
+
+    async def process(self, item):
+        if item == self.block_at:
+            self.blocked.set()
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.delays.get(item, 0))
+        self.done.append(item)
+
+
+@job_handler("test_items")
+async def _process_items(job, tenant):
+    # como el bulk: orden estable, cursor = último elemento confirmado
+    job.set_total(len(job.params["items"]))
+    pending = [item for item in job.params["items"] if job.cursor is None or item > job.cursor]
+
+    async def worker(entry):
+        index, item = entry
+        await tenant.process(item)
+        job.done(index, item, {"ok": 1})
+
+    await run_bounded(list(enumerate(pending)), worker, job.params["workers"])
+
+
+async def _until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "tiempo de espera agotado"
+        await asyncio.sleep(0.01)
+
+
+async def _run_to_completion(store, job_id, tenant):
+    runner = JobRunner(store, tenant, poll_interval=0.05)
+    runner.start()
+    try:
+        await _until(lambda: store.get_job(job_id)["status"] in jobs.FINISHED)
+    finally:
+        await runner.close()
+    return store.get_job(job_id)
+
+
+def test_interrupted_run_resumes_from_cursor(tmp_path):
+    async def test():
+        store = SyncStore(str(tmp_path / "jobs.db"))
+        job_id = store.create_job("test_items", {"items": ITEMS, "workers": 1})
+
+        first = _Tenant(block_at=8)
+        runner = JobRunner(store, first, poll_interval=0.05)
+        runner.start()
+        await asyncio.wait_for(first.blocked.wait(), 5)
+        # parada ordenada (reinicio): guarda el punto de control y devuelve el trabajo a la cola
+        await runner.close()
+        row = store.get_job(job_id)
+        assert row["status"] == "queued"
+        assert (row["cursor"], row["processed"], row["counters"]) == (7, 7, {"ok": 7})
+
+        second = _Tenant()
+        row = await _run_to_completion(store, job_id, second)
+        assert row["status"] == "done"
+        assert second.done == list(range(8, 21))
+        # ningún elemento dos veces y los contadores cuadran con el total
+        assert first.done + second.done == ITEMS
+        assert (row["processed"], row["counters"]) == (20, {"ok": 20})
+
+    run(test())
+
+
+def test_parallel_run_never_redoes_confirmed_items(tmp_path):
+    async def test():
+        store = SyncStore(str(tmp_path / "jobs.db"))
+        job_id = store.create_job("test_items", {"items": ITEMS, "workers": 4})
+
+        # los elementos terminan desordenados; el 12 no termina en la primera ejecución
+        rng = random.Random(7)
+        first = _Tenant(block_at=12, delays={item: rng.uniform(0, 0.02) for item in ITEMS})
+        runner = JobRunner(store, first, poll_interval=0.05)
+        runner.start()
+        await asyncio.wait_for(first.blocked.wait(), 5)
+        await _until(lambda: len(first.done) >= 12)
+        await runner.close()
+        row = store.get_job(job_id)
+        cursor = row["cursor"]
+        # solo se confirma el prefijo contiguo: nada pendiente por debajo del cursor
+        assert cursor == 11
+        assert set(range(1, cursor + 1)) <= set(first.done)
+        assert (row["processed"], row["counters"]) == (cursor, {"ok": cursor})
+
+        second = _Tenant()
+        row = await _run_to_completion(store, job_id, second)
+        assert not set(second.done) & set(range(1, cursor + 1))
+        assert sorted(second.done) == list(range(cursor + 1, 21))
+        assert (row["processed"], row["counters"]) == (20, {"ok": 20})
+
+    run(test())
+
+
+def test_stale_heartbeat_is_picked_up_again(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_STALE_AFTER", 0.3)
+
+    async def test():
+        store = SyncStore(str(tmp_path / "jobs.db"))
+        job_id = store.create_job("test_items", {"items": ITEMS, "workers": 2})
+        # otro proceso tomó el trabajo, confirmó 5 elementos y se cayó sin volver a latir
+        assert store.claim_job(jobs.JOB_STALE_AFTER)["id"] == job_id
+        store.checkpoint_job(job_id, len(ITEMS), 5, {"ok": 5}, 5, [])
+
+        tenant = _Tenant()
+        runner = JobRunner(store, tenant, poll_interval=0.05)
+        runner.start()
+        try:
+            # mientras el latido es reciente el trabajo no se toca
+            await asyncio.sleep(0.1)
+            assert tenant.done == []
+            assert store.get_job(job_id)["status"] == "running"
+            await _until(lambda: store.get_job(job_id)["status"] in jobs.FINISHED)
+        finally:
+            await runner.close()
+
+        row = store.get_job(job_id)
+        assert row["status"] == "done"
+        assert sorted(tenant.done) == list(range(6, 21))
+        assert (row["processed"], row["counters"]) == (20, {"ok": 20})
+
+    run(test())
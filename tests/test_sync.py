@@ -0,0 +1,49 @@
+import asyncio
+
+import httpx
+import pytest
+
+from repo_api_equipo_e.sync import SyncClient
+from repo_api_equipo_e.upstream import AsyncUpstream, GuardedTransport
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_sync_client_retries_through_the_shop_upstream():
+    statuses = [503, 503, 200]
+    seen = []
+
+    async def handler(request):
+        seen.append(request.method)
+        return httpx.Response(statuses[len(seen) - 1], stream=httpx.ByteStream(b""))
+
+    async def test():
+        upstream = AsyncUpstream("tienda", 8)
+        transport = GuardedTransport(upstream, httpx.MockTransport(handler))
+        async with httpx.AsyncClient(base_url="http://tienda", transport=transport) as client:
+            response = await SyncClient(client, retries=3, backoff=0.001).put("/api/products/1", content=b"<prestashop/>")
+        assert response.status_code == 200
+        assert seen == ["PUT"] * 3
+        # cada intento pasa por el límite compartido de la tienda: los 503 lo han reducido
+        assert upstream.limit.value < 8
+        assert upstream.in_flight == 0
+
+    run(test())
+
+
+def test_sync_client_does_not_repeat_a_post_that_may_have_arrived():
+    calls = []
+
+    async def handler(request):
+        calls.append(1)
+        raise httpx.ReadTimeout("sin respuesta", request=request)
+
+    async def test():
+        async with httpx.AsyncClient(base_url="http://tienda", transport=httpx.MockTransport(handler)) as client:
+            with pytest.raises(httpx.ReadTimeout):
+                await SyncClient(client, retries=3, backoff=0.001).post("/api/products", content=b"<prestashop/>")
+        assert calls == [1]
+
+    run(test())
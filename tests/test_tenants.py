@@ -0,0 +1,61 @@
+import asyncio
+
+import httpx
+from fastapi import APIRouter, FastAPI, Request, Response
+
+from repo_api_equipo_e.metrics import route_template
+from repo_api_equipo_e.routers.Odoo.paging import page_headers
+from repo_api_equipo_e.tenants import TenantMiddleware
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def _app(seen):
+    router = APIRouter(prefix="/api/odoo")
+
+    @router.get("/products/{product_id}")
+    async def product(product_id: int, request: Request, limit: int = 10, offset: int = 0):
+        seen.append((getattr(request.state, "tenant_id", None), route_template(request.scope)))
+        return Response(headers=page_headers(request, limit, offset, 100))
+
+    app = FastAPI()
+    app.include_router(router)
+    app.add_middleware(TenantMiddleware)
+    return app
+
+
+async def _get(app, url):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api") as client:
+        return await client.get(url)
+
+
+def test_next_link_keeps_tenant_prefix():
+    seen = []
+    response = run(_get(_app(seen), "/t/tienda2/api/odoo/products/7?limit=10"))
+    assert response.status_code == 200
+    assert response.headers["Link"] == '<http://api/t/tienda2/api/odoo/products/7?limit=10&offset=10>; rel="next"'
+    # el enrutado y las métricas trabajan sin el prefijo
+    assert seen == [("tienda2", "/api/odoo/products/{product_id}")]
+
+
+def test_next_link_without_prefix_is_unchanged():
+    seen = []
+    response = run(_get(_app(seen), "/api/odoo/products/7?limit=10&offset=10"))
+    assert response.headers["Link"] == '<http://api/api/odoo/products/7?limit=10&offset=20>; rel="next"'
+    assert seen == [(None, "/api/odoo/products/{product_id}")]
+
+
+def test_tenant_prefix_after_proxy_root_path():
+    seen = []
+    app = _app(seen)
+
+    async def test():
+        transport = httpx.ASGITransport(app=app, root_path="/erp")
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+            return await client.get("/erp/t/tienda2/api/odoo/products/7?limit=10")
+
+    response = run(test())
+    assert response.headers["Link"] == '<http://api/erp/t/tienda2/api/odoo/products/7?limit=10&offset=10>; rel="next"'
+    assert seen == [("tienda2", "/api/odoo/products/{product_id}")]
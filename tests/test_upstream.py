@@ -0,0 +1,89 @@
+import asyncio
+import random
+
+import httpx
+
+from repo_api_equipo_e.upstream import AdaptiveLimit, AsyncUpstream, GuardedTransport, ThreadUpstream
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def _client(upstream, handler):
+    # las respuestas llevan el cuerpo como stream, igual que las del transporte real: con
+    # content=... httpx las da por leídas y nunca cierra el stream que libera el hueco
+    return httpx.AsyncClient(base_url="http://tienda", transport=GuardedTransport(upstream, httpx.MockTransport(handler)))
+
+
+def test_mixed_latencies_keep_limit_at_max():
+    # un search_count de 1 ms junto a search_read de medio segundo: tráfico sano
+    limit = AdaptiveLimit("test", 8)
+    for i in range(500):
+        limit.sample(0.001 if i % 2 else 0.5)
+    assert limit.value == 8
+
+
+def test_overload_reduces_limit_and_recovers():
+    limit = AdaptiveLimit("test", 8, min_limit=1, backoff=0.5)
+    limit.sample(0.0, overloaded=True)
+    assert limit.value == 4
+    for _ in range(200):
+        limit.sample(0.01)
+    assert limit.value == 8
+
+
+def test_guarded_transport_mixed_sizes_keep_limit_at_max():
+    async def handler(request):
+        # listados completos lentos, fichas sueltas rápidas
+        await asyncio.sleep(0.05 if request.url.path == "/api/products" else 0.001)
+        return httpx.Response(200, stream=httpx.ByteStream(b"<prestashop/>"))
+
+    async def test():
+        upstream = AsyncUpstream("tienda", 8)
+        paths = ["/api/products", "/api/products/1", "/api/stock_availables/1"]
+        async with _client(upstream, handler) as client:
+            for _ in range(10):
+                await asyncio.gather(*(client.get(random.choice(paths)) for _ in range(16)))
+        assert upstream.limit.value == 8
+        assert upstream.in_flight == 0
+
+    run(test())
+
+
+def test_guarded_transport_backs_off_on_503_not_on_500():
+    status = 500
+
+    async def handler(request):
+        await asyncio.sleep(0.001)
+        return httpx.Response(status, stream=httpx.ByteStream(b""))
+
+    async def test():
+        nonlocal status
+        upstream = AsyncUpstream("tienda", 8)
+        upstream.breaker.failure_threshold = 1000
+        async with _client(upstream, handler) as client:
+            for _ in range(5):
+                await client.get("/api/products/1")
+            assert upstream.limit.value == 8
+            status = 503
+            await client.get("/api/products/1")
+        assert upstream.limit.value < 8
+
+    run(test())
+
+
+def test_thread_upstream_timeout_is_overload():
+    def is_failure(exc):
+        return True, isinstance(exc, TimeoutError)
+
+    upstream = ThreadUpstream("odoo", 8)
+    for exc in (ConnectionRefusedError(), TimeoutError()):
+        try:
+            with upstream.call(is_failure):
+                raise exc
+        except OSError:
+            pass
+        # el rechazo de conexión cuenta como fallo pero no baja el límite; el timeout sí
+        assert upstream.limit.value == (8 if isinstance(exc, ConnectionRefusedError) else 5)
+    assert upstream.in_flight == 0
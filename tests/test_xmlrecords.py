@@ -0,0 +1,103 @@
+from repo_api_equipo_e.xmlrecords import _expat_find_text, find_text, first_record, iter_records
+
+PRODUCTS = """<?xml version="1.0" encoding="UTF-8"?>
+<prestashop xmlns:xlink="http://www.w3.org/1999/xlink">
+<products>
+  <product>
+    <id><![CDATA[1]]></id>
+    <id_default_image xlink:href="http://tienda/api/images/products/1/5"><![CDATA[5]]></id_default_image>
+    <reference><![CDATA[SKU000001]]></reference>
+    <name>
+      <language id="1" xlink:href="http://tienda/api/languages/1"><![CDATA[Camión de juguete]]></language>
+      <language id="2" xlink:href="http://tienda/api/languages/2"><![CDATA[Toy truck]]></language>
+    </name>
+    <description><language id="1"></language><language id="2"><![CDATA[Only English]]></language></description>
+    <meta_title><language id="1"/><language id="2">x</language></meta_title>
+    <active>1</active>
+    <associations>
+      <product_bundle nodeType="product" api="products">
+        <product><id>9</id><reference>SKU000009</reference><quantity>2</quantity></product>
+      </product_bundle>
+    </associations>
+  </product>
+  <product>
+    <id>2</id>
+    <reference></reference>
+    <name><language id="1">Pelota &amp; red</language></name>
+    <active/>
+  </product>
+  <product>
+    <id>3</id>
+    <reference>SKU000003</reference>
+  </product>
+</products>
+</prestashop>
+"""
+
+
+def test_multilanguage_field_takes_first_language():
+    records = list(iter_records(PRODUCTS, "product", ["id", "name", "description", "meta_title"]))
+    assert [r["name"] for r in records[:2]] == ["Camión de juguete", "Pelota & red"]
+    # el primer idioma manda aunque venga vacío
+    assert records[0]["description"] == ""
+    assert records[0]["meta_title"] == ""
+
+
+def test_nested_same_name_tags_are_not_records():
+    records = list(iter_records(PRODUCTS, "product", ["id", "reference", "active"]))
+    # el <product> de associations no es un registro ni pisa los campos del que lo contiene
+    assert records == [
+        {"id": "1", "reference": "SKU000001", "active": "1"},
+        {"id": "2", "reference": "", "active": ""},
+        {"id": "3", "reference": "SKU000003"},
+    ]
+
+
+def test_only_direct_children_are_fields():
+    record = first_record(PRODUCTS, "product", ["id", "quantity"])
+    # <quantity> solo existe dentro del producto asociado
+    assert record == {"id": "1"}
+    assert set(first_record(PRODUCTS, "product")) == {
+        "id", "id_default_image", "reference", "name", "description", "meta_title", "active", "associations"
+    }
+
+
+def test_chunk_boundaries_do_not_change_records():
+    data = PRODUCTS.encode("utf-8")
+    whole = list(iter_records(data, "product", ["id", "reference", "name"]))
+    # bloques de 7 bytes: cortan etiquetas, entidades y caracteres multibyte
+    chunks = (data[i:i + 7] for i in range(0, len(data), 7))
+    assert list(iter_records(chunks, "product", ["id", "reference", "name"])) == whole
+    assert len(whole) == 3
+
+
+def test_invalid_xml_yields_what_was_read():
+    assert list(iter_records("<html><body>502 Bad Gateway</body></html>", "product")) == []
+    truncated = PRODUCTS[:PRODUCTS.index("<id>3</id>")]
+    assert [r["id"] for r in iter_records(truncated, "product", ["id"])] == ["1", "2"]
+    assert first_record(b"", "product") is None
+
+
+FIND_CASES = [
+    (PRODUCTS, "id", "1"),
+    (PRODUCTS, "reference", "SKU000001"),
+    (PRODUCTS, "active", "1"),
+    ("<prestashop><product><id>42</id></product></prestashop>", "id", "42"),
+    ("<prestashop><product><id>\n  42\n</id></product></prestashop>", "id", "42"),
+    ('<prestashop><product><id_shop_default>1</id_shop_default><id a="b">7</id></product></prestashop>', "id", "7"),
+    ("<prestashop><product><id/><id>8</id></product></prestashop>", "id", ""),
+    ("<prestashop><product><id></id></product></prestashop>", "id", ""),
+    ("<prestashop><product><reference>A &amp; B</reference></product></prestashop>", "reference", "A & B"),
+    ("<prestashop><product><name><language id='1'>Ñu</language></name></product></prestashop>", "name", "Ñu"),
+    ("<prestashop><errors><error><code>85</code></error></errors></prestashop>", "id", None),
+    ("<html><body>502 Bad Gateway</body></html>", "id", None),
+    ("", "id", None),
+]
+
+
+def test_find_text_cases():
+    for content, name, expected in FIND_CASES:
+        for value in (content, content.encode("utf-8")):
+            assert find_text(value, name) == expected, (content, name)
+            # el camino corto devuelve lo mismo que expat
+            assert find_text(value, name) == _expat_find_text(value, name), (content, name)